@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------
+# After-Commit Hooks
+# ---------------------------------------------------
+# Write paths queue keys on their session with after_commit(); the keys are
+# handed to the topic's handler only once that transaction commits, and are
+# dropped if it rolls back.
+
+_handlers = {}
+
+
+def on_commit(topic: str, handler):
+    """Register `handler(keys)` for keys queued under `topic`."""
+    _handlers[topic] = handler
+
+
+def after_commit(db: Session, topic: str, keys):
+    """Queue `keys` for `topic`, to be delivered when `db` commits."""
+    db.info.setdefault("after_commit", defaultdict(set))[topic].update(keys)
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver(session):
+    pending = session.info.pop("after_commit", None)
+    if not pending:
+        return
+
+    for topic, keys in pending.items():
+        handler = _handlers.get(topic)
+        if handler:
+            handler(keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session):
+    session.info.pop("after_commit", None)
+
+
+# ---------------------------------------------------
+# Coalescing Worker
+# ---------------------------------------------------
+
+class CoalescingWorker:
+    """
+    Background thread that batches submitted keys.
+
+    Keys submitted while a batch is waiting or running are merged into the
+    next batch, so a key submitted many times is processed once. `delay`
+    seconds pass between the first key of a batch and its processing, to
+    let bursts collect. The thread starts on the first submit.
+
+    `process(batch)` must apply a batch all-or-nothing: if it raises, the
+    batch's keys are queued again and retried with the next batch, up to
+    `max_attempts` times, after which they are logged and dropped.
+    """
+
+    def __init__(self, name: str, process, delay: float, max_attempts: int = 5):
+        self.name = name
+        self.process = process
+        self.delay = delay
+        self.max_attempts = max_attempts
+        self._pending = set()
+        self._attempts = Counter()
+        self._wakeup = threading.Condition()
+        self._thread = None
+
+    def submit(self, keys):
+        with self._wakeup:
+            self._pending.update(keys)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._wakeup.notify()
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while not self._pending:
+                    self._wakeup.wait()
+
+            time.sleep(self.delay)
+
+            with self._wakeup:
+                batch, self._pending = self._pending, set()
+
+            try:
+                self.process(batch)
+            except Exception:
+                logger.exception("%s: processing %d keys failed", self.name, len(batch))
+                self._retry(batch)
+            else:
+                for key in batch:
+                    self._attempts.pop(key, None)
+
+    def _retry(self, batch):
+        self._attempts.update(batch)
+        attempts = max(self._attempts[key] for key in batch)
+
+        dropped = {key for key in batch if self._attempts[key] >= self.max_attempts}
+        if dropped:
+            logger.error("%s: dropping %d keys after %d failed attempts", self.name, len(dropped), self.max_attempts)
+            for key in dropped:
+                del self._attempts[key]
+
+        # Back off linearly so a short outage doesn't use up every attempt
+        time.sleep(self.delay * attempts)
+        with self._wakeup:
+            self._pending.update(batch - dropped)
@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+
+# ---------------------------------------------------
+# TTL Result Cache
+# ---------------------------------------------------
+
+class TTLCache:
+    """
+    In-process cache for expensive read-only aggregates.
+
+    Entries expire after `ttl_seconds` (0 disables caching). With
+    `max_entries` set, the least recently used entry is evicted once the
+    cache is full. Concurrent misses on the same key are single-flighted:
+    one caller computes while the others wait for its result instead of
+    running the query again.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int | None = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._key_locks = defaultdict(threading.Lock)
+        self._lock = threading.Lock()
+        # key -> True once invalidated while its compute is in flight
+        self._inflight = {}
+
+    def get_or_compute(self, key, compute):
+        if self.ttl_seconds <= 0:
+            return compute()
+
+        value = self._get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            key_lock = self._key_locks[key]
+
+        with key_lock:
+            # Another caller may have filled the entry while we waited
+            value = self._get(key)
+            if value is not None:
+                return value
+
+            with self._lock:
+                self._inflight[key] = False
+
+            try:
+                value = compute()
+            except BaseException:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                raise
+
+            with self._lock:
+                # Don't store a result that an invalidation of this key (or
+                # of the whole cache) has already superseded
+                if not self._inflight.pop(key, True):
+                    self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+                    self._entries.move_to_end(key)
+                    if self.max_entries is not None and len(self._entries) > self.max_entries:
+                        evicted, _ = self._entries.popitem(last=False)
+                        self._key_locks.pop(evicted, None)
+
+            return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                for inflight_key in self._inflight:
+                    self._inflight[inflight_key] = True
+            else:
+                self._entries.pop(key, None)
+                if key in self._inflight:
+                    self._inflight[key] = True
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                return None
+
+            if self.max_entries is not None:
+                self._entries.move_to_end(key)
+
+        return value
+
+
+# ---------------------------------------------------
+# Write Invalidation Hooks
+# ---------------------------------------------------
+
+# Write events fired by the repositories, split by what changed so caches
+# only listen to writes that affect them. Keys:
+#   ENROLLMENT_WRITE, PROGRESS_WRITE  (student_user_id, course_id)
+#   COMPLETION_WRITE, RATING_WRITE    (student_user_id, course_id, days), where
+#       days are the completion / rating dates the write removed or added
+#   TEACHING_WRITE                    (instructor_user_id, course_id)
+#   COURSE_WRITE, TOPIC_WRITE, QUIZ_WRITE   course_id
+#   USER_WRITE                        none
+# A key of None means any key may have changed.
+ENROLLMENT_WRITE = "enrollment"   # enrollments added or removed
+COMPLETION_WRITE = "completion"   # completion status / date changed
+RATING_WRITE = "rating"           # rating or review changed
+PROGRESS_WRITE = "progress"       # current topic or grade changed
+TEACHING_WRITE = "teaching"       # instructor assigned to / removed from a course
+COURSE_WRITE = "course"
+USER_WRITE = "user"
+TOPIC_WRITE = "course_topic"
+QUIZ_WRITE = "quiz"
+
+_hooks = defaultdict(list)
+
+
+def on_write(event: str, callback, keyed: bool = False):
+    """
+    Register `callback` to run after a committed write of kind `event`.
+
+    Keyed callbacks receive the key passed to notify_write (see the event
+    list above), or None when every key may have changed; others are
+    called without arguments.
+    """
+    _hooks[event].append((callback, keyed))
+
+
+def notify_write(event: str, key=None):
+    """
+    Fire the invalidation hooks registered for `event`.
+    """
+    for callback, keyed in _hooks[event]:
+        if keyed:
+            callback(key)
+        else:
+            callback()
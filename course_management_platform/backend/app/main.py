@@ -4,6 +4,8 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.database import engine
 from app.utils.db_utils import sync_postgres_serial_sequences
+from app.services.statistics_service import start_statistics_reconciler
+from app.services.job_service import fail_interrupted_jobs, start_job_heartbeat
 
 from app.routers import auth
 from app.routers import course
@@ -55,6 +57,17 @@ def on_startup():
 		# swallow errors to avoid preventing app startup
 		pass
 
+	# Fail jobs left queued/running by processes that are gone, then keep
+	# this process's own jobs heartbeating
+	try:
+		fail_interrupted_jobs()
+	except Exception:
+		pass
+	start_job_heartbeat()
+
+	# Periodically correct drift in the incremental statistics counters
+	start_statistics_reconciler()
+
 app.include_router(auth.router)
 app.include_router(course.router)
 app.include_router(topic.router)
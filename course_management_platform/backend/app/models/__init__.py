@@ -12,4 +12,14 @@ from app.models.teaching import Teaching
 from app.models.course_content import CourseContent
 from app.models.statistics import Statistics
 from app.models.student_statistics import StudentStatistics
-from app.models.instructor_statistics import InstructorStatistics
\ No newline at end of file
+from app.models.instructor_statistics import InstructorStatistics
+from app.models.analytics_snapshot import (
+    CourseAnalyticsSnapshot,
+    StudentAnalyticsSnapshot,
+    InstructorAnalyticsSnapshot,
+    AnalyticsRefreshState
+)
+from app.models.cohort_snapshot import CohortSnapshot
+from app.models.background_job import BackgroundJob
+from app.models.completion_time_histogram import CompletionTimeHistogram
+from app.models.stats_dirty import StatsDirty
\ No newline at end of file
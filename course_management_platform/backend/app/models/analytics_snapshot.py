@@ -0,0 +1,55 @@
+from sqlalchemy import Column, Integer, String, Numeric, TIMESTAMP, ForeignKey
+from app.database import Base
+
+
+class CourseAnalyticsSnapshot(Base):
+    __tablename__ = "course_analytics_snapshot"
+
+    course_id = Column(Integer, ForeignKey("course.course_id", ondelete="CASCADE"), primary_key=True)
+
+    total_enrollments = Column(Integer, nullable=False, default=0)
+    completed_enrollments = Column(Integer, nullable=False, default=0)
+    completion_rate = Column(Numeric(5, 2), nullable=False, default=0)
+    average_rating = Column(Numeric(4, 2), nullable=False, default=0)
+    total_instructors = Column(Integer, nullable=False, default=0)
+
+    refreshed_at = Column(TIMESTAMP)
+
+
+class StudentAnalyticsSnapshot(Base):
+    __tablename__ = "student_analytics_snapshot"
+
+    student_user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+
+    total_enrollments = Column(Integer, nullable=False, default=0)
+    completed_courses = Column(Integer, nullable=False, default=0)
+    active_courses = Column(Integer, nullable=False, default=0)
+    average_rating = Column(Numeric(4, 2), nullable=False, default=0)
+
+    refreshed_at = Column(TIMESTAMP)
+
+
+class InstructorAnalyticsSnapshot(Base):
+    __tablename__ = "instructor_analytics_snapshot"
+
+    instructor_user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+
+    total_courses_taught = Column(Integer, nullable=False, default=0)
+    total_students = Column(Integer, nullable=False, default=0)
+    average_course_completion_rate = Column(Numeric(5, 2), nullable=False, default=0)
+
+    refreshed_at = Column(TIMESTAMP)
+
+
+class AnalyticsRefreshState(Base):
+    __tablename__ = "analytics_refresh_state"
+
+    name = Column(String(50), primary_key=True)
+
+    # Enrollments updated at or after the watermark are picked up by the next incremental refresh
+    watermark = Column(TIMESTAMP)
+    last_refreshed_at = Column(TIMESTAMP)
+    last_full_refresh_at = Column(TIMESTAMP)
+    last_duration_ms = Column(Integer)
+    last_rows_refreshed = Column(Integer)
+    status = Column(String(20), default="Never")
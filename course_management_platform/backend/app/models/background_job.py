@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, String, Text, Boolean, JSON, TIMESTAMP, Index, text
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class BackgroundJob(Base):
+    __tablename__ = "background_job"
+
+    job_id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String(50), nullable=False)
+    params = Column(JSON)
+
+    # queued -> running -> completed | failed | cancelled
+    status = Column(String(20), nullable=False, default="queued")
+
+    # Entities processed so far out of total (both unknown until the job starts)
+    processed = Column(Integer, nullable=False, default=0)
+    total = Column(Integer)
+
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+
+    # Process running the job ("host:pid:token") and its last sign of life;
+    # active jobs whose owner died or stopped heartbeating are failed
+    owner = Column(String(100))
+    heartbeat_at = Column(TIMESTAMP)
+
+    result = Column(JSON)
+    error = Column(Text)
+
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    started_at = Column(TIMESTAMP)
+    updated_at = Column(TIMESTAMP)
+    finished_at = Column(TIMESTAMP)
+
+    __table_args__ = (
+        # At most one queued or running job of each kind
+        Index(
+            "uq_background_job_active_kind",
+            "kind",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+            sqlite_where=text("status IN ('queued', 'running')")
+        ),
+    )
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Date, JSON, TIMESTAMP
+from app.database import Base
+
+
+class CohortSnapshot(Base):
+    __tablename__ = "cohort_snapshot"
+
+    # Monday of the enrollment week and course category ("Uncategorized" if unset)
+    cohort_week = Column(Date, primary_key=True)
+    category = Column(String(50), primary_key=True)
+
+    horizon_weeks = Column(Integer, nullable=False)
+    cohort_size = Column(Integer, nullable=False)
+
+    # Percent of the cohort completed by week 0..horizon_weeks
+    completion_curve = Column(JSON, nullable=False)
+    # Percent of the cohort that reached each progress step (25/50/75/100%)
+    progress_curve = Column(JSON, nullable=False)
+
+    computed_at = Column(TIMESTAMP)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from app.database import Base
+
+
+class CompletionTimeHistogram(Base):
+    __tablename__ = "completion_time_histogram"
+
+    # Completed enrollments of a course by whole days from enrollment to completion
+    course_id = Column(Integer, ForeignKey("course.course_id", ondelete="CASCADE"), primary_key=True)
+    days = Column(Integer, primary_key=True)
+
+    enrollments = Column(Integer, nullable=False, default=0)
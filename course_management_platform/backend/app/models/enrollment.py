@@ -1,5 +1,6 @@
 from sqlalchemy import Column, Integer, Date, String, Text, TIMESTAMP, ForeignKey, Boolean
 from app.database import Base
+from datetime import datetime
 
 
 class Enrollment(Base):
@@ -19,4 +20,7 @@ class Enrollment(Base):
     rated_at = Column(TIMESTAMP)
 
     grade = Column(String(5))
-    current_topic = Column(Integer, ForeignKey("topic.topic_id", ondelete="SET NULL"), nullable=True)  # Topic progression tracking
\ No newline at end of file
+    current_topic = Column(Integer, ForeignKey("topic.topic_id", ondelete="SET NULL"), nullable=True)  # Topic progression tracking
+
+    # Change tracking for incremental analytics refreshes
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
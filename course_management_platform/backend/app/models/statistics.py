@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, Numeric, ForeignKey
 from app.database import Base
 
 
@@ -10,4 +10,9 @@ class Statistics(Base):
     total_enrollments = Column(Integer)
     active_enrollments = Column(Integer)
     completion_rate = Column(Numeric(5, 2))
-    average_completion_time = Column(Integer)
\ No newline at end of file
+    average_completion_time = Column(Integer)
+
+    # Running totals over completed enrollments (days from enrollment to
+    # completion), maintained incrementally; average = sum / count
+    completion_days_sum = Column(BigInteger, default=0)
+    completion_count = Column(Integer, default=0)
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, TIMESTAMP
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class StatsDirty(Base):
+    __tablename__ = "stats_dirty"
+
+    # "course", "student" or "instructor" whose statistics need a recompute
+    entity_type = Column(String(20), primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+
+    # Bumped each time the entity is marked again, so a recompute only
+    # clears the marks it actually saw
+    version = Column(Integer, nullable=False, default=1)
+    marked_at = Column(TIMESTAMP, server_default=func.now())
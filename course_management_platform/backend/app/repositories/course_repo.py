@@ -4,6 +4,7 @@ from app.models.university import University
 from app.models.course import Course
 from app.models.topic import Topic
 from app.models.course_topic import CourseTopic
+from app.core.cache import notify_write, COURSE_WRITE, TOPIC_WRITE
 
 # UNIVERSITY OPERATIONS
 def create_university(db: Session, data: dict) -> University:
@@ -31,6 +32,7 @@ def create_course(db: Session, data: dict) -> Course:
 
     db.add(course)
     db.commit()
+    notify_write(COURSE_WRITE)
     db.refresh(course)
 
     return course
@@ -129,6 +131,7 @@ def update_topic_sequence(db: Session, course_id: int, topic_id: int, sequence_o
     if mapping:
         mapping.sequence_order = sequence_order
         db.commit()
+        notify_write(TOPIC_WRITE, course_id)
     
     return mapping
 
@@ -147,6 +150,7 @@ def map_topic_to_course(
 
     db.add(mapping)
     db.commit()
+    notify_write(TOPIC_WRITE, course_id)
 
     return mapping
 
@@ -161,6 +165,16 @@ def get_topics_by_course(db: Session, course_id: int):
     ).order_by(CourseTopic.sequence_order).all()
 
 
+def get_topic_order(db: Session, course_id: int):
+    """[(topic_id, name)] of a course's topics in sequence order"""
+    return db.query(Topic.topic_id, Topic.name).join(
+        CourseTopic,
+        CourseTopic.topic_id == Topic.topic_id
+    ).filter(
+        CourseTopic.course_id == course_id
+    ).order_by(CourseTopic.sequence_order, CourseTopic.topic_id).all()
+
+
 def delete_topic_mapping(db: Session, course_id: int, topic_id: int):
     """Delete a CourseTopic mapping and return True if removed"""
     mapping = db.query(CourseTopic).filter(
@@ -173,6 +187,7 @@ def delete_topic_mapping(db: Session, course_id: int, topic_id: int):
 
     db.delete(mapping)
     db.commit()
+    notify_write(TOPIC_WRITE, course_id)
 
     return True
 
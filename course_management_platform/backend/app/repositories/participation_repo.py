@@ -1,10 +1,23 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import and_, literal
 from datetime import date
 from datetime import date, datetime
 
 from app.models.enrollment import Enrollment
 from app.models.teaching import Teaching
 from app.models.user import User
+from app.models.course import Course
+from app.models.topic import Topic
+from app.repositories import statistics_repo
+from app.utils.db_utils import dialect_insert
+from app.core.cache import (
+    notify_write,
+    ENROLLMENT_WRITE,
+    COMPLETION_WRITE,
+    RATING_WRITE,
+    PROGRESS_WRITE,
+    TEACHING_WRITE
+)
 
 
 # ENROLLMENT OPERATIONS
@@ -23,12 +36,54 @@ def create_enrollment(
     )
 
     db.add(enrollment)
+    db.flush()
+    statistics_repo.record_enrollment_added(db, student_user_id, course_id)
+
     db.commit()
+    notify_write(ENROLLMENT_WRITE, (student_user_id, course_id))
     db.refresh(enrollment)
 
     return enrollment
 
 
+def create_enrollments(
+    db: Session,
+    pairs: list[tuple[int, int]]
+) -> list[tuple[int, int]]:
+    """
+    Insert (student_user_id, course_id) enrollments with one batched
+    INSERT ... ON CONFLICT DO NOTHING, in a single transaction.
+    Returns the pairs that were actually inserted.
+    """
+    if not pairs:
+        return []
+
+    today = date.today()
+    stmt = dialect_insert(db, Enrollment.__table__).on_conflict_do_nothing(
+        index_elements=["student_user_id", "course_id"]
+    ).returning(Enrollment.student_user_id, Enrollment.course_id)
+
+    inserted = [
+        tuple(row) for row in db.execute(stmt, [
+            {
+                "student_user_id": student_user_id,
+                "course_id": course_id,
+                "enrollment_date": today,
+                "status": "Active",
+                "completion_status": "In Progress"
+            }
+            for student_user_id, course_id in pairs
+        ])
+    ]
+    statistics_repo.record_enrollments_added(db, inserted)
+
+    db.commit()
+    for pair in inserted:
+        notify_write(ENROLLMENT_WRITE, pair)
+
+    return inserted
+
+
 def get_enrollment(
     db: Session,
     student_user_id: int,
@@ -40,6 +95,43 @@ def get_enrollment(
     ).first()
 
 
+def get_participation(
+    db: Session,
+    student_user_id: int,
+    course_id: int,
+    topic_id: int | None = None
+):
+    """
+    Everything a participation write validates, in one query: the user's
+    role, the course (id and answer key), the topic id and the enrollment.
+    Missing course/topic/enrollment come back as None; no row at all means
+    the user does not exist.
+    """
+    topic_column = Topic.topic_id if topic_id is not None else literal(None)
+
+    query = db.query(
+        User.role,
+        Course.course_id,
+        Course.quiz_answer_key,
+        topic_column.label("topic_id"),
+        Enrollment
+    ).select_from(User).outerjoin(
+        Course,
+        Course.course_id == course_id
+    ).outerjoin(
+        Enrollment,
+        and_(
+            Enrollment.student_user_id == User.user_id,
+            Enrollment.course_id == Course.course_id
+        )
+    )
+
+    if topic_id is not None:
+        query = query.outerjoin(Topic, Topic.topic_id == topic_id)
+
+    return query.filter(User.user_id == student_user_id).first()
+
+
 def update_completion(
     db: Session,
     enrollment: Enrollment,
@@ -47,11 +139,32 @@ def update_completion(
     completion_date: date | None
 ):
 
+    was_completed = enrollment.completion_status == "Completed"
+    old_days = statistics_repo.completion_days(enrollment)
+    changed = (enrollment.completion_status, enrollment.completion_date) != (completion_status, completion_date)
+    # Completion dates that leave or enter the completion counts
+    days = (
+        enrollment.completion_date if was_completed else None,
+        completion_date if completion_status == "Completed" else None
+    )
+
     enrollment.completion_status = completion_status
     enrollment.completion_date = completion_date
 
+    statistics_repo.record_completion_change(
+        db,
+        enrollment.student_user_id,
+        enrollment.course_id,
+        was_completed,
+        completion_status == "Completed",
+        old_days,
+        statistics_repo.completion_days(enrollment)
+    )
+
     db.commit()
     db.refresh(enrollment)
+    if changed:
+        notify_write(COMPLETION_WRITE, (enrollment.student_user_id, enrollment.course_id, days))
 
     return enrollment
 
@@ -64,6 +177,9 @@ def update_rating(
     is_public: bool | None = False
 ):
 
+    # Re-rating moves the rating out of the day it was first given
+    old_day = enrollment.rated_at.date() if enrollment.rated_at and enrollment.rating is not None else None
+
     enrollment.rating = rating
     enrollment.review_text = review_text
     # Store whether review should be public
@@ -73,6 +189,10 @@ def update_rating(
 
     db.commit()
     db.refresh(enrollment)
+    notify_write(
+        RATING_WRITE,
+        (enrollment.student_user_id, enrollment.course_id, (old_day, enrollment.rated_at.date()))
+    )
 
     return enrollment
 
@@ -94,8 +214,10 @@ def assign_instructor(
     )
 
     db.add(teaching)
+    statistics_repo.mark_dirty(db, statistics_repo.DIRTY_INSTRUCTOR, [instructor_user_id])
     db.commit()
     db.refresh(teaching)
+    notify_write(TEACHING_WRITE, (instructor_user_id, course_id))
 
     return teaching
 
@@ -237,6 +359,7 @@ def update_topic_progress(
     enrollment.current_topic = topic_id
     db.commit()
     db.refresh(enrollment)
+    notify_write(PROGRESS_WRITE, (enrollment.student_user_id, enrollment.course_id))
     return enrollment
 
 
@@ -249,4 +372,5 @@ def update_grade(
     enrollment.grade = grade
     db.commit()
     db.refresh(enrollment)
+    notify_write(PROGRESS_WRITE, (enrollment.student_user_id, enrollment.course_id))
     return enrollment
\ No newline at end of file
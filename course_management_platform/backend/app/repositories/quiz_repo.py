@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from app.models.quiz import Quiz, QuizQuestion
 from app.models.course import Course
+from app.core.cache import notify_write, QUIZ_WRITE
 
 
 def create_quiz(db: Session, course_id: int, quiz_data: dict):
@@ -14,6 +15,7 @@ def create_quiz(db: Session, course_id: int, quiz_data: dict):
     )
     db.add(quiz)
     db.commit()
+    notify_write(QUIZ_WRITE, course_id)
     db.refresh(quiz)
     return quiz
 
@@ -51,6 +53,7 @@ def add_question(db: Session, quiz_id: int, question_data: dict):
     )
     db.add(question)
     db.commit()
+    notify_write(QUIZ_WRITE, _course_of(db, quiz_id))
     db.refresh(question)
     return question
 
@@ -76,6 +79,7 @@ def update_question(db: Session, question_id: int, question_data: dict):
             setattr(question, key, value)
     
     db.commit()
+    notify_write(QUIZ_WRITE, _course_of(db, question.quiz_id))
     db.refresh(question)
     return question
 
@@ -87,8 +91,10 @@ def delete_question(db: Session, question_id: int):
     ).first()
     
     if question:
+        quiz_id = question.quiz_id
         db.delete(question)
         db.commit()
+        notify_write(QUIZ_WRITE, _course_of(db, quiz_id))
         return True
     return False
 
@@ -102,5 +108,11 @@ def update_answer_key(db: Session, course_id: int, answer_key: str):
     
     course.quiz_answer_key = answer_key
     db.commit()
+    notify_write(QUIZ_WRITE, course_id)
     db.refresh(course)
     return course
+
+
+def _course_of(db: Session, quiz_id: int):
+    """Course id of a quiz (None if the quiz is gone)"""
+    return db.query(Quiz.course_id).filter(Quiz.quiz_id == quiz_id).scalar()
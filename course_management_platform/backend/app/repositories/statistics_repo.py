@@ -1,11 +1,21 @@
+from collections import Counter, defaultdict
+
 from sqlalchemy.orm import Session
-from sqlalchemy import func, distinct
+from sqlalchemy import func, distinct, case, or_, select, insert, update, delete, tuple_, literal, literal_column, true, cast, String
+from sqlalchemy.sql import Select
 
+from app.models.course import Course
+from app.models.student import Student
+from app.models.instructor import Instructor
 from app.models.enrollment import Enrollment
 from app.models.teaching import Teaching
 from app.models.statistics import Statistics
 from app.models.student_statistics import StudentStatistics
 from app.models.instructor_statistics import InstructorStatistics
+from app.models.completion_time_histogram import CompletionTimeHistogram
+from app.models.stats_dirty import StatsDirty
+from app.utils.db_utils import dialect_insert, days_between, string_agg
+from app.core.after_commit import after_commit
 
 
 # COURSE STATISTICS CALCULATIONS
@@ -28,6 +38,67 @@ def get_course_enrollment_counts(db: Session, course_id: int):
 
     return total, active, completed
 
+
+def get_course_completion_times(db: Session, course_id: int):
+    """(sum of days to complete, number of timed completions)"""
+
+    days_sum, completed = db.query(
+        func.coalesce(func.sum(_completion_days()), 0),
+        func.count(_completion_days())
+    ).filter(
+        Enrollment.course_id == course_id
+    ).one()
+
+    return days_sum, completed
+
+
+def completion_histogram_column(course_id: int):
+    """Scalar subquery with the course's completion-time histogram as one
+    "days:enrollments,..." string (NULL when empty), so it can be selected
+    alongside other columns. Decode with parse_completion_histogram()."""
+    entry = cast(CompletionTimeHistogram.days, String) + ":" + cast(CompletionTimeHistogram.enrollments, String)
+
+    return select(
+        string_agg(entry, literal(","))
+    ).where(
+        CompletionTimeHistogram.course_id == course_id,
+        CompletionTimeHistogram.enrollments > 0
+    ).scalar_subquery()
+
+
+def parse_completion_histogram(value: str | None):
+    """[(days, enrollments)] ordered by days"""
+    if not value:
+        return []
+    return sorted(
+        (int(days), int(enrollments))
+        for days, enrollments in (entry.split(":") for entry in value.split(","))
+    )
+
+
+def _completion_days():
+    # Days from enrollment to completion, NULL unless completed with both dates
+    return case(
+        (
+            (Enrollment.completion_status == "Completed")
+            & Enrollment.completion_date.isnot(None)
+            & Enrollment.enrollment_date.isnot(None),
+            days_between(Enrollment.enrollment_date, Enrollment.completion_date)
+        )
+    )
+
+
+def completion_days(enrollment) -> int | None:
+    """Python-side equivalent of _completion_days() for a loaded enrollment"""
+    if (
+        enrollment.completion_status != "Completed"
+        or enrollment.completion_date is None
+        or enrollment.enrollment_date is None
+    ):
+        return None
+    return (enrollment.completion_date - enrollment.enrollment_date).days
+
+
 # STUDENT STATISTICS
 
 def get_student_counts(db: Session, student_user_id: int):
@@ -64,4 +135,545 @@ def get_instructor_counts(db: Session, instructor_user_id: int):
         Teaching.instructor_user_id == instructor_user_id
     ).scalar()
 
-    return courses, students
\ No newline at end of file
+    return courses, students
+
+
+# ---------------- Incremental deltas -----------------
+# Applied inside the caller's write transaction (nothing here commits), so
+# counters move together with the enrollment change that caused them. New
+# enrollments are the exception: their deltas are applied after commit by
+# the STATS_REFRESH worker.
+
+# Numeric on PostgreSQL (so round(x, 2) applies) and REAL on SQLite
+HUNDRED = literal_column("100.0")
+ONE = literal_column("1.0")
+
+# Ids per IN list when a batch of deltas is applied
+DELTA_BATCH_SIZE = 1000
+
+def _course_counters(d_total: int, d_active: int, d_days=0, d_timed=0):
+    total = func.coalesce(Statistics.total_enrollments, 0) + d_total
+    active = func.coalesce(Statistics.active_enrollments, 0) + d_active
+    days_sum = func.coalesce(Statistics.completion_days_sum, 0) + d_days
+    timed = func.coalesce(Statistics.completion_count, 0) + d_timed
+
+    return {
+        Statistics.total_enrollments: total,
+        Statistics.active_enrollments: active,
+        Statistics.completion_rate: case(
+            (total > 0, func.round((total - active) * HUNDRED / total, 2)),
+            else_=0
+        ),
+        Statistics.completion_days_sum: days_sum,
+        Statistics.completion_count: timed,
+        Statistics.average_completion_time: case(
+            (timed > 0, func.round(days_sum * ONE / timed))
+        )
+    }
+
+
+def _student_counters(d_total: int, d_completed: int):
+    return {
+        StudentStatistics.total_enrollments: func.coalesce(StudentStatistics.total_enrollments, 0) + d_total,
+        StudentStatistics.completed_courses: func.coalesce(StudentStatistics.completed_courses, 0) + d_completed,
+        StudentStatistics.active_courses: func.coalesce(StudentStatistics.active_courses, 0) + d_total - d_completed,
+        StudentStatistics.last_updated: func.now()
+    }
+
+
+def _taught_by(course_id: int):
+    return select(Teaching.instructor_user_id).where(Teaching.course_id == course_id)
+
+
+def record_enrollment_added(db: Session, student_user_id: int, course_id: int):
+    """Queue a new enrollment for the STATS_REFRESH worker once the caller
+    commits; the worker applies its deltas (apply_enrollments_added) in its
+    own transaction, which keeps hot course rows out of the enrollment
+    transaction. Deltas lost to a crash before the worker runs are repaired
+    by the reconciler."""
+    record_enrollments_added(db, [(student_user_id, course_id)])
+
+
+def record_enrollments_added(db: Session, pairs):
+    """record_enrollment_added for many (student_user_id, course_id) pairs."""
+    after_commit(db, STATS_REFRESH, pairs)
+
+
+def _grouped_by_delta(counts: Counter):
+    """{delta: [ids]} so ids moving by the same amount share one UPDATE."""
+    groups = defaultdict(list)
+    for entity_id, delta in counts.items():
+        groups[delta].append(entity_id)
+    return groups
+
+
+def _chunks(ids, size: int = DELTA_BATCH_SIZE):
+    ids = sorted(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _new_students_per_instructor(db: Session, pairs: set):
+    """Instructors gain a student when none of that student's enrollments in
+    their courses predates the batch. Returns (new students per instructor,
+    all instructors teaching a batch course)."""
+    batch_courses = defaultdict(set)
+    for student_user_id, course_id in pairs:
+        batch_courses[student_user_id].add(course_id)
+
+    # (instructor, student) -> whether any of those enrollments is in the batch / older
+    in_batch, older = set(), set()
+    for students in _chunks(batch_courses):
+        rows = db.execute(
+            select(Teaching.instructor_user_id, Enrollment.student_user_id, Enrollment.course_id).join(
+                Teaching,
+                Teaching.course_id == Enrollment.course_id
+            ).where(Enrollment.student_user_id.in_(students))
+        ).all()
+        for instructor_user_id, student_user_id, course_id in rows:
+            key = (instructor_user_id, student_user_id)
+            if course_id in batch_courses[student_user_id]:
+                in_batch.add(key)
+            else:
+                older.add(key)
+
+    new_students = Counter(instructor_user_id for instructor_user_id, _ in in_batch - older)
+    return new_students, {instructor_user_id for instructor_user_id, _ in in_batch}
+
+
+def apply_enrollments_added(db: Session, pairs):
+    """Apply the counter deltas of committed new (in progress) enrollments:
+    +1 total/active per course and student, +1 student per instructor for a
+    student's first course with them. A fixed number of statements per
+    batch, whatever its size; missing rows are seeded from a full count.
+    Does not commit. Returns {table: ids} of the rows touched."""
+    pairs = set(pairs)
+    courses = Counter(course_id for _, course_id in pairs)
+    students = Counter(student_user_id for student_user_id, _ in pairs)
+    instructors, teaching = _new_students_per_instructor(db, pairs)
+
+    for delta, course_ids in _grouped_by_delta(courses).items():
+        for chunk in _chunks(course_ids):
+            db.execute(
+                update(Statistics).where(
+                    Statistics.course_id.in_(chunk)
+                ).values(_course_counters(delta, delta))
+            )
+
+    for delta, student_ids in _grouped_by_delta(students).items():
+        for chunk in _chunks(student_ids):
+            db.execute(
+                update(StudentStatistics).where(
+                    StudentStatistics.student_user_id.in_(chunk)
+                ).values(_student_counters(delta, 0))
+            )
+
+    for delta, instructor_ids in _grouped_by_delta(instructors).items():
+        for chunk in _chunks(instructor_ids):
+            db.execute(
+                update(InstructorStatistics).where(
+                    InstructorStatistics.instructor_user_id.in_(chunk)
+                ).values({
+                    InstructorStatistics.total_students: func.coalesce(InstructorStatistics.total_students, 0) + delta,
+                    InstructorStatistics.last_updated: func.now()
+                })
+            )
+
+    for chunk in _chunks(courses):
+        seed_course_statistics(db, chunk)
+    for chunk in _chunks(students):
+        seed_student_statistics(db, chunk)
+    for chunk in _chunks(teaching):
+        seed_instructor_statistics(db, chunk)
+
+    return {
+        Statistics: set(courses),
+        StudentStatistics: set(students),
+        InstructorStatistics: teaching
+    }
+
+
+def record_completion_change(
+    db: Session,
+    student_user_id: int,
+    course_id: int,
+    was_completed: bool,
+    is_completed: bool,
+    old_days: int | None = None,
+    new_days: int | None = None
+):
+    """Move one enrollment between active and completed, and/or change its
+    completion time (old_days/new_days: see completion_days())."""
+    if was_completed == is_completed and old_days == new_days:
+        return
+
+    mark_dirty(db, DIRTY_COURSE, [course_id])
+    mark_dirty(db, DIRTY_STUDENT, [student_user_id])
+
+    d_completed = int(is_completed) - int(was_completed)
+    d_days = (new_days or 0) - (old_days or 0)
+    d_timed = int(new_days is not None) - int(old_days is not None)
+
+    updated = db.execute(
+        update(Statistics).where(
+            Statistics.course_id == course_id
+        ).values(_course_counters(0, -d_completed, d_days, d_timed))
+    ).rowcount
+    if not updated:
+        seed_course_statistics(db, [course_id])
+
+    if old_days is not None:
+        _bump_histogram(db, course_id, old_days, -1)
+    if new_days is not None:
+        _bump_histogram(db, course_id, new_days, 1)
+
+    if not d_completed:
+        return
+
+    updated = db.execute(
+        update(StudentStatistics).where(
+            StudentStatistics.student_user_id == student_user_id
+        ).values(_student_counters(0, d_completed))
+    ).rowcount
+    if not updated:
+        seed_student_statistics(db, [student_user_id])
+
+
+def _bump_histogram(db: Session, course_id: int, days: int, delta: int):
+    if delta > 0:
+        stmt = dialect_insert(db, CompletionTimeHistogram.__table__).values(
+            course_id=course_id,
+            days=days,
+            enrollments=delta
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["course_id", "days"],
+            set_={"enrollments": CompletionTimeHistogram.enrollments + stmt.excluded.enrollments}
+        ))
+        return
+
+    db.execute(
+        update(CompletionTimeHistogram).where(
+            CompletionTimeHistogram.course_id == course_id,
+            CompletionTimeHistogram.days == days
+        ).values(enrollments=CompletionTimeHistogram.enrollments + delta)
+    )
+    db.execute(
+        delete(CompletionTimeHistogram).where(
+            CompletionTimeHistogram.course_id == course_id,
+            CompletionTimeHistogram.days == days,
+            CompletionTimeHistogram.enrollments <= 0
+        )
+    )
+
+
+def record_student_removed(db: Session, student_user_id: int):
+    """Take a student's enrollments out of course and instructor counters.
+    Call before the student is deleted (their own row cascades away)."""
+
+    def courses(*conditions):
+        return select(Enrollment.course_id).where(
+            Enrollment.student_user_id == student_user_id,
+            *conditions
+        )
+
+    mark_dirty(db, DIRTY_COURSE, courses())
+    mark_dirty(db, DIRTY_INSTRUCTOR, select(Teaching.instructor_user_id).where(
+        Teaching.course_id.in_(courses())
+    ))
+
+    # The student's own completion time in the course being updated, if any
+    own_days = select(_completion_days()).where(
+        Enrollment.student_user_id == student_user_id,
+        Enrollment.course_id == Statistics.course_id
+    ).scalar_subquery()
+
+    db.execute(
+        update(Statistics).where(
+            Statistics.course_id.in_(courses(Enrollment.completion_status != "Completed"))
+        ).values(_course_counters(-1, -1))
+    )
+    db.execute(
+        update(Statistics).where(
+            Statistics.course_id.in_(courses(or_(
+                Enrollment.completion_status == "Completed",
+                Enrollment.completion_status.is_(None)
+            )))
+        ).values(_course_counters(
+            -1,
+            0,
+            -func.coalesce(own_days, 0),
+            -case((own_days.isnot(None), 1), else_=0)
+        ))
+    )
+
+    timed = select(Enrollment.course_id, _completion_days()).where(
+        Enrollment.student_user_id == student_user_id,
+        _completion_days().isnot(None)
+    )
+    histogram_key = tuple_(CompletionTimeHistogram.course_id, CompletionTimeHistogram.days)
+    db.execute(
+        update(CompletionTimeHistogram).where(
+            histogram_key.in_(timed)
+        ).values(enrollments=CompletionTimeHistogram.enrollments - 1)
+    )
+    db.execute(
+        delete(CompletionTimeHistogram).where(
+            CompletionTimeHistogram.course_id.in_(courses()),
+            CompletionTimeHistogram.enrollments <= 0
+        )
+    )
+
+    instructors = select(Teaching.instructor_user_id).join(
+        Enrollment,
+        Enrollment.course_id == Teaching.course_id
+    ).where(
+        Enrollment.student_user_id == student_user_id
+    )
+    db.execute(
+        update(InstructorStatistics).where(
+            InstructorStatistics.instructor_user_id.in_(instructors)
+        ).values({
+            InstructorStatistics.total_students: func.coalesce(InstructorStatistics.total_students, 0) - 1,
+            InstructorStatistics.last_updated: func.now()
+        })
+    )
+
+
+# ---------------- Set-based full counts -----------------
+# Column labels match the statistics tables so the selects can be upserted
+# or compared against stored rows directly.
+
+def course_counts_select(course_ids=None):
+    total = func.count(Enrollment.course_id)
+    completed = func.count(case((Enrollment.completion_status == "Completed", 1)))
+    days_sum = func.coalesce(func.sum(_completion_days()), 0)
+    timed = func.count(_completion_days())
+
+    query = select(
+        Course.course_id.label("course_id"),
+        total.label("total_enrollments"),
+        func.count(case((Enrollment.completion_status != "Completed", 1))).label("active_enrollments"),
+        case(
+            (total > 0, func.round(completed * HUNDRED / total, 2)),
+            else_=0
+        ).label("completion_rate"),
+        days_sum.label("completion_days_sum"),
+        timed.label("completion_count"),
+        case(
+            (timed > 0, func.round(days_sum * ONE / timed))
+        ).label("average_completion_time")
+    ).select_from(Course).outerjoin(
+        Enrollment,
+        Enrollment.course_id == Course.course_id
+    ).group_by(Course.course_id)
+
+    if course_ids is not None:
+        query = query.where(Course.course_id.in_(course_ids))
+    return query
+
+
+def student_counts_select(student_ids=None):
+    total = func.count(Enrollment.course_id)
+    completed = func.count(case((Enrollment.completion_status == "Completed", 1)))
+
+    query = select(
+        Student.user_id.label("student_user_id"),
+        total.label("total_enrollments"),
+        completed.label("completed_courses"),
+        (total - completed).label("active_courses")
+    ).select_from(Student).outerjoin(
+        Enrollment,
+        Enrollment.student_user_id == Student.user_id
+    ).group_by(Student.user_id)
+
+    if student_ids is not None:
+        query = query.where(Student.user_id.in_(student_ids))
+    return query
+
+
+def instructor_counts_select(instructor_ids=None):
+    courses = select(
+        Teaching.instructor_user_id,
+        func.count().label("courses")
+    ).group_by(Teaching.instructor_user_id)
+
+    students = select(
+        Teaching.instructor_user_id,
+        func.count(distinct(Enrollment.student_user_id)).label("students")
+    ).join(
+        Enrollment,
+        Enrollment.course_id == Teaching.course_id
+    ).group_by(Teaching.instructor_user_id)
+
+    # Restrict the aggregates too, not just the outer rows, so a per-id
+    # count only scans those instructors' teaching rows
+    if instructor_ids is not None:
+        courses = courses.where(Teaching.instructor_user_id.in_(instructor_ids))
+        students = students.where(Teaching.instructor_user_id.in_(instructor_ids))
+
+    courses = courses.subquery()
+    students = students.subquery()
+
+    query = select(
+        Instructor.user_id.label("instructor_user_id"),
+        func.coalesce(courses.c.courses, 0).label("total_courses_taught"),
+        func.coalesce(students.c.students, 0).label("total_students")
+    ).select_from(Instructor).outerjoin(
+        courses,
+        courses.c.instructor_user_id == Instructor.user_id
+    ).outerjoin(
+        students,
+        students.c.instructor_user_id == Instructor.user_id
+    )
+
+    if instructor_ids is not None:
+        query = query.where(Instructor.user_id.in_(instructor_ids))
+    return query
+
+
+def seed_course_statistics(db: Session, course_ids):
+    """Create missing course statistics rows from a full count."""
+    counts = course_counts_select(course_ids).subquery()
+    _insert_missing(db, Statistics, counts, counts.c.course_id, Statistics.course_id)
+
+
+def seed_student_statistics(db: Session, student_ids):
+    counts = student_counts_select(student_ids).subquery()
+    _insert_missing(db, StudentStatistics, counts, counts.c.student_user_id, StudentStatistics.student_user_id)
+
+
+def seed_instructor_statistics(db: Session, instructor_ids):
+    counts = instructor_counts_select(instructor_ids).subquery()
+    _insert_missing(db, InstructorStatistics, counts, counts.c.instructor_user_id, InstructorStatistics.instructor_user_id)
+
+
+def _insert_missing(db: Session, model, counts, counts_key, model_key):
+    columns = [column.name for column in counts.columns]
+    db.execute(
+        insert(model).from_select(
+            columns,
+            select(*counts.columns).where(
+                ~select(model_key).where(model_key == counts_key).exists()
+            )
+        )
+    )
+
+
+def rebuild_completion_histogram(db: Session, course_ids=None):
+    """Replace the completion-time histogram of the given courses (default:
+    all) with a full count. Does not commit."""
+    days = _completion_days()
+
+    clear = delete(CompletionTimeHistogram)
+    counts = select(
+        Enrollment.course_id,
+        days.label("days"),
+        func.count().label("enrollments")
+    ).where(
+        days.isnot(None)
+    ).group_by(Enrollment.course_id, days)
+
+    if course_ids is not None:
+        clear = clear.where(CompletionTimeHistogram.course_id.in_(course_ids))
+        counts = counts.where(Enrollment.course_id.in_(course_ids))
+
+    db.execute(clear)
+    db.execute(
+        insert(CompletionTimeHistogram).from_select(
+            ["course_id", "days", "enrollments"],
+            counts
+        )
+    )
+
+
+# ---------------- Dirty set -----------------
+# Ids whose statistics inputs changed, so a recompute can be limited to
+# them. Marks are written in the caller's transaction (no commit here).
+
+DIRTY_COURSE = "course"
+DIRTY_STUDENT = "student"
+DIRTY_INSTRUCTOR = "instructor"
+
+# after_commit topic for new (student_user_id, course_id) enrollments whose
+# deltas are applied in the background
+STATS_REFRESH = "statistics_refresh"
+
+
+def mark_dirty(db: Session, entity_type: str, ids):
+    """Mark ids (an iterable, or a SELECT of one id column) as dirty."""
+    stmt = dialect_insert(db, StatsDirty.__table__)
+
+    if isinstance(ids, Select):
+        # Distinct, as ON CONFLICT DO UPDATE may touch each row only once per
+        # statement; SQLite needs a WHERE to disambiguate ON CONFLICT after a SELECT
+        stmt = stmt.from_select(
+            ["entity_type", "entity_id"],
+            ids.with_only_columns(
+                literal(entity_type),
+                ids.selected_columns[0]
+            ).distinct().where(true())
+        )
+    else:
+        ids = sorted(set(ids))
+        if not ids:
+            return
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["entity_type", "entity_id"],
+        set_={
+            "version": StatsDirty.version + 1,
+            "marked_at": func.now()
+        }
+    )
+
+    if isinstance(ids, Select):
+        db.execute(stmt)
+    else:
+        # executemany, batched by the driver, so large id lists stay under
+        # the bind parameter limit
+        db.execute(stmt, [
+            {"entity_type": entity_type, "entity_id": entity_id, "version": 1}
+            for entity_id in ids
+        ])
+
+
+def mark_enrollment_dirty(db: Session, student_user_id: int, course_id: int):
+    """An enrollment changed: its course, student and the course's instructors."""
+    mark_dirty(db, DIRTY_COURSE, [course_id])
+    mark_dirty(db, DIRTY_STUDENT, [student_user_id])
+    mark_dirty(db, DIRTY_INSTRUCTOR, _taught_by(course_id))
+
+
+def get_dirty(db: Session, entity_type: str, ids=None):
+    """[(entity_id, version)] currently marked, optionally limited to ids"""
+    query = db.query(StatsDirty.entity_id, StatsDirty.version).filter(
+        StatsDirty.entity_type == entity_type
+    )
+    if ids is not None:
+        query = query.filter(StatsDirty.entity_id.in_(ids))
+
+    return query.all()
+
+
+def clear_dirty(db: Session, entity_type: str, claimed):
+    """Remove the given (entity_id, version) marks. Ids marked again since
+    they were read have a newer version and stay dirty."""
+    claimed = list(claimed)
+    if not claimed:
+        return
+
+    db.execute(
+        delete(StatsDirty).where(
+            StatsDirty.entity_type == entity_type,
+            tuple_(StatsDirty.entity_id, StatsDirty.version).in_(
+                [tuple(pair) for pair in claimed]
+            )
+        )
+    )
+
+
+def get_dirty_counts(db: Session):
+    return dict(
+        db.query(StatsDirty.entity_type, func.count()).group_by(StatsDirty.entity_type).all()
+    )
@@ -5,6 +5,7 @@ from app.models.student import Student
 from app.models.instructor import Instructor
 from app.models.administrator import Administrator
 from app.models.data_analyst import DataAnalyst
+from app.core.cache import notify_write, USER_WRITE
 
 # Create Base User
 def create_user(db: Session, user_data: dict) -> User:
@@ -12,6 +13,7 @@ def create_user(db: Session, user_data: dict) -> User:
 
     db.add(user)
     db.commit()
+    notify_write(USER_WRITE)
     db.refresh(user)
 
     return user
@@ -30,6 +32,7 @@ def create_student(db: Session, user_id: int, data: dict):
 
     db.add(student)
     db.commit()
+    notify_write(USER_WRITE)
 
 # Create Instructor Subclass
 def create_instructor(db: Session, user_id: int, data: dict):
@@ -37,6 +40,7 @@ def create_instructor(db: Session, user_id: int, data: dict):
 
     db.add(instructor)
     db.commit()
+    notify_write(USER_WRITE)
 
 # Create Administrator Subclass
 def create_administrator(db: Session, user_id: int, data: dict):
@@ -44,10 +48,12 @@ def create_administrator(db: Session, user_id: int, data: dict):
 
     db.add(admin)
     db.commit()
+    notify_write(USER_WRITE)
 
 # Create Data Analyst Subclass
 def create_data_analyst(db: Session, user_id: int, data: dict):
     analyst = DataAnalyst(user_id=user_id, **data)
 
     db.add(analyst)
-    db.commit()
\ No newline at end of file
+    db.commit()
+    notify_write(USER_WRITE)
\ No newline at end of file
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends
+from datetime import date
+
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 
 from app.database import get_db
@@ -7,7 +9,19 @@ from app.services.analyst_service import (
     get_all_courses_analytics_service,
     get_all_students_analytics_service,
     get_all_instructors_analytics_service,
-    get_course_detailed_analytics_service
+    get_course_detailed_analytics_service,
+    get_course_roster_service
+)
+from app.services.export_service import export_dataset_service
+from app.services.trend_service import get_trends_service
+from app.services.cohort_service import get_cohorts_service
+from app.services.distribution_service import (
+    get_distributions_service,
+    get_course_distributions_service
+)
+from app.services.snapshot_service import (
+    refresh_snapshots_service,
+    get_snapshot_status_service
 )
 from app.core.role_guards import require_role
 from app.core.roles import Role
@@ -30,24 +44,129 @@ def get_platform_overview(db: Session = Depends(get_db)):
     return get_platform_overview_service(db)
 
 
+# TRENDS
+@router.get("/trends")
+def get_trends(
+    bucket: str = Query("week"),
+    start: date | None = Query(None),
+    end: date | None = Query(None),
+    db: Session = Depends(get_db)
+):
+    """Get enrollments, completions and ratings per day, week or month"""
+    return get_trends_service(db, bucket, start, end)
+
+
+# COHORT RETENTION
+@router.get("/cohorts")
+def get_cohorts(
+    category: str | None = Query(None),
+    start: date | None = Query(None),
+    end: date | None = Query(None),
+    db: Session = Depends(get_db)
+):
+    """Get completion and progress retention curves per enrollment-week cohort
+    and course category"""
+    return get_cohorts_service(db, category, start, end)
+
+
+# DISTRIBUTIONS
+@router.get("/distributions")
+def get_distributions(db: Session = Depends(get_db)):
+    """Get rating histograms, grade distributions and completion-time
+    percentiles for every course and platform-wide"""
+    return get_distributions_service(db)
+
+
+# ANALYTICS SNAPSHOTS
+@router.get("/snapshots/status")
+def get_snapshot_status(db: Session = Depends(get_db)):
+    """Get when the analytics snapshots were last refreshed and how stale they are"""
+    return get_snapshot_status_service(db)
+
+
+@router.post("/snapshots/refresh")
+def refresh_snapshots(
+    full: bool = Query(False),
+    db: Session = Depends(get_db)
+):
+    """Refresh analytics snapshots (incrementally unless `full` is set)"""
+    return refresh_snapshots_service(db, full)
+
+
+# DATASET EXPORT
+@router.get("/export/{dataset}")
+def export_dataset(
+    dataset: str,
+    format: str = Query("csv"),
+    db: Session = Depends(get_db)
+):
+    """Stream courses, students, instructors or enrollments as CSV or NDJSON"""
+    return export_dataset_service(db, dataset, format)
+
+
 # COURSES ANALYTICS
 @router.get("/courses/analytics")
-def get_courses_analytics(db: Session = Depends(get_db)):
-    """Get analytics for all courses"""
-    return get_all_courses_analytics_service(db)
+def get_courses_analytics(
+    sort: str = Query("total_enrollments"),
+    order: str | None = Query(None),
+    limit: int | None = Query(None, ge=1, le=1000),
+    after: str | None = Query(None),
+    include_total: bool = Query(True),
+    db: Session = Depends(get_db)
+):
+    """Get analytics for all courses; pass `limit` and the returned `next_cursor`
+    as `after` to page through them"""
+    return get_all_courses_analytics_service(db, sort, order, limit, after, include_total)
 
 
 @router.get("/courses/{course_id}/detailed")
-def get_course_detailed_analytics(course_id: int, db: Session = Depends(get_db)):
-    """Get detailed analytics for a specific course including enrolled students"""
-    return get_course_detailed_analytics_service(db, course_id)
+def get_course_detailed_analytics(
+    course_id: int,
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Get detailed analytics for a specific course with the first page of
+    enrolled students"""
+    return get_course_detailed_analytics_service(db, course_id, limit)
+
+
+@router.get("/courses/{course_id}/students")
+def get_course_roster(
+    course_id: int,
+    completion_status: str | None = Query(None),
+    grade: str | None = Query(None),
+    sort: str = Query("name"),
+    order: str | None = Query(None),
+    limit: int = Query(50, ge=1, le=1000),
+    after: str | None = Query(None),
+    include_total: bool = Query(True),
+    db: Session = Depends(get_db)
+):
+    """Get a page of a course's enrolled students, filtered by completion
+    status and grade; pass the returned `next_cursor` as `after` for more"""
+    return get_course_roster_service(
+        db, course_id, completion_status, grade, sort, order, limit, after, include_total
+    )
+
+
+@router.get("/courses/{course_id}/distributions")
+def get_course_distributions(course_id: int, db: Session = Depends(get_db)):
+    """Get rating, grade and completion-time distributions for one course"""
+    return get_course_distributions_service(db, course_id)
 
 
 # STUDENTS ANALYTICS
 @router.get("/students/analytics")
-def get_students_analytics(db: Session = Depends(get_db)):
-    """Get analytics for all students on the platform"""
-    return get_all_students_analytics_service(db)
+def get_students_analytics(
+    sort: str = Query("total_enrollments"),
+    order: str | None = Query(None),
+    limit: int | None = Query(None, ge=1, le=1000),
+    after: str | None = Query(None),
+    include_total: bool = Query(True),
+    db: Session = Depends(get_db)
+):
+    """Get analytics for all students on the platform, ranked by `sort`"""
+    return get_all_students_analytics_service(db, sort, order, limit, after, include_total)
 
 
 # Analyst: Get individual student profile
@@ -78,6 +197,13 @@ def get_student_profile_for_analyst(
 
 # INSTRUCTORS ANALYTICS
 @router.get("/instructors/analytics")
-def get_instructors_analytics(db: Session = Depends(get_db)):
-    """Get analytics for all instructors on the platform"""
-    return get_all_instructors_analytics_service(db)
+def get_instructors_analytics(
+    sort: str = Query("total_courses_taught"),
+    order: str | None = Query(None),
+    limit: int | None = Query(None, ge=1, le=1000),
+    after: str | None = Query(None),
+    include_total: bool = Query(True),
+    db: Session = Depends(get_db)
+):
+    """Get analytics for all instructors on the platform, ranked by `sort`"""
+    return get_all_instructors_analytics_service(db, sort, order, limit, after, include_total)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 
 from app.database import get_db
@@ -11,11 +11,12 @@ from app.services.statistics_service import (
     update_student_statistics_service,
     update_instructor_statistics_service
 )
-from app.services.statistics_service import (
-    recompute_all_students_service,
-    recompute_all_instructors_service,
-    recompute_all_courses_service,
-    recompute_platform_service
+from app.services.statistics_service import get_dirty_counts_service
+from app.services.job_service import (
+    submit_job_service,
+    get_job_service,
+    list_jobs_service,
+    cancel_job_service
 )
 from app.core.dependencies import get_current_user
 from app.core.role_guards import require_role
@@ -175,25 +176,82 @@ def recompute_instructor_stats(
 
 
 # ---------------- Batch Recompute Endpoints ----------------
-@router.post('/recompute/students')
-def recompute_all_students(db: Session = Depends(get_db)):
+# These run as background jobs: each returns the queued job at once, and
+# /analytics/jobs/{job_id} reports progress and the final result.
+
+BULK_QUERY = Query(True, description="One set-based statement per table instead of per-row updates")
+ONLY_DIRTY_QUERY = Query(False, description="Only recompute ids whose enrollments or teaching changed")
+
+
+@router.post('/recompute/students', status_code=202)
+def recompute_all_students(
+    bulk: bool = BULK_QUERY,
+    only_dirty: bool = ONLY_DIRTY_QUERY,
+    db: Session = Depends(get_db)
+):
     """Recompute stats for all students (only where Student record exists)."""
-    return recompute_all_students_service(db)
+    return submit_job_service(db, "recompute_students", {"bulk": bulk, "only_dirty": only_dirty})
 
 
-@router.post('/recompute/instructors')
-def recompute_all_instructors(db: Session = Depends(get_db)):
+@router.post('/recompute/instructors', status_code=202)
+def recompute_all_instructors(
+    bulk: bool = BULK_QUERY,
+    only_dirty: bool = ONLY_DIRTY_QUERY,
+    db: Session = Depends(get_db)
+):
     """Recompute stats for all instructors (only where Instructor record exists)."""
-    return recompute_all_instructors_service(db)
+    return submit_job_service(db, "recompute_instructors", {"bulk": bulk, "only_dirty": only_dirty})
 
 
-@router.post('/recompute/courses')
-def recompute_all_courses(db: Session = Depends(get_db)):
+@router.post('/recompute/courses', status_code=202)
+def recompute_all_courses(
+    bulk: bool = BULK_QUERY,
+    only_dirty: bool = ONLY_DIRTY_QUERY,
+    db: Session = Depends(get_db)
+):
     """Recompute stats for all courses."""
-    return recompute_all_courses_service(db)
+    return submit_job_service(db, "recompute_courses", {"bulk": bulk, "only_dirty": only_dirty})
 
 
-@router.post('/recompute/platform')
-def recompute_platform(db: Session = Depends(get_db)):
+@router.post('/recompute/platform', status_code=202)
+def recompute_platform(
+    bulk: bool = BULK_QUERY,
+    only_dirty: bool = ONLY_DIRTY_QUERY,
+    db: Session = Depends(get_db)
+):
     """Recompute statistics for the entire platform (students, instructors, courses)."""
-    return recompute_platform_service(db)
\ No newline at end of file
+    return submit_job_service(db, "recompute_platform", {"bulk": bulk, "only_dirty": only_dirty})
+
+
+@router.get('/recompute/dirty')
+def get_dirty_counts(db: Session = Depends(get_db)):
+    """Ids waiting for an only_dirty recompute, per table."""
+    return get_dirty_counts_service(db)
+
+
+@router.post('/reconcile', status_code=202)
+def reconcile_statistics(db: Session = Depends(get_db)):
+    """Correct drift in the incrementally maintained statistics counters."""
+    return submit_job_service(db, "reconcile_statistics")
+
+
+# ---------------- Background Jobs ----------------
+
+@router.get('/jobs')
+def list_jobs(
+    kind: str | None = None,
+    status: str | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    return list_jobs_service(db, kind, status, limit)
+
+
+@router.get('/jobs/{job_id}')
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    return get_job_service(db, job_id)
+
+
+@router.post('/jobs/{job_id}/cancel')
+def cancel_job(job_id: int, db: Session = Depends(get_db)):
+    return cancel_job_service(db, job_id)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Body
+from fastapi import APIRouter, Depends, Body, Request
 from sqlalchemy.orm import Session
 
 from app.database import get_db
@@ -13,6 +13,8 @@ from app.schemas.enrollment_schema import (
 )
 from app.services.participation_service import (
     enroll_student_service,
+    bulk_enroll_service,
+    parse_bulk_enrollments,
     update_completion_service,
     rate_course_service,
     get_public_reviews_by_course_service,
@@ -25,6 +27,8 @@ from app.services.participation_service import (
 
 # 🔐 Auth Dependency (JWT Payload)
 from app.core.dependencies import get_current_user
+from app.core.role_guards import require_role
+from app.core.roles import Role
 
 # Router Config
 router = APIRouter(
@@ -46,6 +50,23 @@ def enroll_student(
         current_user
     )
 
+# BULK ENROLL (roster import, admin only)
+async def _bulk_rows(request: Request) -> list[dict]:
+    return parse_bulk_enrollments(
+        await request.body(),
+        request.headers.get("content-type", "application/json")
+    )
+
+
+@router.post("/bulk")
+def bulk_enroll_students(
+    rows: list[dict] = Depends(_bulk_rows),
+    db: Session = Depends(get_db),
+    admin = Depends(require_role([Role.ADMIN]))
+):
+    """Enroll students from a JSON array or CSV (student_user_id,course_id)."""
+    return bulk_enroll_service(db, rows)
+
 # UPDATE COMPLETION
 @router.put("/complete/{student_user_id}/{course_id}")
 def update_completion(
@@ -2,6 +2,7 @@
 
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy import select
 from datetime import datetime
 
 # Models
@@ -16,6 +17,8 @@ from app.models.student import Student
 from app.models.instructor import Instructor
 from app.models.administrator import Administrator
 from app.models.data_analyst import DataAnalyst
+from app.repositories import statistics_repo
+from app.core.cache import notify_write, ENROLLMENT_WRITE, TEACHING_WRITE, COURSE_WRITE, USER_WRITE
 
 
 # ============================================================
@@ -296,7 +299,9 @@ def approve_course_service(db: Session, course_id: int, admin_user_id: int):
                 role_in_course="Lead Instructor"
             )
             db.add(teaching)
+            statistics_repo.mark_dirty(db, statistics_repo.DIRTY_INSTRUCTOR, [course.created_by])
             db.commit()
+            notify_write(TEACHING_WRITE, (course.created_by, course_id))
             instructor_assigned = True
     
     db.refresh(course)
@@ -367,8 +372,19 @@ def delete_course_request_service(db: Session, course_id: int):
         )
     
     course_id_deleted = course.course_id
+
+    # Enrollments and teaching assignments cascade with the course
+    statistics_repo.mark_dirty(db, statistics_repo.DIRTY_STUDENT, select(Enrollment.student_user_id).where(
+        Enrollment.course_id == course_id
+    ))
+    statistics_repo.mark_dirty(db, statistics_repo.DIRTY_INSTRUCTOR, select(Teaching.instructor_user_id).where(
+        Teaching.course_id == course_id
+    ))
     db.delete(course)
     db.commit()
+    notify_write(COURSE_WRITE, course_id_deleted)
+    notify_write(ENROLLMENT_WRITE)
+    notify_write(TEACHING_WRITE)
     
     return {
         "message": "Course request deleted successfully",
@@ -436,6 +452,8 @@ def delete_user_service(db: Session, user_id: int):
     # --------------------------------------------------------
 
     if user.student:
+        # Enrollments cascade with the student; take them out of the counters first
+        statistics_repo.record_student_removed(db, user_id)
         db.delete(user.student)
 
     if user.instructor:
@@ -454,6 +472,11 @@ def delete_user_service(db: Session, user_id: int):
     db.delete(user)
     db.commit()
 
+    # Enrollments and teaching assignments cascade with the user
+    notify_write(USER_WRITE)
+    notify_write(ENROLLMENT_WRITE)
+    notify_write(TEACHING_WRITE)
+
     return {
         "message": f"User {user_id} deleted successfully"
     }
@@ -481,7 +504,9 @@ def remove_instructor_service(
         )
 
     db.delete(teaching)
+    statistics_repo.mark_dirty(db, statistics_repo.DIRTY_INSTRUCTOR, [instructor_user_id])
     db.commit()
+    notify_write(TEACHING_WRITE, (instructor_user_id, course_id))
 
     return {
         "message": "Instructor removed from course"
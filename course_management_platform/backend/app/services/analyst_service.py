@@ -1,5 +1,7 @@
+import os
+
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case
 from fastapi import HTTPException
 
 from app.models.course import Course
@@ -11,25 +13,68 @@ from app.models.user import User
 from app.models.statistics import Statistics
 from app.models.student_statistics import StudentStatistics
 from app.models.instructor_statistics import InstructorStatistics
+from app.models.analytics_snapshot import (
+    CourseAnalyticsSnapshot,
+    StudentAnalyticsSnapshot,
+    InstructorAnalyticsSnapshot,
+    AnalyticsRefreshState
+)
+from app.services.snapshot_service import ensure_fresh_snapshots, SNAPSHOT_STATE_NAME
+from app.services.query_executor import run_concurrently
+from app.utils.pagination import resolve_sort, paginate_keyset
+from app.core.cache import (
+    TTLCache,
+    on_write,
+    ENROLLMENT_WRITE,
+    COMPLETION_WRITE,
+    COURSE_WRITE,
+    USER_WRITE
+)
 
 
 # ============================================================
 # PLATFORM OVERVIEW
 # ============================================================
 
+# Seconds the overview is served from cache. Only writes that change its
+# counts invalidate it earlier: enrollments added or removed, completion
+# changes, and course or user writes; progress, grade and rating writes don't
+OVERVIEW_CACHE = TTLCache(float(os.getenv("ANALYTICS_CACHE_TTL", 60)))
+
+for _event in (ENROLLMENT_WRITE, COMPLETION_WRITE, COURSE_WRITE, USER_WRITE):
+    on_write(_event, OVERVIEW_CACHE.invalidate)
+
+
 def get_platform_overview_service(db: Session):
     """Get overall platform statistics"""
+    overview = OVERVIEW_CACHE.get_or_compute(
+        "platform_overview",
+        lambda: _compute_platform_overview(db)
+    )
+    return dict(overview)
+
+
+def _compute_platform_overview(db: Session):
+    
+    # Independent counts, run side by side on separate connections
+    counts = run_concurrently(db, {
+        "courses": lambda s: s.query(func.count(Course.course_id)).scalar(),
+        "students": lambda s: s.query(func.count(Student.user_id)).scalar(),
+        "instructors": lambda s: s.query(func.count(Instructor.user_id)).scalar(),
+        "enrollments": lambda s: s.query(func.count(Enrollment.student_user_id)).scalar(),
+        "completed": lambda s: s.query(func.count(Enrollment.student_user_id)).filter(
+            Enrollment.completion_status == "Completed"
+        ).scalar()
+    })
     
     # Total counts
-    total_courses = db.query(func.count(Course.course_id)).scalar() or 0
-    total_students = db.query(func.count(Student.user_id)).scalar() or 0
-    total_instructors = db.query(func.count(Instructor.user_id)).scalar() or 0
-    total_enrollments = db.query(func.count(Enrollment.student_user_id)).scalar() or 0
+    total_courses = counts["courses"] or 0
+    total_students = counts["students"] or 0
+    total_instructors = counts["instructors"] or 0
+    total_enrollments = counts["enrollments"] or 0
     
     # Completion stats
-    completed_enrollments = db.query(func.count(Enrollment.student_user_id)).filter(
-        Enrollment.completion_status == "Completed"
-    ).scalar() or 0
+    completed_enrollments = counts["completed"] or 0
     
     active_enrollments = total_enrollments - completed_enrollments
     
@@ -59,110 +104,134 @@ def get_platform_overview_service(db: Session):
 # COURSES ANALYTICS
 # ============================================================
 
-def get_all_courses_analytics_service(db: Session):
-    """Get analytics for all courses"""
+# Sort keys accepted by the courses analytics endpoint → descending by default?
+COURSE_SORT_KEYS = {
+    "total_enrollments": True,
+    "completed_enrollments": True,
+    "completion_rate": True,
+    "average_rating": True,
+    "total_instructors": True,
+    "title": False
+}
+
+
+def get_all_courses_analytics_service(
+    db: Session,
+    sort: str = "total_enrollments",
+    order: str | None = None,
+    limit: int | None = None,
+    after: str | None = None,
+    include_total: bool = True
+):
+    """Get analytics for all courses (keyset-paginated when `limit` is set)"""
+    
+    sort, descending = resolve_sort(sort, order, COURSE_SORT_KEYS)
+    
+    ensure_fresh_snapshots(db)
+    
+    sort_columns = {
+        "total_enrollments": CourseAnalyticsSnapshot.total_enrollments,
+        "completed_enrollments": CourseAnalyticsSnapshot.completed_enrollments,
+        "completion_rate": CourseAnalyticsSnapshot.completion_rate,
+        "average_rating": CourseAnalyticsSnapshot.average_rating,
+        "total_instructors": CourseAnalyticsSnapshot.total_instructors,
+        "title": Course.title
+    }
     
-    courses = db.query(Course).all()
+    query = db.query(
+        Course.course_id,
+        Course.title,
+        Course.category,
+        Course.level,
+        Course.description,
+        CourseAnalyticsSnapshot.total_enrollments,
+        CourseAnalyticsSnapshot.completed_enrollments,
+        CourseAnalyticsSnapshot.average_rating,
+        CourseAnalyticsSnapshot.total_instructors
+    ).select_from(
+        CourseAnalyticsSnapshot
+    ).join(
+        Course,
+        Course.course_id == CourseAnalyticsSnapshot.course_id
+    )
     
-    if not courses:
-        return {"courses": []}
+    rows, next_cursor = paginate_keyset(
+        query, sort_columns[sort], Course.course_id, sort, descending, limit, after
+    )
     
     courses_data = []
     
-    for course in courses:
-        # Count enrollments
-        total_enrollments = db.query(func.count(Enrollment.student_user_id)).filter(
-            Enrollment.course_id == course.course_id
-        ).scalar() or 0
-        
-        completed = db.query(func.count(Enrollment.student_user_id)).filter(
-            Enrollment.course_id == course.course_id,
-            Enrollment.completion_status == "Completed"
-        ).scalar() or 0
-        
-        active = total_enrollments - completed
+    for row in rows:
+        total = row.total_enrollments
+        completed = row.completed_enrollments
         
         # Completion rate
         completion_rate = 0
-        if total_enrollments > 0:
-            completion_rate = round((completed / total_enrollments) * 100, 2)
+        if total > 0:
+            completion_rate = round((completed / total) * 100, 2)
         
-        # Get average rating
-        avg_rating = db.query(func.avg(Enrollment.rating)).filter(
-            Enrollment.course_id == course.course_id,
-            Enrollment.rating.isnot(None)
-        ).scalar()
-        
-        avg_rating = round(float(avg_rating), 2) if avg_rating else 0
-        
-        # Get instructors
-        instructors = db.query(Teaching).filter(
-            Teaching.course_id == course.course_id
-        ).count()
+        avg_rating = float(row.average_rating) if row.average_rating else 0
         
         courses_data.append({
-            "course_id": course.course_id,
-            "title": course.title,
-            "category": course.category,
-            "level": course.level,
-            "description": course.description,
-            "total_enrollments": total_enrollments,
+            "course_id": row.course_id,
+            "title": row.title,
+            "category": row.category,
+            "level": row.level,
+            "description": row.description,
+            "total_enrollments": total,
             "completed_enrollments": completed,
-            "active_enrollments": active,
+            "active_enrollments": total - completed,
             "completion_rate": completion_rate,
             "average_rating": avg_rating,
-            "total_instructors": instructors
+            "total_instructors": row.total_instructors
         })
     
-    # Sort by total enrollments descending
-    courses_data.sort(key=lambda x: x["total_enrollments"], reverse=True)
+    total_courses = None
+    if include_total:
+        total_courses = db.query(func.count(CourseAnalyticsSnapshot.course_id)).scalar() or 0
     
     return {
-        "total_courses": len(courses_data),
-        "courses": courses_data
+        "total_courses": total_courses,
+        "courses": courses_data,
+        "next_cursor": next_cursor,
+        "snapshot_refreshed_at": _snapshot_refreshed_at(db)
     }
 
 
-def get_course_detailed_analytics_service(db: Session, course_id: int):
-    """Get detailed analytics for a specific course including enrolled students"""
+# Sort keys accepted by the course roster endpoint → descending by default?
+ROSTER_SORT_KEYS = {
+    "name": False,
+    "student_user_id": False
+}
+
+# Roster rows embedded in the detailed course response
+ROSTER_PREVIEW_SIZE = 50
+
+
+def get_course_detailed_analytics_service(
+    db: Session,
+    course_id: int,
+    limit: int = ROSTER_PREVIEW_SIZE
+):
+    """Get detailed analytics for a specific course with the first page of
+    its student roster (use the roster endpoint and `next_cursor` for more)"""
     
     course = db.query(Course).filter(Course.course_id == course_id).first()
     
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     
-    # Get enrollments with student details
-    enrollments = db.query(
-        Enrollment,
-        User
-    ).join(
-        User,
-        User.user_id == Enrollment.student_user_id
+    # Header counts in one aggregate query
+    totals = db.query(
+        func.count(),
+        func.sum(case((Enrollment.completion_status == "Completed", 1), else_=0)),
+        func.avg(Enrollment.rating)
     ).filter(
         Enrollment.course_id == course_id
-    ).all()
+    ).one()
     
-    students_data = []
-    total_enrollments = 0
-    completed_count = 0
-    
-    for enrollment, user in enrollments:
-        total_enrollments += 1
-        if enrollment.completion_status == "Completed":
-            completed_count += 1
-        
-        students_data.append({
-            "student_user_id": user.user_id,
-            "student_name": user.name,
-            "student_email": user.email,
-            "enrollment_date": enrollment.enrollment_date.isoformat() if enrollment.enrollment_date else None,
-            "completion_status": enrollment.completion_status,
-            "completion_date": enrollment.completion_date.isoformat() if enrollment.completion_date else None,
-            "rating": enrollment.rating,
-            "review_text": enrollment.review_text,
-            "grade": enrollment.grade,
-            "progress": f"{enrollment.current_topic or 0}"
-        })
+    total_enrollments = totals[0] or 0
+    completed_count = int(totals[1] or 0)
     
     # Get instructors
     instructors = db.query(Teaching, User).join(
@@ -186,6 +255,8 @@ def get_course_detailed_analytics_service(db: Session, course_id: int):
     if total_enrollments > 0:
         completion_rate = round((completed_count / total_enrollments) * 100, 2)
     
+    students_data, next_cursor = _course_roster_page(db, course_id, limit=limit)
+    
     return {
         "course_id": course.course_id,
         "title": course.title,
@@ -197,72 +268,206 @@ def get_course_detailed_analytics_service(db: Session, course_id: int):
         "completed_enrollments": completed_count,
         "active_enrollments": total_enrollments - completed_count,
         "completion_rate": completion_rate,
+        "average_rating": round(float(totals[2]), 2) if totals[2] is not None else 0,
         "instructors": instructors_data,
-        "students": students_data
+        "students": students_data,
+        "students_next_cursor": next_cursor
     }
 
 
+def get_course_roster_service(
+    db: Session,
+    course_id: int,
+    completion_status: str | None = None,
+    grade: str | None = None,
+    sort: str = "name",
+    order: str | None = None,
+    limit: int = ROSTER_PREVIEW_SIZE,
+    after: str | None = None,
+    include_total: bool = True
+):
+    """Get one keyset page of a course's enrolled students, optionally
+    filtered by completion status and grade"""
+    
+    sort, descending = resolve_sort(sort, order, ROSTER_SORT_KEYS)
+    
+    course_exists = db.query(Course.course_id).filter(Course.course_id == course_id).first()
+    if not course_exists:
+        raise HTTPException(status_code=404, detail="Course not found")
+    
+    students_data, next_cursor = _course_roster_page(
+        db, course_id, completion_status, grade, sort, descending, limit, after
+    )
+    
+    total_students = None
+    if include_total:
+        total_students = _roster_filters(
+            db.query(func.count()).select_from(Enrollment),
+            course_id, completion_status, grade
+        ).scalar() or 0
+    
+    return {
+        "course_id": course_id,
+        "total_students": total_students,
+        "students": students_data,
+        "next_cursor": next_cursor
+    }
+
+
+def _course_roster_page(
+    db: Session,
+    course_id: int,
+    completion_status: str | None = None,
+    grade: str | None = None,
+    sort: str = "name",
+    descending: bool = False,
+    limit: int = ROSTER_PREVIEW_SIZE,
+    after: str | None = None
+):
+    sort_columns = {
+        "name": User.name,
+        "student_user_id": User.user_id
+    }
+    
+    query = _roster_filters(
+        db.query(
+            User.user_id,
+            User.name,
+            User.email,
+            Enrollment.enrollment_date,
+            Enrollment.completion_status,
+            Enrollment.completion_date,
+            Enrollment.rating,
+            Enrollment.review_text,
+            Enrollment.grade,
+            Enrollment.current_topic
+        ).select_from(
+            Enrollment
+        ).join(
+            User,
+            User.user_id == Enrollment.student_user_id
+        ),
+        course_id, completion_status, grade
+    )
+    
+    rows, next_cursor = paginate_keyset(
+        query, sort_columns[sort], User.user_id, sort, descending, limit, after,
+        scope={"course_id": course_id, "completion_status": completion_status, "grade": grade}
+    )
+    
+    students_data = []
+    for row in rows:
+        students_data.append({
+            "student_user_id": row.user_id,
+            "student_name": row.name,
+            "student_email": row.email,
+            "enrollment_date": row.enrollment_date.isoformat() if row.enrollment_date else None,
+            "completion_status": row.completion_status,
+            "completion_date": row.completion_date.isoformat() if row.completion_date else None,
+            "rating": row.rating,
+            "review_text": row.review_text,
+            "grade": row.grade,
+            "progress": f"{row.current_topic or 0}"
+        })
+    
+    return students_data, next_cursor
+
+
+def _roster_filters(query, course_id: int, completion_status: str | None, grade: str | None):
+    query = query.filter(Enrollment.course_id == course_id)
+    if completion_status is not None:
+        query = query.filter(Enrollment.completion_status == completion_status)
+    if grade is not None:
+        query = query.filter(Enrollment.grade == grade)
+    return query
+
+
 # ============================================================
 # STUDENTS ANALYTICS
 # ============================================================
 
-def get_all_students_analytics_service(db: Session):
-    """Get analytics for all students on the platform"""
+# Sort keys accepted by the students analytics endpoint → descending by default?
+STUDENT_SORT_KEYS = {
+    "total_enrollments": True,
+    "completed_courses": True,
+    "active_courses": True,
+    "average_rating": True,
+    "name": False
+}
+
+
+def get_all_students_analytics_service(
+    db: Session,
+    sort: str = "total_enrollments",
+    order: str | None = None,
+    limit: int | None = None,
+    after: str | None = None,
+    include_total: bool = True
+):
+    """Get analytics for all students on the platform (keyset-paginated when `limit` is set)"""
+    
+    sort, descending = resolve_sort(sort, order, STUDENT_SORT_KEYS)
+    
+    ensure_fresh_snapshots(db)
+    
+    sort_columns = {
+        "total_enrollments": StudentAnalyticsSnapshot.total_enrollments,
+        "completed_courses": StudentAnalyticsSnapshot.completed_courses,
+        "active_courses": StudentAnalyticsSnapshot.active_courses,
+        "average_rating": StudentAnalyticsSnapshot.average_rating,
+        "name": User.name
+    }
     
-    students = db.query(User).filter(User.role == "Student").all()
+    query = db.query(
+        User.user_id,
+        User.name,
+        User.email,
+        StudentAnalyticsSnapshot.total_enrollments,
+        StudentAnalyticsSnapshot.completed_courses,
+        StudentAnalyticsSnapshot.active_courses,
+        StudentAnalyticsSnapshot.average_rating,
+        StudentStatistics.last_updated
+    ).select_from(
+        StudentAnalyticsSnapshot
+    ).join(
+        User,
+        User.user_id == StudentAnalyticsSnapshot.student_user_id
+    ).outerjoin(
+        StudentStatistics,
+        StudentStatistics.student_user_id == User.user_id
+    )
     
-    if not students:
-        return {"students": []}
+    rows, next_cursor = paginate_keyset(
+        query, sort_columns[sort], User.user_id, sort, descending, limit, after
+    )
     
     students_data = []
     
-    for student in students:
-        # Get enrollment stats
-        total_enrollments = db.query(func.count(Enrollment.course_id)).filter(
-            Enrollment.student_user_id == student.user_id
-        ).scalar() or 0
-        
-        completed = db.query(func.count(Enrollment.course_id)).filter(
-            Enrollment.student_user_id == student.user_id,
-            Enrollment.completion_status == "Completed"
-        ).scalar() or 0
-        
-        active = total_enrollments - completed
-        
-        # Get average rating given
-        avg_rating = db.query(func.avg(Enrollment.rating)).filter(
-            Enrollment.student_user_id == student.user_id,
-            Enrollment.rating.isnot(None)
-        ).scalar()
+    for row in rows:
+        avg_rating = float(row.average_rating) if row.average_rating else 0
         
-        avg_rating = round(float(avg_rating), 2) if avg_rating else 0
-        
-        # Get statistics from StudentStatistics table
-        stats = db.query(StudentStatistics).filter(
-            StudentStatistics.student_user_id == student.user_id
-        ).first()
-        
-        last_updated = None
-        if stats:
-            last_updated = stats.last_updated.isoformat() if stats.last_updated else None
+        last_updated = row.last_updated.isoformat() if row.last_updated else None
         
         students_data.append({
-            "student_user_id": student.user_id,
-            "name": student.name,
-            "email": student.email,
-            "total_enrollments": total_enrollments,
-            "completed_courses": completed,
-            "active_courses": active,
+            "student_user_id": row.user_id,
+            "name": row.name,
+            "email": row.email,
+            "total_enrollments": row.total_enrollments,
+            "completed_courses": row.completed_courses,
+            "active_courses": row.active_courses,
             "average_rating": avg_rating,
             "last_stats_update": last_updated
         })
     
-    # Sort by total enrollments descending
-    students_data.sort(key=lambda x: x["total_enrollments"], reverse=True)
+    total_students = None
+    if include_total:
+        total_students = db.query(func.count(StudentAnalyticsSnapshot.student_user_id)).scalar() or 0
     
     return {
-        "total_students": len(students_data),
-        "students": students_data
+        "total_students": total_students,
+        "students": students_data,
+        "next_cursor": next_cursor,
+        "snapshot_refreshed_at": _snapshot_refreshed_at(db)
     }
 
 
@@ -270,78 +475,94 @@ def get_all_students_analytics_service(db: Session):
 # INSTRUCTORS ANALYTICS
 # ============================================================
 
-def get_all_instructors_analytics_service(db: Session):
-    """Get analytics for all instructors on the platform"""
+# Sort keys accepted by the instructors analytics endpoint → descending by default?
+INSTRUCTOR_SORT_KEYS = {
+    "total_courses_taught": True,
+    "total_students": True,
+    "average_course_completion_rate": True,
+    "name": False
+}
+
+
+def get_all_instructors_analytics_service(
+    db: Session,
+    sort: str = "total_courses_taught",
+    order: str | None = None,
+    limit: int | None = None,
+    after: str | None = None,
+    include_total: bool = True
+):
+    """Get analytics for all instructors on the platform (keyset-paginated when `limit` is set)"""
+    
+    sort, descending = resolve_sort(sort, order, INSTRUCTOR_SORT_KEYS)
+    
+    ensure_fresh_snapshots(db)
+    
+    sort_columns = {
+        "total_courses_taught": InstructorAnalyticsSnapshot.total_courses_taught,
+        "total_students": InstructorAnalyticsSnapshot.total_students,
+        "average_course_completion_rate": InstructorAnalyticsSnapshot.average_course_completion_rate,
+        "name": User.name
+    }
     
-    instructors = db.query(User).filter(User.role == "Instructor").all()
+    query = db.query(
+        User.user_id,
+        User.name,
+        User.email,
+        InstructorAnalyticsSnapshot.total_courses_taught,
+        InstructorAnalyticsSnapshot.total_students,
+        InstructorAnalyticsSnapshot.average_course_completion_rate,
+        InstructorStatistics.last_updated
+    ).select_from(
+        InstructorAnalyticsSnapshot
+    ).join(
+        User,
+        User.user_id == InstructorAnalyticsSnapshot.instructor_user_id
+    ).outerjoin(
+        InstructorStatistics,
+        InstructorStatistics.instructor_user_id == User.user_id
+    )
     
-    if not instructors:
-        return {"instructors": []}
+    rows, next_cursor = paginate_keyset(
+        query, sort_columns[sort], User.user_id, sort, descending, limit, after
+    )
     
     instructors_data = []
     
-    for instructor in instructors:
-        # Get teaching stats
-        total_courses = db.query(func.count(Teaching.course_id)).filter(
-            Teaching.instructor_user_id == instructor.user_id
-        ).scalar() or 0
-        
-        # Get total students across all courses taught
-        total_students = db.query(func.count(Enrollment.student_user_id)).join(
-            Teaching,
-            Teaching.course_id == Enrollment.course_id
-        ).filter(
-            Teaching.instructor_user_id == instructor.user_id
-        ).scalar() or 0
+    for row in rows:
+        avg_completion_rate = float(row.average_course_completion_rate)
         
-        # Get average course completion for courses taught
-        courses = db.query(Teaching.course_id).filter(
-            Teaching.instructor_user_id == instructor.user_id
-        ).all()
-        
-        avg_completion_rate = 0
-        if courses:
-            completion_rates = []
-            for (course_id,) in courses:
-                enrollments = db.query(func.count(Enrollment.student_user_id)).filter(
-                    Enrollment.course_id == course_id
-                ).scalar() or 0
-                
-                completed = db.query(func.count(Enrollment.student_user_id)).filter(
-                    Enrollment.course_id == course_id,
-                    Enrollment.completion_status == "Completed"
-                ).scalar() or 0
-                
-                if enrollments > 0:
-                    rate = (completed / enrollments) * 100
-                    completion_rates.append(rate)
-            
-            if completion_rates:
-                avg_completion_rate = round(sum(completion_rates) / len(completion_rates), 2)
-        
-        # Get statistics from InstructorStatistics table
-        stats = db.query(InstructorStatistics).filter(
-            InstructorStatistics.instructor_user_id == instructor.user_id
-        ).first()
-        
-        last_updated = None
-        if stats:
-            last_updated = stats.last_updated.isoformat() if stats.last_updated else None
+        last_updated = row.last_updated.isoformat() if row.last_updated else None
         
         instructors_data.append({
-            "instructor_user_id": instructor.user_id,
-            "name": instructor.name,
-            "email": instructor.email,
-            "total_courses_taught": total_courses,
-            "total_students": total_students,
+            "instructor_user_id": row.user_id,
+            "name": row.name,
+            "email": row.email,
+            "total_courses_taught": row.total_courses_taught,
+            "total_students": row.total_students,
             "average_course_completion_rate": avg_completion_rate,
             "last_stats_update": last_updated
         })
     
-    # Sort by total courses taught descending
-    instructors_data.sort(key=lambda x: x["total_courses_taught"], reverse=True)
+    total_instructors = None
+    if include_total:
+        total_instructors = db.query(func.count(InstructorAnalyticsSnapshot.instructor_user_id)).scalar() or 0
     
     return {
-        "total_instructors": len(instructors_data),
-        "instructors": instructors_data
+        "total_instructors": total_instructors,
+        "instructors": instructors_data,
+        "next_cursor": next_cursor,
+        "snapshot_refreshed_at": _snapshot_refreshed_at(db)
     }
+
+
+# ============================================================
+# HELPERS
+# ============================================================
+
+def _snapshot_refreshed_at(db: Session):
+    """ISO timestamp of the snapshot the list endpoints are serving"""
+    state = db.get(AnalyticsRefreshState, SNAPSHOT_STATE_NAME)
+    if not state or not state.last_refreshed_at:
+        return None
+    return state.last_refreshed_at.isoformat()
@@ -0,0 +1,278 @@
+import os
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, case
+from fastapi import HTTPException
+
+from app.models.course import Course
+from app.models.course_topic import CourseTopic
+from app.models.enrollment import Enrollment
+from app.models.cohort_snapshot import CohortSnapshot
+from app.utils.db_utils import date_bucket, dialect_insert
+
+
+# Weeks after the enrollment week that completion curves track
+COHORT_HORIZON_WEEKS = int(os.getenv("COHORT_HORIZON_WEEKS", 12))
+
+# Progress is reported as the share of a cohort reaching 25/50/75/100% of its topics
+PROGRESS_STEPS = 4
+
+UNCATEGORIZED = "Uncategorized"
+
+
+# ============================================================
+# COHORTS
+# ============================================================
+
+def get_cohorts_service(
+    db: Session,
+    category: str | None = None,
+    start: date | None = None,
+    end: date | None = None
+):
+    """Completion and progress retention curves per (enrollment week, category).
+
+    A cohort is closed once its whole horizon is in the past; closed cohorts
+    are computed once, persisted in cohort_snapshot and read back from there.
+    Only newer cohorts are recomputed on each request.
+    """
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+    closed_through = _closed_through()
+
+    persisted = db.query(CohortSnapshot).filter(
+        CohortSnapshot.horizon_weeks == COHORT_HORIZON_WEEKS
+    ).all()
+
+    # Everything after the newest persisted week is computed live
+    since = max((row.cohort_week for row in persisted), default=None)
+    if since is not None:
+        since += timedelta(weeks=1)
+
+    live = _compute_cohorts(db, since)
+
+    newly_closed = [cohort for cohort in live if cohort["cohort_week"] <= closed_through]
+    if newly_closed:
+        _persist_cohorts(db, newly_closed)
+
+    cohorts = [
+        {
+            "cohort_week": row.cohort_week,
+            "category": row.category,
+            "cohort_size": row.cohort_size,
+            "completion_curve": row.completion_curve,
+            "progress_curve": row.progress_curve
+        }
+        for row in persisted
+    ] + live
+
+    if category is not None:
+        cohorts = [c for c in cohorts if c["category"] == category]
+    if start:
+        cohorts = [c for c in cohorts if c["cohort_week"] >= start - timedelta(days=start.weekday())]
+    if end:
+        cohorts = [c for c in cohorts if c["cohort_week"] <= end]
+
+    cohorts.sort(key=lambda c: (c["cohort_week"], c["category"]))
+
+    return {
+        "horizon_weeks": COHORT_HORIZON_WEEKS,
+        "progress_steps": [round(100 * step / PROGRESS_STEPS) for step in range(1, PROGRESS_STEPS + 1)],
+        "closed_through": closed_through.isoformat(),
+        "cohorts": [
+            {
+                **cohort,
+                "cohort_week": cohort["cohort_week"].isoformat(),
+                "closed": cohort["cohort_week"] <= closed_through
+            }
+            for cohort in cohorts
+        ]
+    }
+
+
+def _closed_through() -> date:
+    """Latest cohort week whose horizon has fully elapsed (with a day's grace)."""
+    today = date.today() - timedelta(days=1)
+    this_week = today - timedelta(days=today.weekday())
+    return this_week - timedelta(weeks=COHORT_HORIZON_WEEKS + 1)
+
+
+def _persist_cohorts(db: Session, cohorts):
+    computed_at = datetime.utcnow()
+
+    stmt = dialect_insert(db, CohortSnapshot.__table__).values([
+        {
+            "cohort_week": cohort["cohort_week"],
+            "category": cohort["category"],
+            "horizon_weeks": COHORT_HORIZON_WEEKS,
+            "cohort_size": cohort["cohort_size"],
+            "completion_curve": cohort["completion_curve"],
+            "progress_curve": cohort["progress_curve"],
+            "computed_at": computed_at
+        }
+        for cohort in cohorts
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["cohort_week", "category"],
+        set_={
+            name: stmt.excluded[name]
+            for name in ("horizon_weeks", "cohort_size", "completion_curve", "progress_curve", "computed_at")
+        }
+    )
+
+    db.execute(stmt)
+    db.commit()
+
+
+# ============================================================
+# COMPUTATION
+# ============================================================
+
+def _compute_cohorts(db: Session, since: date | None):
+    """Curves for every cohort from `since` on: two grouped queries, then
+    cumulative sums over (cohort x week) and (cohort x step) count matrices."""
+
+    completion_rows = _completion_counts(db, since)
+    if not completion_rows:
+        return []
+
+    progress_rows = _progress_counts(db, since)
+
+    # Cohort index over the distinct (week, category) pairs
+    keys = sorted({(_as_date(row.cohort_week), row.category) for row in completion_rows})
+    index = {key: i for i, key in enumerate(keys)}
+
+    # --- Completion: counts by weeks-to-complete, cumulated along the horizon
+    cohort_idx = np.array([index[(_as_date(r.cohort_week), r.category)] for r in completion_rows])
+    counts = np.array([r.enrollments for r in completion_rows], dtype=np.int64)
+
+    sizes = np.bincount(cohort_idx, weights=counts, minlength=len(keys))
+
+    completed = np.array([r.completion_week is not None for r in completion_rows])
+    offsets = np.array([
+        (_as_date(r.completion_week) - _as_date(r.cohort_week)).days // 7 if r.completion_week is not None else 0
+        for r in completion_rows
+    ])
+    tracked = completed & (offsets <= COHORT_HORIZON_WEEKS)
+
+    weekly = np.zeros((len(keys), COHORT_HORIZON_WEEKS + 1))
+    np.add.at(weekly, (cohort_idx[tracked], np.clip(offsets[tracked], 0, None)), counts[tracked])
+    completion_curves = np.cumsum(weekly, axis=1) / sizes[:, None] * 100
+
+    # --- Progress: counts by step reached, cumulated from the top step down.
+    # The two queries don't share a snapshot: rows for a cohort that only
+    # appeared in between are skipped (it has no size yet)
+    progress_rows = [r for r in progress_rows if (_as_date(r.cohort_week), r.category) in index]
+    progress_idx = np.array([index[(_as_date(r.cohort_week), r.category)] for r in progress_rows], dtype=np.int64)
+    progress_counts = np.array([r.enrollments for r in progress_rows], dtype=np.float64)
+    position = np.array([r.position or 0 for r in progress_rows], dtype=np.float64)
+    topic_count = np.array([r.topic_count or 0 for r in progress_rows], dtype=np.float64)
+    is_completed = np.array([bool(r.completed) for r in progress_rows], dtype=bool)
+
+    fraction = np.divide(position, topic_count, out=np.zeros_like(position), where=topic_count > 0)
+    fraction[is_completed] = 1.0
+    steps = np.clip(np.floor(fraction * PROGRESS_STEPS), 0, PROGRESS_STEPS).astype(np.int64)
+
+    by_step = np.zeros((len(keys), PROGRESS_STEPS + 1))
+    np.add.at(by_step, (progress_idx, steps), progress_counts)
+    # Capped, as enrollments added between the queries can push a count past its cohort's size
+    reached = np.minimum(np.cumsum(by_step[:, ::-1], axis=1)[:, ::-1][:, 1:] / sizes[:, None] * 100, 100)
+
+    return [
+        {
+            "cohort_week": week,
+            "category": category,
+            "cohort_size": int(sizes[i]),
+            "completion_curve": [round(float(v), 2) for v in completion_curves[i]],
+            "progress_curve": [round(float(v), 2) for v in reached[i]]
+        }
+        for i, (week, category) in enumerate(keys)
+    ]
+
+
+def _completion_counts(db: Session, since: date | None):
+    """Enrollments per (cohort week, category, completion week)"""
+
+    cohort_week = date_bucket(db, Enrollment.enrollment_date, "week").label("cohort_week")
+    category = func.coalesce(Course.category, UNCATEGORIZED).label("category")
+    completion_week = date_bucket(
+        db,
+        case((Enrollment.completion_status == "Completed", Enrollment.completion_date)),
+        "week"
+    ).label("completion_week")
+
+    query = db.query(
+        cohort_week,
+        category,
+        completion_week,
+        func.count().label("enrollments")
+    ).join(
+        Course,
+        Course.course_id == Enrollment.course_id
+    ).filter(
+        Enrollment.enrollment_date.isnot(None)
+    )
+    if since is not None:
+        query = query.filter(Enrollment.enrollment_date >= since)
+
+    return query.group_by(cohort_week, category, completion_week).all()
+
+
+def _progress_counts(db: Session, since: date | None):
+    """Enrollments per (cohort week, category, topic position, course length).
+
+    Enrollments without a current topic get no position and count as 0%.
+    """
+
+    # Position of each topic within its course, by sequence_order
+    positions = select(
+        CourseTopic.course_id,
+        CourseTopic.topic_id,
+        func.row_number().over(
+            partition_by=CourseTopic.course_id,
+            order_by=(CourseTopic.sequence_order, CourseTopic.topic_id)
+        ).label("position"),
+        func.count().over(partition_by=CourseTopic.course_id).label("topic_count")
+    ).subquery()
+
+    cohort_week = date_bucket(db, Enrollment.enrollment_date, "week").label("cohort_week")
+    category = func.coalesce(Course.category, UNCATEGORIZED).label("category")
+    is_completed = case((Enrollment.completion_status == "Completed", 1), else_=0).label("completed")
+
+    query = db.query(
+        cohort_week,
+        category,
+        is_completed,
+        positions.c.position,
+        positions.c.topic_count,
+        func.count().label("enrollments")
+    ).join(
+        Course,
+        Course.course_id == Enrollment.course_id
+    ).outerjoin(
+        positions,
+        (positions.c.course_id == Enrollment.course_id)
+        & (positions.c.topic_id == Enrollment.current_topic)
+    ).filter(
+        Enrollment.enrollment_date.isnot(None)
+    )
+    if since is not None:
+        query = query.filter(Enrollment.enrollment_date >= since)
+
+    return query.group_by(
+        cohort_week,
+        category,
+        is_completed,
+        positions.c.position,
+        positions.c.topic_count
+    ).all()
+
+
+def _as_date(value) -> date:
+    # SQLite returns date buckets as ISO strings, PostgreSQL as dates
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
@@ -1,8 +1,11 @@
+import os
+
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 
 from app.repositories import course_repo
 from app.repositories import quiz_repo
+from app.core.cache import TTLCache, on_write, notify_write, TOPIC_WRITE
 
 # UNIVERSITY SERVICES
 def create_university_service(db: Session, payload):
@@ -244,6 +247,52 @@ def get_topics_by_course_service(db: Session, course_id: int):
     return mappings
 
 
+# ---- Topic index (progression lookups) ----
+
+FINAL_ASSESSMENT = "Final Assessment"
+
+
+class TopicIndex:
+    """
+    A course's topics in sequence order, for constant-time progression
+    lookups. `topic_ids` and `positions` cover the regular topics only
+    (the Final Assessment is kept apart in `final_assessment_id`).
+    """
+
+    def __init__(self, topics):
+        regular = [topic_id for topic_id, name in topics if name != FINAL_ASSESSMENT]
+
+        self.topic_ids = tuple(regular)
+        self.positions = {topic_id: i for i, topic_id in enumerate(regular)}
+        self.first_topic_id = regular[0] if regular else None
+        self.final_assessment_id = next(
+            (topic_id for topic_id, name in topics if name == FINAL_ASSESSMENT),
+            None
+        )
+
+    def previous(self, topic_id: int):
+        """Regular topic before `topic_id` (None for the first one).
+        Raises KeyError when `topic_id` is not a regular topic of the course."""
+        position = self.positions[topic_id]
+        return self.topic_ids[position - 1] if position else None
+
+
+# Dropped per course by the mapping / reordering writes (TOPIC_WRITE); the
+# TTL bounds staleness across worker processes
+TOPIC_INDEX_CACHE = TTLCache(
+    float(os.getenv("TOPIC_INDEX_CACHE_TTL", 300)),
+    max_entries=int(os.getenv("TOPIC_INDEX_CACHE_SIZE", 4096))
+)
+on_write(TOPIC_WRITE, TOPIC_INDEX_CACHE.invalidate, keyed=True)
+
+
+def get_topic_index_service(db: Session, course_id: int) -> TopicIndex:
+    return TOPIC_INDEX_CACHE.get_or_compute(
+        course_id,
+        lambda: TopicIndex(course_repo.get_topic_order(db, course_id))
+    )
+
+
 def delete_topic_from_course_service(db: Session, course_id: int, topic_id: int):
     """Delete a topic mapping from a course and renumber remaining topics."""
     # Validate course
@@ -269,6 +318,7 @@ def delete_topic_from_course_service(db: Session, course_id: int, topic_id: int)
             m.sequence_order = order
         order += 1
     db.commit()
+    notify_write(TOPIC_WRITE, course_id)
 
     return {"success": True, "message": "Topic removed and sequences updated"}
 
@@ -0,0 +1,263 @@
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from fastapi import HTTPException
+
+from app.models.course import Course
+from app.models.enrollment import Enrollment
+from app.utils.percentiles import grouped_percentiles
+
+
+RATING_VALUES = (1, 2, 3, 4, 5)
+GRADE_VALUES = ("A", "B", "C", "D", "F")
+COMPLETION_PERCENTILES = (50, 90)
+
+
+# ============================================================
+# DISTRIBUTIONS
+# ============================================================
+
+def get_distributions_service(db: Session):
+    """Rating histograms, grade distributions and completion-time
+    percentiles for every course and platform-wide"""
+
+    courses = db.query(Course.course_id, Course.title).order_by(Course.course_id).all()
+
+    return _build_distributions(db, courses, include_platform=True)
+
+
+def get_course_distributions_service(db: Session, course_id: int):
+    """Distributions for a single course"""
+
+    course = db.query(Course.course_id, Course.title).filter(
+        Course.course_id == course_id
+    ).first()
+
+    if not course:
+        raise HTTPException(
+            status_code=404,
+            detail="Course not found"
+        )
+
+    return _build_distributions(db, [course], include_platform=False)["courses"][0]
+
+
+def _build_distributions(db: Session, courses, include_platform: bool):
+    """Compute every course's distributions in one pass per metric.
+
+    Each metric is fetched with a single grouped or columnar query and
+    scattered into a (course x bucket) NumPy matrix; platform-wide figures
+    are column sums rather than a second scan.
+    """
+    course_ids = np.array([course.course_id for course in courses], dtype=np.int64)
+    scope = None if include_platform else course_ids.tolist()
+
+    ratings = _value_counts(db, Enrollment.rating, RATING_VALUES, course_ids, scope)
+    grades = _value_counts(db, Enrollment.grade, GRADE_VALUES, course_ids, scope)
+    graded = _graded_counts(db, course_ids, scope)
+    completion = _completion_percentiles(db, course_ids, scope, include_platform)
+
+    courses_data = []
+    for i, course in enumerate(courses):
+        courses_data.append({
+            "course_id": course.course_id,
+            "title": course.title,
+            **_distribution_payload(ratings[i], grades[i], graded[i], completion["courses"][i])
+        })
+
+    result = {"courses": courses_data}
+
+    if include_platform:
+        result["platform"] = _distribution_payload(
+            ratings.sum(axis=0),
+            grades.sum(axis=0),
+            graded.sum(axis=0),
+            completion["platform"]
+        )
+
+    return result
+
+
+def _distribution_payload(ratings, grades, graded, completion):
+    total_graded, total_enrolled = (int(n) for n in graded)
+
+    return {
+        "rating_histogram": {str(value): int(n) for value, n in zip(RATING_VALUES, ratings)},
+        "total_ratings": int(ratings.sum()),
+        "grade_distribution": {value: int(n) for value, n in zip(GRADE_VALUES, grades)},
+        "ungraded": total_enrolled - total_graded,
+        "completion_days": completion
+    }
+
+
+# ============================================================
+# RATINGS / GRADES
+# ============================================================
+
+def _value_counts(db: Session, column, values, course_ids, scope):
+    """(course x value) count matrix from one GROUP BY course_id, value"""
+
+    query = db.query(
+        Enrollment.course_id,
+        column,
+        func.count()
+    ).filter(
+        column.in_(values)
+    )
+    if scope is not None:
+        query = query.filter(Enrollment.course_id.in_(scope))
+
+    rows = query.group_by(Enrollment.course_id, column).all()
+
+    matrix = np.zeros((len(course_ids), len(values)), dtype=np.int64)
+    if rows:
+        row_courses, row_values, counts = (np.array(col, dtype=object) for col in zip(*rows))
+        value_index = {value: i for i, value in enumerate(values)}
+        np.add.at(
+            matrix,
+            (
+                np.searchsorted(course_ids, row_courses.astype(np.int64)),
+                np.array([value_index[value] for value in row_values])
+            ),
+            counts.astype(np.int64)
+        )
+
+    return matrix
+
+
+def _graded_counts(db: Session, course_ids, scope):
+    """(course x [graded, enrolled]) matrix, so ungraded = enrolled - graded"""
+
+    query = db.query(
+        Enrollment.course_id,
+        func.count(Enrollment.grade),
+        func.count()
+    )
+    if scope is not None:
+        query = query.filter(Enrollment.course_id.in_(scope))
+
+    rows = query.group_by(Enrollment.course_id).all()
+
+    matrix = np.zeros((len(course_ids), 2), dtype=np.int64)
+    if rows:
+        data = np.array(rows, dtype=np.int64)
+        matrix[np.searchsorted(course_ids, data[:, 0])] = data[:, 1:]
+
+    return matrix
+
+
+# ============================================================
+# COMPLETION TIME
+# ============================================================
+
+def _completion_percentiles(db: Session, course_ids, scope, include_platform: bool):
+    """p50/p90 days from enrollment to completion per course (and overall).
+
+    PostgreSQL computes them with percentile_cont; elsewhere the day counts
+    are fetched as columns and interpolated the same way in NumPy.
+    """
+    completed = [
+        Enrollment.completion_status == "Completed",
+        Enrollment.completion_date.isnot(None),
+        Enrollment.enrollment_date.isnot(None)
+    ]
+    if scope is not None:
+        completed.append(Enrollment.course_id.in_(scope))
+
+    if db.get_bind().dialect.name == "postgresql":
+        return _sql_percentiles(db, completed, course_ids, include_platform)
+
+    rows = db.execute(
+        select(
+            Enrollment.course_id,
+            Enrollment.enrollment_date,
+            Enrollment.completion_date
+        ).where(*completed)
+    ).all()
+
+    if rows:
+        row_courses, enrolled, finished = zip(*rows)
+        groups = np.array(row_courses, dtype=np.int64)
+        days = (
+            np.array(finished, dtype="datetime64[D]")
+            - np.array(enrolled, dtype="datetime64[D]")
+        ).astype(np.float64)
+    else:
+        groups = np.array([], dtype=np.int64)
+        days = np.array([], dtype=np.float64)
+
+    counts, percentiles = _grouped_percentiles(groups, days, course_ids)
+
+    result = {
+        "courses": [
+            _completion_payload(counts[i], percentiles[i])
+            for i in range(len(course_ids))
+        ]
+    }
+
+    if include_platform:
+        result["platform"] = _completion_payload(
+            len(days),
+            np.percentile(days, COMPLETION_PERCENTILES) if len(days) else None
+        )
+
+    return result
+
+
+def _sql_percentiles(db: Session, completed, course_ids, include_platform: bool):
+    days = Enrollment.completion_date - Enrollment.enrollment_date
+    aggregates = [func.count()] + [
+        func.percentile_cont(p / 100).within_group(days)
+        for p in COMPLETION_PERCENTILES
+    ]
+
+    rows = db.query(Enrollment.course_id, *aggregates).filter(
+        *completed
+    ).group_by(Enrollment.course_id).all()
+
+    by_course = {row[0]: row[1:] for row in rows}
+    result = {
+        "courses": [
+            _completion_payload(*_split(by_course.get(course_id)))
+            for course_id in course_ids.tolist()
+        ]
+    }
+
+    if include_platform:
+        overall = db.query(*aggregates).filter(*completed).one()
+        result["platform"] = _completion_payload(*_split(overall))
+
+    return result
+
+
+def _grouped_percentiles(groups, values, course_ids):
+    """Per-course counts and COMPLETION_PERCENTILES, one row per course id"""
+
+    counts = np.zeros(len(course_ids), dtype=np.int64)
+    percentiles = np.full((len(course_ids), len(COMPLETION_PERCENTILES)), np.nan)
+
+    group_ids, group_counts, interpolated = grouped_percentiles(groups, values, COMPLETION_PERCENTILES)
+
+    rows = np.searchsorted(course_ids, group_ids)
+    counts[rows] = group_counts
+    percentiles[rows] = interpolated
+
+    return counts, percentiles
+
+
+def _split(row):
+    if row is None:
+        return 0, None
+    return row[0], row[1:]
+
+
+def _completion_payload(count, percentiles):
+    count = int(count)
+    if not count:
+        percentiles = [None] * len(COMPLETION_PERCENTILES)
+
+    payload = {"completed": count}
+    for p, value in zip(COMPLETION_PERCENTILES, percentiles):
+        payload[f"p{p}"] = round(float(value), 2) if value is not None else None
+
+    return payload
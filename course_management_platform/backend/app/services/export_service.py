@@ -0,0 +1,227 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.database import engine
+from app.models.course import Course
+from app.models.enrollment import Enrollment
+from app.models.user import User
+from app.models.analytics_snapshot import (
+    CourseAnalyticsSnapshot,
+    StudentAnalyticsSnapshot,
+    InstructorAnalyticsSnapshot
+)
+from app.services.snapshot_service import ensure_fresh_snapshots
+
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson"
+}
+
+# Rows fetched from the server-side cursor (and flushed to the client) at a time
+EXPORT_BATCH_SIZE = 1000
+
+
+# ============================================================
+# EXPORT
+# ============================================================
+
+def export_dataset_service(db: Session, dataset: str, fmt: str = "csv"):
+    """Stream an analyst dataset as CSV or NDJSON.
+
+    Rows are read through a server-side cursor on a dedicated connection and
+    written out batch by batch, so memory use does not grow with the export.
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown dataset '{dataset}'. Available: {', '.join(EXPORT_DATASETS)}"
+        )
+
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid format '{fmt}'. Allowed: {', '.join(EXPORT_FORMATS)}"
+        )
+
+    # Aggregate datasets are served from the analytics snapshots
+    if dataset != "enrollments":
+        ensure_fresh_snapshots(db)
+
+    statement = EXPORT_DATASETS[dataset]()
+    writer = _csv_chunks if fmt == "csv" else _ndjson_chunks
+
+    return StreamingResponse(
+        writer(_stream_rows(statement)),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{fmt}"'}
+    )
+
+
+def _stream_rows(statement):
+    """Yield the column names, then batches of rows from a server-side cursor.
+
+    The request-scoped session may be closed before the response body is
+    sent, so the generator owns its connection and releases it when the
+    stream finishes or the client disconnects.
+    """
+    connection = engine.connect().execution_options(
+        stream_results=True,
+        yield_per=EXPORT_BATCH_SIZE
+    )
+    try:
+        result = connection.execute(statement)
+        yield list(result.keys())
+        for rows in result.partitions():
+            yield rows
+    finally:
+        connection.close()
+
+
+def _csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # Header goes out first, even for an empty dataset
+    writer.writerow(next(batches))
+    yield _drain(buffer)
+
+    for rows in batches:
+        writer.writerows(rows)
+        yield _drain(buffer)
+
+
+def _drain(buffer: io.StringIO):
+    chunk = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    return chunk
+
+
+def _ndjson_chunks(batches):
+    columns = next(batches)
+    for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=_json_default) + "\n"
+            for row in rows
+        )
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+# ============================================================
+# DATASETS
+# ============================================================
+
+def _courses_export():
+    return select(
+        Course.course_id,
+        Course.title,
+        Course.category,
+        Course.level,
+        CourseAnalyticsSnapshot.total_enrollments,
+        CourseAnalyticsSnapshot.completed_enrollments,
+        (
+            CourseAnalyticsSnapshot.total_enrollments
+            - CourseAnalyticsSnapshot.completed_enrollments
+        ).label("active_enrollments"),
+        CourseAnalyticsSnapshot.completion_rate,
+        CourseAnalyticsSnapshot.average_rating,
+        CourseAnalyticsSnapshot.total_instructors,
+        CourseAnalyticsSnapshot.refreshed_at
+    ).select_from(
+        CourseAnalyticsSnapshot
+    ).join(
+        Course,
+        Course.course_id == CourseAnalyticsSnapshot.course_id
+    ).order_by(
+        CourseAnalyticsSnapshot.course_id
+    )
+
+
+def _students_export():
+    return select(
+        User.user_id.label("student_user_id"),
+        User.name,
+        User.email,
+        StudentAnalyticsSnapshot.total_enrollments,
+        StudentAnalyticsSnapshot.completed_courses,
+        StudentAnalyticsSnapshot.active_courses,
+        StudentAnalyticsSnapshot.average_rating,
+        StudentAnalyticsSnapshot.refreshed_at
+    ).select_from(
+        StudentAnalyticsSnapshot
+    ).join(
+        User,
+        User.user_id == StudentAnalyticsSnapshot.student_user_id
+    ).order_by(
+        StudentAnalyticsSnapshot.student_user_id
+    )
+
+
+def _instructors_export():
+    return select(
+        User.user_id.label("instructor_user_id"),
+        User.name,
+        User.email,
+        InstructorAnalyticsSnapshot.total_courses_taught,
+        InstructorAnalyticsSnapshot.total_students,
+        InstructorAnalyticsSnapshot.average_course_completion_rate,
+        InstructorAnalyticsSnapshot.refreshed_at
+    ).select_from(
+        InstructorAnalyticsSnapshot
+    ).join(
+        User,
+        User.user_id == InstructorAnalyticsSnapshot.instructor_user_id
+    ).order_by(
+        InstructorAnalyticsSnapshot.instructor_user_id
+    )
+
+
+def _enrollments_export():
+    return select(
+        Enrollment.course_id,
+        Course.title.label("course_title"),
+        Enrollment.student_user_id,
+        User.name.label("student_name"),
+        Enrollment.enrollment_date,
+        Enrollment.status,
+        Enrollment.completion_status,
+        Enrollment.completion_date,
+        Enrollment.rating,
+        Enrollment.grade,
+        Enrollment.current_topic
+    ).select_from(
+        Enrollment
+    ).join(
+        Course,
+        Course.course_id == Enrollment.course_id
+    ).join(
+        User,
+        User.user_id == Enrollment.student_user_id
+    ).order_by(
+        Enrollment.course_id,
+        Enrollment.student_user_id
+    )
+
+
+EXPORT_DATASETS = {
+    "courses": _courses_export,
+    "students": _students_export,
+    "instructors": _instructors_export,
+    "enrollments": _enrollments_export
+}
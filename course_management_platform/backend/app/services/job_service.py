@@ -0,0 +1,355 @@
+import os
+import time
+import uuid
+import socket
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from fastapi import HTTPException
+
+from app.database import SessionLocal
+from app.models.background_job import BackgroundJob
+from app.services.statistics_service import (
+    recompute_all_students_service,
+    recompute_all_instructors_service,
+    recompute_all_courses_service,
+    recompute_platform_service,
+    reconcile_statistics_service
+)
+
+
+# kind -> callable(db, progress, **params) returning a JSON-serializable result
+JOB_KINDS = {
+    "recompute_students": lambda db, progress, bulk=True, only_dirty=False:
+        recompute_all_students_service(db, bulk, progress, only_dirty),
+    "recompute_instructors": lambda db, progress, bulk=True, only_dirty=False:
+        recompute_all_instructors_service(db, bulk, progress, only_dirty),
+    "recompute_courses": lambda db, progress, bulk=True, only_dirty=False:
+        recompute_all_courses_service(db, bulk, progress, only_dirty),
+    "recompute_platform": lambda db, progress, bulk=True, only_dirty=False:
+        recompute_platform_service(db, bulk, progress, only_dirty),
+    "reconcile_statistics": lambda db, progress: reconcile_statistics_service(db, progress)
+}
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# Jobs run on a small in-process pool; different kinds may run side by side
+JOB_WORKERS = int(os.getenv("BACKGROUND_JOB_WORKERS", 2))
+
+# Minimum seconds between progress writes to the job row
+PROGRESS_INTERVAL = 1.0
+
+# Identifies this process as the owner of the jobs it queues and runs; the
+# token tells a restarted process apart from an old one that had the same pid
+JOB_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Seconds between heartbeats on this process's active jobs; an active job
+# whose owner missed several heartbeats is treated as interrupted
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("BACKGROUND_JOB_HEARTBEAT", 15))
+JOB_STALE_AFTER = timedelta(seconds=JOB_HEARTBEAT_INTERVAL * 4)
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="background-job")
+_submit_lock = threading.Lock()
+_heartbeat = None
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# ============================================================
+# SUBMIT / INSPECT / CANCEL
+# ============================================================
+
+def submit_job_service(db: Session, kind: str, params: dict | None = None):
+    """Queue a job and return it immediately. Only one job of each kind may
+    be queued or running at a time."""
+    if kind not in JOB_KINDS:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind '{kind}'")
+
+    with _submit_lock:
+        active = db.query(BackgroundJob).filter(
+            BackgroundJob.kind == kind,
+            BackgroundJob.status.in_(ACTIVE_STATUSES)
+        ).first()
+
+        if active and _owner_gone(active, datetime.utcnow()):
+            _fail_jobs(db, [active.job_id])
+            active = None
+
+        if active:
+            raise HTTPException(
+                status_code=409,
+                detail=f"A {kind} job is already {active.status} (job {active.job_id})"
+            )
+
+        job = BackgroundJob(
+            kind=kind,
+            params=params or {},
+            status="queued",
+            processed=0,
+            owner=JOB_OWNER,
+            heartbeat_at=datetime.utcnow()
+        )
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another process queued the same kind first (unique active-kind index)
+            db.rollback()
+            raise HTTPException(status_code=409, detail=f"A {kind} job is already running")
+
+    db.refresh(job)
+    _executor.submit(_run_job, job.job_id)
+
+    return _job_payload(job)
+
+
+def get_job_service(db: Session, job_id: int):
+    return _job_payload(_get_job(db, job_id))
+
+
+def list_jobs_service(db: Session, kind: str | None = None, status: str | None = None, limit: int = 50):
+    query = db.query(BackgroundJob)
+    if kind:
+        query = query.filter(BackgroundJob.kind == kind)
+    if status:
+        query = query.filter(BackgroundJob.status == status)
+
+    jobs = query.order_by(BackgroundJob.job_id.desc()).limit(limit).all()
+
+    return [_job_payload(job, include_result=False) for job in jobs]
+
+
+def cancel_job_service(db: Session, job_id: int):
+    """Cancel a queued job at once; a running job stops at its next
+    progress checkpoint (work committed before that is kept)."""
+    job = _get_job(db, job_id)
+
+    if job.status not in ACTIVE_STATUSES:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job {job_id} already {job.status}"
+        )
+
+    job.cancel_requested = True
+    if job.status == "queued":
+        job.status = "cancelled"
+        job.finished_at = datetime.utcnow()
+
+    db.commit()
+    db.refresh(job)
+
+    return _job_payload(job)
+
+
+def fail_interrupted_jobs():
+    """Mark queued/running jobs whose owning process exited or stopped
+    heartbeating as failed. Jobs of other live processes (other workers,
+    the old side of a rolling restart) are left alone. Runs at startup and
+    on every heartbeat."""
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        active = db.query(BackgroundJob).filter(
+            BackgroundJob.status.in_(ACTIVE_STATUSES)
+        ).all()
+        _fail_jobs(db, [job.job_id for job in active if _owner_gone(job, now)])
+    finally:
+        db.close()
+
+
+def start_job_heartbeat():
+    """Refresh heartbeat_at on this process's active jobs every
+    JOB_HEARTBEAT_INTERVAL seconds in a daemon thread, and fail jobs of
+    processes that stopped. Safe to call more than once."""
+    global _heartbeat
+
+    if _heartbeat is not None:
+        return _heartbeat
+
+    def run():
+        while True:
+            time.sleep(JOB_HEARTBEAT_INTERVAL)
+            db = SessionLocal()
+            try:
+                db.query(BackgroundJob).filter(
+                    BackgroundJob.owner == JOB_OWNER,
+                    BackgroundJob.status.in_(ACTIVE_STATUSES)
+                ).update({
+                    BackgroundJob.heartbeat_at: datetime.utcnow()
+                }, synchronize_session=False)
+                db.commit()
+            except Exception:
+                # Missed beats only matter if they persist; retry next time
+                db.rollback()
+            finally:
+                db.close()
+
+            try:
+                fail_interrupted_jobs()
+            except Exception:
+                pass
+
+    _heartbeat = threading.Thread(target=run, name="background-job-heartbeat", daemon=True)
+    _heartbeat.start()
+
+    return _heartbeat
+
+
+def _owner_gone(job: BackgroundJob, now: datetime) -> bool:
+    """True if the process that owns `job` has exited or stopped heartbeating."""
+    if job.owner == JOB_OWNER:
+        return False
+    if job.owner is None or job.heartbeat_at is None:
+        # Queued before owners were recorded
+        return True
+    if now - job.heartbeat_at > JOB_STALE_AFTER:
+        return True
+
+    # An owner on this host whose pid is gone is dead without waiting for
+    # its heartbeat to go stale
+    host, pid, _ = job.owner.rsplit(":", 2)
+    return host == socket.gethostname() and not _pid_running(int(pid))
+
+
+def _pid_running(pid: int) -> bool:
+    if os.name != "posix":
+        # os.kill(pid, 0) is not a probe on Windows; rely on the heartbeat
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Running under another user
+        pass
+    return True
+
+
+def _fail_jobs(db: Session, job_ids):
+    if not job_ids:
+        return
+
+    db.query(BackgroundJob).filter(
+        BackgroundJob.job_id.in_(job_ids),
+        BackgroundJob.status.in_(ACTIVE_STATUSES)
+    ).update({
+        BackgroundJob.status: "failed",
+        BackgroundJob.error: "Interrupted: the owning process exited or stopped responding",
+        BackgroundJob.finished_at: datetime.utcnow()
+    }, synchronize_session=False)
+    db.commit()
+
+
+def _get_job(db: Session, job_id: int) -> BackgroundJob:
+    job = db.query(BackgroundJob).filter(BackgroundJob.job_id == job_id).first()
+
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail="Job not found"
+        )
+
+    return job
+
+
+def _job_payload(job: BackgroundJob, include_result: bool = True):
+    progress_percent = None
+    eta_seconds = None
+
+    if job.total:
+        progress_percent = round(job.processed / job.total * 100, 1)
+
+        # Linear estimate from the average time per processed entity so far
+        if job.status == "running" and job.started_at and job.processed:
+            elapsed = ((job.updated_at or datetime.utcnow()) - job.started_at).total_seconds()
+            eta_seconds = round(elapsed / job.processed * (job.total - job.processed), 1)
+
+    payload = {
+        "job_id": job.job_id,
+        "kind": job.kind,
+        "params": job.params,
+        "status": job.status,
+        "processed": job.processed,
+        "total": job.total,
+        "progress_percent": progress_percent,
+        "eta_seconds": eta_seconds,
+        "cancel_requested": job.cancel_requested,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at
+    }
+    if include_result:
+        payload["result"] = job.result
+
+    return payload
+
+
+# ============================================================
+# RUNNER
+# ============================================================
+
+def _run_job(job_id: int):
+    # Job state lives in its own session so progress commits never touch
+    # the work session's transaction
+    state = SessionLocal()
+    work = SessionLocal()
+    try:
+        job = state.query(BackgroundJob).filter(BackgroundJob.job_id == job_id).first()
+        if job is None or job.status != "queued":
+            return
+
+        job.status = "running"
+        job.started_at = job.updated_at = datetime.utcnow()
+        state.commit()
+
+        last_write = [0.0]
+
+        # Per-entity recomputes (bulk=False) report after every entity and are
+        # throttled; the other kinds report a few checkpoints (one per table
+        # or statement) and every one is checked for cancellation
+        throttled = (job.params or {}).get("bulk", True) is False
+
+        def progress(processed: int, total: int):
+            now = time.monotonic()
+            if throttled and processed < total and now - last_write[0] < PROGRESS_INTERVAL:
+                return
+            last_write[0] = now
+
+            # A checkpoint that reports no new progress only reads the job
+            # row: the work session may be mid-transaction (SQLite allows
+            # one writer)
+            if (job.processed, job.total) != (processed, total):
+                job.processed = processed
+                job.total = total
+                job.updated_at = datetime.utcnow()
+            state.commit()
+
+            # Once everything is processed (and committed) the job completes,
+            # even if a cancel came in meanwhile
+            state.refresh(job)
+            if job.cancel_requested and processed < total:
+                raise JobCancelled()
+
+        try:
+            result = JOB_KINDS[job.kind](work, progress, **(job.params or {}))
+            job.status = "completed"
+            job.result = result
+        except JobCancelled:
+            work.rollback()
+            job.status = "cancelled"
+        except Exception as e:
+            work.rollback()
+            job.status = "failed"
+            job.error = str(e)
+
+        job.finished_at = job.updated_at = datetime.utcnow()
+        state.commit()
+    finally:
+        work.close()
+        state.close()
@@ -5,6 +5,8 @@ from sqlalchemy.orm import Session
 from datetime import date, datetime
 
 from app.models.enrollment import Enrollment
+from app.repositories import statistics_repo
+from app.core.cache import notify_write, COMPLETION_WRITE, RATING_WRITE
 
 
 # ============================================================
@@ -27,6 +29,13 @@ def _get_enrollment(db: Session, student_user_id: int, course_id: int):
     return enrollment
 
 
+def _rated_day(enrollment: Enrollment):
+    """Day the current rating counts towards in the trends, if any."""
+    if enrollment.rating is None or enrollment.rated_at is None:
+        return None
+    return enrollment.rated_at.date()
+
+
 # ============================================================
 # DELETE REVIEW + RATING
 # ============================================================
@@ -43,11 +52,14 @@ def delete_review_service(
         course_id
     )
 
+    old_day = _rated_day(enrollment)
+
     enrollment.rating = None
     enrollment.review_text = None
     enrollment.rated_at = None
 
     db.commit()
+    notify_write(RATING_WRITE, (student_user_id, course_id, (old_day,)))
 
     return {
         "message": "Review and rating removed successfully"
@@ -77,10 +89,13 @@ def override_rating_service(
         course_id
     )
 
+    old_day = _rated_day(enrollment)
+
     enrollment.rating = new_rating
     enrollment.rated_at = datetime.utcnow()
 
     db.commit()
+    notify_write(RATING_WRITE, (student_user_id, course_id, (old_day, enrollment.rated_at.date())))
 
     return {
         "message": "Rating overridden successfully",
@@ -104,10 +119,27 @@ def force_completion_service(
         course_id
     )
 
+    was_completed = enrollment.completion_status == "Completed"
+    old_days = statistics_repo.completion_days(enrollment)
+    changed = (enrollment.completion_status, enrollment.completion_date) != ("Completed", date.today())
+    days = (enrollment.completion_date if was_completed else None, date.today())
+
     enrollment.completion_status = "Completed"
     enrollment.completion_date = date.today()
 
+    statistics_repo.record_completion_change(
+        db,
+        student_user_id,
+        course_id,
+        was_completed,
+        True,
+        old_days,
+        statistics_repo.completion_days(enrollment)
+    )
+
     db.commit()
+    if changed:
+        notify_write(COMPLETION_WRITE, (student_user_id, course_id, days))
 
     return {
         "message": "Course marked as completed"
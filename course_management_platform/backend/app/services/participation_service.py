@@ -1,4 +1,10 @@
+import os
+import io
+import csv
+import json
+
 from sqlalchemy.orm import Session
+from sqlalchemy import select
 from fastapi import HTTPException, status
 from datetime import date
 
@@ -6,16 +12,14 @@ from app.repositories import participation_repo
 from app.repositories import user_repo
 from app.repositories import course_repo
 
-from app.models.teaching import Teaching
-
 from app.core.roles import Role
+from app.models.user import User
+from app.models.course import Course
 
-# Import statistics service for updating stats on enrollment/teaching changes
-from app.services.statistics_service import (
-    update_course_statistics_service,
-    update_student_statistics_service,
-    update_instructor_statistics_service
-)
+# Import statistics service for updating stats on teaching changes
+from app.services.statistics_service import update_instructor_statistics_service
+from app.services.course_service import get_topic_index_service
+from app.services.quiz_service import get_answer_key_service
 
 def enroll_student_service(
     db: Session,
@@ -65,31 +69,126 @@ def enroll_student_service(
         student_user_id,
         course_id
     )
-    
-    # Update statistics when new enrollment is created
-    try:
-        update_course_statistics_service(db, course_id)
-        update_student_statistics_service(db, student_user_id)
-        
-        # Update statistics for all instructors teaching this course
-        instructors = db.query(Teaching).filter(
-            Teaching.course_id == course_id
-        ).all()
-        
-        for teaching in instructors:
-            try:
-                update_instructor_statistics_service(db, teaching.instructor_user_id)
-            except Exception:
-                # Swallow individual instructor stats errors
-                pass
-                
-    except Exception:
-        # Swallow statistics update errors to not block enrollment
-        pass
-    
+
+    # The course, student and instructor counters are updated in the
+    # background once the enrollment commits (statistics_repo.record_enrollment_added)
     return enrollment
 
 
+# Bulk Enrollment (roster import)
+MAX_BULK_ENROLLMENTS = int(os.getenv("MAX_BULK_ENROLLMENTS", 50000))
+
+# Ids per IN (...) list, well under the drivers' bind parameter limits
+_LOOKUP_BATCH = 5000
+
+
+def parse_bulk_enrollments(body: bytes, content_type: str) -> list[dict]:
+    """Rows of a JSON array or a CSV with a student_user_id,course_id header."""
+    if content_type.split(";")[0].strip().lower() == "text/csv":
+        reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+        missing = {"student_user_id", "course_id"} - set(reader.fieldnames or [])
+        if missing:
+            raise HTTPException(400, f"CSV header is missing: {', '.join(sorted(missing))}")
+        return list(reader)
+
+    try:
+        rows = json.loads(body)
+    except ValueError:
+        raise HTTPException(400, "Body must be a JSON array or text/csv")
+
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise HTTPException(400, "Body must be a JSON array of objects")
+
+    return rows
+
+
+def bulk_enroll_service(
+    db: Session,
+    rows: list[dict]
+):
+    """
+    Enroll many (student_user_id, course_id) rows at once.
+
+    Users and courses are validated with a few set-based lookups, valid rows
+    are inserted in one transaction (existing enrollments are skipped), and
+    the statistics are refreshed once afterwards. Returns a result per row.
+    """
+    if len(rows) > MAX_BULK_ENROLLMENTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_BULK_ENROLLMENTS} rows per request"
+        )
+
+    results = []
+    for number, row in enumerate(rows, start=1):
+        result = {"row": number, "student_user_id": None, "course_id": None, "status": None, "detail": None}
+        try:
+            result["student_user_id"] = int(row.get("student_user_id"))
+            result["course_id"] = int(row.get("course_id"))
+        except (TypeError, ValueError):
+            result["status"] = "error"
+            result["detail"] = "student_user_id and course_id must be integers"
+        results.append(result)
+
+    pending = [r for r in results if r["status"] is None]
+
+    # ---- Set-based validation ----
+    student_ids = sorted({r["student_user_id"] for r in pending})
+    course_ids = sorted({r["course_id"] for r in pending})
+
+    roles = {}
+    for batch in _batches(student_ids):
+        roles.update(db.execute(
+            select(User.user_id, User.role).where(User.user_id.in_(batch))
+        ).all())
+
+    known_courses = set()
+    for batch in _batches(course_ids):
+        known_courses.update(db.scalars(
+            select(Course.course_id).where(Course.course_id.in_(batch))
+        ))
+
+    seen = set()
+    to_insert = []
+    for r in pending:
+        pair = (r["student_user_id"], r["course_id"])
+        role = roles.get(pair[0])
+
+        if role is None:
+            r["status"], r["detail"] = "error", "User not found"
+        elif role.lower() != "student":
+            r["status"], r["detail"] = "error", "User is not a student"
+        elif pair[1] not in known_courses:
+            r["status"], r["detail"] = "error", "Course not found"
+        elif pair in seen:
+            r["status"], r["detail"] = "skipped", "Duplicate row"
+        else:
+            seen.add(pair)
+            to_insert.append(pair)
+
+    # ---- Insert (one transaction; statistics refresh after commit) ----
+    inserted = set(participation_repo.create_enrollments(db, to_insert))
+
+    for r in pending:
+        if r["status"] is None:
+            pair = (r["student_user_id"], r["course_id"])
+            if pair in inserted:
+                r["status"] = "enrolled"
+            else:
+                r["status"], r["detail"] = "skipped", "Student already enrolled"
+
+    summary = {"enrolled": 0, "skipped": 0, "error": 0}
+    for r in results:
+        summary[r["status"]] += 1
+
+    return {"total": len(results), **summary, "results": results}
+
+
+def _batches(ids: list):
+    for start in range(0, len(ids), _LOOKUP_BATCH):
+        yield ids[start:start + _LOOKUP_BATCH]
+
+
 # Completion Update
 def update_completion_service(
     db: Session,
@@ -325,27 +424,8 @@ def update_topic_progress_service(
                 detail="Students can update only their progress"
             )
 
-    # Validate user exists and is a student
-    user = user_repo.get_user_by_id(db, student_user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="Student not found")
-    if user.role.lower() != "student":
-        raise HTTPException(status_code=400, detail="User is not a student")
-
-    # Validate course exists
-    course = course_repo.get_course_by_id(db, course_id)
-    if not course:
-        raise HTTPException(status_code=404, detail="Course not found")
-
-    # Validate topic exists
-    topic = course_repo.get_topic_by_id(db, topic_id)
-    if not topic:
-        raise HTTPException(status_code=404, detail="Topic not found")
-
-    # Get enrollment
-    enrollment = participation_repo.get_enrollment(db, student_user_id, course_id)
-    if not enrollment:
-        raise HTTPException(status_code=404, detail="Enrollment not found")
+    # Validate student, course, topic and enrollment in one query
+    enrollment = _get_participation(db, student_user_id, course_id, topic_id).Enrollment
 
     # Update current_topic
     return participation_repo.update_topic_progress(
@@ -380,47 +460,15 @@ def rollback_topic_progress_service(
                 detail="Students can update only their progress"
             )
 
-    # Validate user exists and is a student
-    user = user_repo.get_user_by_id(db, student_user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="Student not found")
-    if user.role.lower() != "student":
-        raise HTTPException(status_code=400, detail="User is not a student")
-
-    # Validate course exists
-    course = course_repo.get_course_by_id(db, course_id)
-    if not course:
-        raise HTTPException(status_code=404, detail="Course not found")
-
-    # Validate topic exists
-    topic = course_repo.get_topic_by_id(db, topic_id)
-    if not topic:
-        raise HTTPException(status_code=404, detail="Topic not found")
-
-    # Get enrollment
-    enrollment = participation_repo.get_enrollment(db, student_user_id, course_id)
-    if not enrollment:
-        raise HTTPException(status_code=404, detail="Enrollment not found")
-
-    # Find previous topic
-    all_topics = course_repo.get_topics_by_course(db, course_id)
-    
-    # Filter out Final Assessment topic (already ordered by sequence_order from DB)
-    regular_topics = [t for t in all_topics if t.name != "Final Assessment"]
+    # Validate student, course, topic and enrollment in one query
+    enrollment = _get_participation(db, student_user_id, course_id, topic_id).Enrollment
 
-    # Find index of current topic
-    current_index = next((i for i, t in enumerate(regular_topics) if t.topic_id == topic_id), None)
-    
-    if current_index is None:
+    # Find previous topic (None for the first one) from the cached topic
+    # index, which leaves out the Final Assessment
+    try:
+        previous_topic_id = get_topic_index_service(db, course_id).previous(topic_id)
+    except KeyError:
         raise HTTPException(status_code=400, detail="Topic not found in course")
-    
-    # Calculate previous topic_id
-    if current_index == 0:
-        # First topic - set to None
-        previous_topic_id = None
-    else:
-        # Go to previous topic
-        previous_topic_id = regular_topics[current_index - 1].topic_id
 
     # Update current_topic to previous topic
     return participation_repo.update_topic_progress(
@@ -454,34 +502,14 @@ def reset_progress_service(
                 detail="Students can update only their progress"
             )
 
-    # Validate user exists and is a student
-    user = user_repo.get_user_by_id(db, student_user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="Student not found")
-    if user.role.lower() != "student":
-        raise HTTPException(status_code=400, detail="User is not a student")
-
-    # Validate course exists
-    course = course_repo.get_course_by_id(db, course_id)
-    if not course:
-        raise HTTPException(status_code=404, detail="Course not found")
-
-    # Get enrollment
-    enrollment = participation_repo.get_enrollment(db, student_user_id, course_id)
-    if not enrollment:
-        raise HTTPException(status_code=404, detail="Enrollment not found")
+    # Validate student, course and enrollment in one query
+    enrollment = _get_participation(db, student_user_id, course_id).Enrollment
 
-    # Get all topics and find the first one
-    all_topics = course_repo.get_topics_by_course(db, course_id)
-    
-    # Filter out Final Assessment topic (already ordered by sequence_order from DB)
-    regular_topics = [t for t in all_topics if t.name != "Final Assessment"]
+    # First regular topic, from the cached topic index
+    first_topic_id = get_topic_index_service(db, course_id).first_topic_id
 
-    if not regular_topics:
+    if first_topic_id is None:
         raise HTTPException(status_code=400, detail="No regular topics found in course")
-    
-    # Get first topic
-    first_topic_id = regular_topics[0].topic_id
 
     # Update current_topic to first topic
     return participation_repo.update_topic_progress(
@@ -520,76 +548,18 @@ def submit_assessment_service(
                 detail="Students can submit only their assessments"
             )
 
-    # Validate user exists and is a student
-    user = user_repo.get_user_by_id(db, student_user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="Student not found")
-    if user.role.lower() != "student":
-        raise HTTPException(status_code=400, detail="User is not a student")
-
-    # Validate course exists
-    course = course_repo.get_course_by_id(db, course_id)
-    if not course:
-        raise HTTPException(status_code=404, detail="Course not found")
-
-    # Get enrollment
-    enrollment = participation_repo.get_enrollment(db, student_user_id, course_id)
-    if not enrollment:
-        raise HTTPException(status_code=404, detail="Enrollment not found")
+    # Validate student, course and enrollment in one query
+    participation = _get_participation(db, student_user_id, course_id)
+    enrollment = participation.Enrollment
 
     # If answers provided, prefer computing score using stored quiz questions
     final_score = None
     if answers is not None:
-        # Try to load quiz and questions for this course
-        quiz = None
-        try:
-            from app.repositories import quiz_repo
-            quiz = quiz_repo.get_quiz_by_course(db, course_id)
-        except Exception:
-            quiz = None
-
-        correct = 0
-        total = 0
-
-        if quiz:
-            questions = quiz_repo.get_questions(db, quiz.quiz_id)
-            total = len(questions)
-            if total == 0:
-                # fallback to answer key when there are no quiz_question rows
-                questions = None
-            else:
-                if len(answers) != total:
-                    raise HTTPException(status_code=400, detail=f"Answers length {len(answers)} does not match expected {total}")
-
-                for i, q in enumerate(questions):
-                    ans = answers[i]
-                    if ans is None:
-                        continue
-                    if not q.correct_answer:
-                        # treat missing correct_answer as non-matching
-                        continue
-                    if ans.upper() == q.correct_answer.upper():
-                        correct += 1
-
-        # If no quiz questions available, fall back to stored course answer key
-        if not quiz or (quiz and (questions is None or len(questions) == 0)):
-            if not course.quiz_answer_key:
-                raise HTTPException(status_code=400, detail="No answer key configured for this course and no quiz questions available")
-            key = course.quiz_answer_key.strip()
-            if len(key) == 0:
-                raise HTTPException(status_code=400, detail="Answer key is empty")
-
-            key = key.upper()
-            total = len(key)
-            if len(answers) != total:
-                raise HTTPException(status_code=400, detail=f"Answers length {len(answers)} does not match expected {total}")
-
-            correct = 0
-            for i, ans in enumerate(answers):
-                if ans is None:
-                    continue
-                if ans.upper() == key[i]:
-                    correct += 1
+        # Grade against the course's compiled (cached) answer key: quiz
+        # questions if any, else course.quiz_answer_key
+        answer_key = get_answer_key_service(db, course_id, participation.quiz_answer_key)
+        correct = answer_key.grade(answers)
+        total = len(answer_key)
 
         # Convert to percentage (0-100)
         if total == 0:
@@ -624,6 +594,30 @@ def submit_assessment_service(
     }
 
 
+def _get_participation(
+    db: Session,
+    student_user_id: int,
+    course_id: int,
+    topic_id: int | None = None
+):
+    """Validate a progress/assessment write with a single query and return
+    the row (role, course_id, quiz_answer_key, topic_id, Enrollment)."""
+    row = participation_repo.get_participation(db, student_user_id, course_id, topic_id)
+
+    if row is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+    if row.role.lower() != "student":
+        raise HTTPException(status_code=400, detail="User is not a student")
+    if row.course_id is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    if topic_id is not None and row.topic_id is None:
+        raise HTTPException(status_code=404, detail="Topic not found")
+    if row.Enrollment is None:
+        raise HTTPException(status_code=404, detail="Enrollment not found")
+
+    return row
+
+
 def _map_score_to_grade(score: int) -> str:
     """
     Map score (0-100) to grade using percentage thresholds.
@@ -0,0 +1,60 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import Session
+
+
+# Upper bound on concurrently running queries across all requests. Each one
+# holds a pooled connection, so keep this well below the engine's pool size
+# (5 + 10 overflow by default); 1 disables concurrency.
+QUERY_WORKERS = int(os.getenv("ANALYTICS_QUERY_WORKERS", 4))
+
+_executor = None
+if QUERY_WORKERS > 1:
+    _executor = ThreadPoolExecutor(
+        max_workers=QUERY_WORKERS,
+        thread_name_prefix="analytics-query"
+    )
+
+_worker_state = threading.local()
+
+
+def run_concurrently(db: Session, queries: dict):
+    """Run independent read-only queries concurrently and collect their results.
+
+    `queries` maps a name to a callable taking a Session. Each callable gets
+    its own short-lived session (and so its own pooled connection) on the
+    same engine as `db`, so the results may come from slightly different
+    snapshots; only use this for independent aggregates. Falls back to
+    running them one after another on `db` when concurrency is disabled,
+    for in-memory databases, and when called from inside a worker.
+
+    Returns {name: result}.
+    """
+    bind = db.get_bind()
+
+    if (
+        _executor is None
+        or len(queries) < 2
+        or getattr(_worker_state, "active", False)
+        or bind.url.database in (None, "", ":memory:")
+    ):
+        return {name: query(db) for name, query in queries.items()}
+
+    futures = {
+        name: _executor.submit(_run_query, bind, query)
+        for name, query in queries.items()
+    }
+
+    return {name: future.result() for name, future in futures.items()}
+
+
+def _run_query(bind, query):
+    _worker_state.active = True
+    session = Session(bind=bind)
+    try:
+        return query(session)
+    finally:
+        session.close()
+        _worker_state.active = False
@@ -1,8 +1,12 @@
+import os
+
+import numpy as np
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 
 from app.repositories import quiz_repo
 from app.models.course import Course
+from app.core.cache import TTLCache, on_write, QUIZ_WRITE, COURSE_WRITE
 
 
 def create_or_get_quiz_service(db: Session, course_id: int):
@@ -152,3 +156,94 @@ def delete_question_service(db: Session, question_id: int):
         )
     
     return {'message': 'Question deleted successfully'}
+
+
+# ============================================================
+# GRADING
+# ============================================================
+# Each course's correct answers are compiled once into an AnswerKey and
+# cached, so grading a submission reads neither quiz nor quiz_question.
+
+# Encoding for anything that is not a single character; never a match
+_NO_ANSWER = 0xFFFFFFFF
+
+
+def _encode(answer) -> int:
+    if isinstance(answer, str):
+        answer = answer.upper()
+        if len(answer) == 1:
+            return ord(answer)
+    return _NO_ANSWER
+
+
+class AnswerKey:
+    """
+    Correct answers of one course as upper-cased code points, graded with a
+    single vectorized comparison. Questions without a correct answer are
+    masked out and count as wrong.
+    """
+
+    def __init__(self, correct_answers):
+        self.codes = np.fromiter(
+            (_encode(answer) for answer in correct_answers),
+            dtype=np.uint32,
+            count=len(correct_answers)
+        )
+        self.gradable = self.codes != _NO_ANSWER
+
+    def __len__(self):
+        return len(self.codes)
+
+    def grade(self, answers) -> int:
+        """Number of correct answers. Raises 400 on a length mismatch."""
+        if len(answers) != len(self):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Answers length {len(answers)} does not match expected {len(self)}"
+            )
+
+        submitted = np.fromiter(
+            (_encode(answer) for answer in answers),
+            dtype=np.uint32,
+            count=len(answers)
+        )
+        return int(np.count_nonzero((submitted == self.codes) & self.gradable))
+
+
+def compile_answer_key(db: Session, course_id: int, quiz_answer_key: str | None) -> AnswerKey:
+    """
+    The course's quiz questions (in order) when it has any, otherwise its
+    quiz_answer_key string (one character per question).
+    """
+    quiz = quiz_repo.get_quiz_by_course(db, course_id)
+    questions = quiz_repo.get_questions(db, quiz.quiz_id) if quiz else []
+
+    if questions:
+        return AnswerKey([q.correct_answer for q in questions])
+
+    if not quiz_answer_key:
+        raise HTTPException(status_code=400, detail="No answer key configured for this course and no quiz questions available")
+
+    key = quiz_answer_key.strip()
+    if len(key) == 0:
+        raise HTTPException(status_code=400, detail="Answer key is empty")
+
+    return AnswerKey(list(key))
+
+
+# Dropped per course by quiz, question and answer key writes (QUIZ_WRITE);
+# the TTL bounds staleness across worker processes
+ANSWER_KEY_CACHE = TTLCache(
+    float(os.getenv("ANSWER_KEY_CACHE_TTL", 300)),
+    max_entries=int(os.getenv("ANSWER_KEY_CACHE_SIZE", 4096))
+)
+on_write(QUIZ_WRITE, ANSWER_KEY_CACHE.invalidate, keyed=True)
+on_write(COURSE_WRITE, ANSWER_KEY_CACHE.invalidate, keyed=True)
+
+
+def get_answer_key_service(db: Session, course_id: int, quiz_answer_key: str | None) -> AnswerKey:
+    """Compiled answer key for a course (cached; errors are not)."""
+    return ANSWER_KEY_CACHE.get_or_compute(
+        course_id,
+        lambda: compile_answer_key(db, course_id, quiz_answer_key)
+    )
@@ -0,0 +1,502 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, func, case, literal, TIMESTAMP
+from fastapi import HTTPException
+
+from app.models.course import Course
+from app.models.enrollment import Enrollment
+from app.models.teaching import Teaching
+from app.models.user import User
+from app.models.analytics_snapshot import (
+    CourseAnalyticsSnapshot,
+    StudentAnalyticsSnapshot,
+    InstructorAnalyticsSnapshot,
+    AnalyticsRefreshState
+)
+from app.utils.db_utils import upsert_from_select
+from app.core.cache import on_write, ENROLLMENT_WRITE, TEACHING_WRITE
+
+
+SNAPSHOT_STATE_NAME = "analyst_snapshots"
+
+# Analyst reads trigger an incremental refresh once snapshots are older than this (0 disables)
+SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv("ANALYTICS_SNAPSHOT_MAX_AGE", 300))
+
+# ... and a full one once the last full refresh is older than this (0 disables).
+# Incremental refreshes only see enrollment updates, new entities and the
+# writes made in this process, so this bounds how long teaching changes and
+# cascading deletes made elsewhere can go unnoticed.
+SNAPSHOT_FULL_REFRESH_SECONDS = int(os.getenv("ANALYTICS_SNAPSHOT_FULL_REFRESH", 3600))
+
+# Re-scan this far behind the watermark so enrollments whose transactions
+# committed after the previous refresh started are not missed
+WATERMARK_OVERLAP = timedelta(seconds=60)
+
+# Upper bound on ids per IN (...) list when refreshing changed entities
+ID_BATCH_SIZE = 1000
+
+# Only one refresh per process at a time
+_refresh_lock = threading.Lock()
+
+# Changes made in this process that leave no enrollment trace, for the next
+# refresh: teaching assignments, and deletes cascading through enrollments
+_pending = {"full": False, "course_ids": set(), "instructor_ids": set()}
+_pending_lock = threading.Lock()
+
+
+def _queue_teaching_change(key):
+    with _pending_lock:
+        if key is None:
+            _pending["full"] = True
+        else:
+            instructor_user_id, course_id = key
+            _pending["instructor_ids"].add(instructor_user_id)
+            _pending["course_ids"].add(course_id)
+
+
+def _queue_enrollment_change(key):
+    # Keyed writes update enrollment rows, which the watermark picks up
+    if key is None:
+        with _pending_lock:
+            _pending["full"] = True
+
+
+on_write(TEACHING_WRITE, _queue_teaching_change, keyed=True)
+on_write(ENROLLMENT_WRITE, _queue_enrollment_change, keyed=True)
+
+
+def _take_pending():
+    with _pending_lock:
+        taken = dict(_pending)
+        _pending.update(full=False, course_ids=set(), instructor_ids=set())
+    return taken
+
+
+def _restore_pending(taken):
+    with _pending_lock:
+        _pending["full"] = _pending["full"] or taken["full"]
+        _pending["course_ids"] |= taken["course_ids"]
+        _pending["instructor_ids"] |= taken["instructor_ids"]
+
+
+# ============================================================
+# REFRESH
+# ============================================================
+
+def refresh_snapshots_service(db: Session, full: bool = False):
+    """Refresh the analytics snapshot tables.
+
+    Incremental refreshes recompute only the courses, students and instructors
+    touched by enrollments updated since the last watermark, entities that
+    have no snapshot row yet, and teaching changes made in this process. A
+    full refresh recomputes every row; it also picks up teaching changes and
+    deletions made elsewhere, which leave no enrollment trace. Both drop rows
+    whose course or user no longer exists (or no longer has the role).
+    """
+    if not _refresh_lock.acquire(blocking=False):
+        raise HTTPException(
+            status_code=409,
+            detail="A snapshot refresh is already in progress"
+        )
+
+    try:
+        _refresh(db, full)
+    finally:
+        _refresh_lock.release()
+
+    return get_snapshot_status_service(db)
+
+
+def ensure_fresh_snapshots(db: Session):
+    """Bring snapshots up to date before an analyst read.
+
+    Runs a full refresh if snapshots were never built, and otherwise a
+    refresh once they are older than ANALYTICS_SNAPSHOT_MAX_AGE: full if the
+    last full one is older than ANALYTICS_SNAPSHOT_FULL_REFRESH, incremental
+    if not. If another request is already refreshing, the current (slightly
+    stale) snapshot is served.
+    """
+    state = db.get(AnalyticsRefreshState, SNAPSHOT_STATE_NAME)
+
+    never_built = state is None or state.watermark is None
+    if not never_built:
+        if SNAPSHOT_MAX_AGE_SECONDS <= 0:
+            return
+        age = (datetime.utcnow() - state.last_refreshed_at).total_seconds()
+        if age < SNAPSHOT_MAX_AGE_SECONDS:
+            return
+
+    full = never_built or _full_refresh_due(state)
+
+    # The first build must finish before anything can be served
+    if not _refresh_lock.acquire(blocking=never_built):
+        return
+
+    try:
+        _refresh(db, full=full)
+    finally:
+        _refresh_lock.release()
+
+
+def _full_refresh_due(state: AnalyticsRefreshState) -> bool:
+    if SNAPSHOT_FULL_REFRESH_SECONDS <= 0:
+        return False
+    if state.last_full_refresh_at is None:
+        return True
+    age = (datetime.utcnow() - state.last_full_refresh_at).total_seconds()
+    return age >= SNAPSHOT_FULL_REFRESH_SECONDS
+
+
+def get_snapshot_status_service(db: Session):
+    """Report when snapshots were last refreshed and how stale they are."""
+    state = db.get(AnalyticsRefreshState, SNAPSHOT_STATE_NAME)
+
+    if state is None or state.watermark is None:
+        return {
+            "status": "Never",
+            "refreshed_at": None,
+            "last_full_refresh_at": None,
+            "age_seconds": None,
+            "last_duration_ms": None,
+            "last_rows_refreshed": None,
+            "pending_changes": None,
+            "max_age_seconds": SNAPSHOT_MAX_AGE_SECONDS
+        }
+
+    pending_changes = db.query(func.count()).select_from(Enrollment).filter(
+        Enrollment.updated_at >= state.watermark
+    ).scalar() or 0
+
+    return {
+        "status": state.status,
+        "refreshed_at": state.last_refreshed_at.isoformat(),
+        "last_full_refresh_at": state.last_full_refresh_at.isoformat() if state.last_full_refresh_at else None,
+        "age_seconds": round((datetime.utcnow() - state.last_refreshed_at).total_seconds(), 1),
+        "last_duration_ms": state.last_duration_ms,
+        "last_rows_refreshed": state.last_rows_refreshed,
+        "pending_changes": pending_changes,
+        "max_age_seconds": SNAPSHOT_MAX_AGE_SECONDS
+    }
+
+
+def _refresh(db: Session, full: bool):
+
+    started = time.perf_counter()
+    refreshed_at = datetime.utcnow()
+
+    state = db.get(AnalyticsRefreshState, SNAPSHOT_STATE_NAME)
+    if not state:
+        state = AnalyticsRefreshState(name=SNAPSHOT_STATE_NAME)
+        db.add(state)
+
+    pending = _take_pending()
+    full = full or pending["full"] or state.watermark is None
+
+    try:
+        rows = _refresh_rows(db, state, full, pending, refreshed_at)
+
+        state.watermark = refreshed_at
+        state.last_refreshed_at = refreshed_at
+        if full:
+            state.last_full_refresh_at = refreshed_at
+        state.last_duration_ms = int((time.perf_counter() - started) * 1000)
+        state.last_rows_refreshed = rows
+        state.status = "Full" if full else "Incremental"
+
+        db.commit()
+    except Exception:
+        # Leave this process's queued changes for the next refresh
+        _restore_pending(pending)
+        raise
+
+
+def _refresh_rows(db: Session, state: AnalyticsRefreshState, full: bool, pending, refreshed_at: datetime):
+    """Upsert the snapshot rows due for refresh and drop orphaned ones;
+    returns the number of rows written or deleted."""
+    rows = _delete_orphaned_rows(db)
+
+    if full:
+        rows += (
+            upsert_from_select(db, CourseAnalyticsSnapshot, _course_snapshot_select(None, refreshed_at), ["course_id"])
+            + upsert_from_select(db, StudentAnalyticsSnapshot, _student_snapshot_select(None, refreshed_at), ["student_user_id"])
+            + upsert_from_select(db, InstructorAnalyticsSnapshot, _instructor_snapshot_select(None, refreshed_at), ["instructor_user_id"])
+        )
+    else:
+        course_ids, student_ids, instructor_ids = _changed_entity_ids(
+            db,
+            state.watermark - WATERMARK_OVERLAP
+        )
+        course_ids |= pending["course_ids"]
+        instructor_ids |= pending["instructor_ids"]
+
+        for batch in _batches(course_ids):
+            rows += upsert_from_select(db, CourseAnalyticsSnapshot, _course_snapshot_select(batch, refreshed_at), ["course_id"])
+        for batch in _batches(student_ids):
+            rows += upsert_from_select(db, StudentAnalyticsSnapshot, _student_snapshot_select(batch, refreshed_at), ["student_user_id"])
+        for batch in _batches(instructor_ids):
+            rows += upsert_from_select(db, InstructorAnalyticsSnapshot, _instructor_snapshot_select(batch, refreshed_at), ["instructor_user_id"])
+
+    return rows
+
+
+def _delete_orphaned_rows(db: Session) -> int:
+    """Delete snapshot rows whose course was deleted, or whose user was
+    deleted or no longer has the snapshot's role."""
+    deleted = db.execute(
+        delete(CourseAnalyticsSnapshot).where(
+            CourseAnalyticsSnapshot.course_id.not_in(select(Course.course_id))
+        )
+    ).rowcount
+    deleted += db.execute(
+        delete(StudentAnalyticsSnapshot).where(
+            StudentAnalyticsSnapshot.student_user_id.not_in(
+                select(User.user_id).where(User.role == "Student")
+            )
+        )
+    ).rowcount
+    deleted += db.execute(
+        delete(InstructorAnalyticsSnapshot).where(
+            InstructorAnalyticsSnapshot.instructor_user_id.not_in(
+                select(User.user_id).where(User.role == "Instructor")
+            )
+        )
+    ).rowcount
+
+    return deleted
+
+
+def _changed_entity_ids(db: Session, since: datetime):
+    """Ids whose snapshot rows must be recomputed after `since`."""
+
+    changed = db.query(
+        Enrollment.course_id,
+        Enrollment.student_user_id
+    ).filter(
+        Enrollment.updated_at >= since
+    ).all()
+
+    course_ids = {row.course_id for row in changed}
+    student_ids = {row.student_user_id for row in changed}
+
+    # Entities created since the last refresh have no snapshot row yet
+    course_ids.update(
+        cid for (cid,) in db.query(Course.course_id).outerjoin(
+            CourseAnalyticsSnapshot,
+            CourseAnalyticsSnapshot.course_id == Course.course_id
+        ).filter(
+            CourseAnalyticsSnapshot.course_id.is_(None)
+        )
+    )
+    student_ids.update(
+        uid for (uid,) in db.query(User.user_id).outerjoin(
+            StudentAnalyticsSnapshot,
+            StudentAnalyticsSnapshot.student_user_id == User.user_id
+        ).filter(
+            User.role == "Student",
+            StudentAnalyticsSnapshot.student_user_id.is_(None)
+        )
+    )
+    instructor_ids = {
+        uid for (uid,) in db.query(User.user_id).outerjoin(
+            InstructorAnalyticsSnapshot,
+            InstructorAnalyticsSnapshot.instructor_user_id == User.user_id
+        ).filter(
+            User.role == "Instructor",
+            InstructorAnalyticsSnapshot.instructor_user_id.is_(None)
+        )
+    }
+
+    # Instructors of changed courses see different student totals / completion rates
+    for batch in _batches(course_ids):
+        instructor_ids.update(
+            iid for (iid,) in db.query(Teaching.instructor_user_id).filter(
+                Teaching.course_id.in_(batch)
+            ).distinct()
+        )
+
+    return course_ids, student_ids, instructor_ids
+
+
+def _batches(ids):
+    ids = sorted(ids)
+    for i in range(0, len(ids), ID_BATCH_SIZE):
+        yield ids[i:i + ID_BATCH_SIZE]
+
+
+# ============================================================
+# SNAPSHOT SOURCE QUERIES
+# ============================================================
+# Each returns a SELECT whose labels match the snapshot table's columns,
+# restricted to `ids` when given (None → every entity).
+
+def _course_snapshot_select(course_ids, refreshed_at: datetime):
+
+    enrollment_stats = select(
+        Enrollment.course_id.label("course_id"),
+        func.count(Enrollment.student_user_id).label("total_enrollments"),
+        func.sum(
+            case((Enrollment.completion_status == "Completed", 1), else_=0)
+        ).label("completed_enrollments"),
+        func.avg(Enrollment.rating).label("average_rating")
+    ).group_by(
+        Enrollment.course_id
+    )
+
+    # Instructor counts are aggregated separately to avoid join fan-out
+    teaching_stats = select(
+        Teaching.course_id.label("course_id"),
+        func.count(Teaching.instructor_user_id).label("total_instructors")
+    ).group_by(
+        Teaching.course_id
+    )
+
+    if course_ids is not None:
+        enrollment_stats = enrollment_stats.where(Enrollment.course_id.in_(course_ids))
+        teaching_stats = teaching_stats.where(Teaching.course_id.in_(course_ids))
+
+    enrollment_stats = enrollment_stats.subquery()
+    teaching_stats = teaching_stats.subquery()
+
+    total = func.coalesce(enrollment_stats.c.total_enrollments, 0)
+    completed = func.coalesce(enrollment_stats.c.completed_enrollments, 0)
+
+    stmt = select(
+        Course.course_id.label("course_id"),
+        total.label("total_enrollments"),
+        completed.label("completed_enrollments"),
+        _rate(completed, total).label("completion_rate"),
+        func.coalesce(func.round(enrollment_stats.c.average_rating, 2), 0).label("average_rating"),
+        func.coalesce(teaching_stats.c.total_instructors, 0).label("total_instructors"),
+        literal(refreshed_at, TIMESTAMP).label("refreshed_at")
+    ).select_from(
+        Course
+    ).outerjoin(
+        enrollment_stats,
+        enrollment_stats.c.course_id == Course.course_id
+    ).outerjoin(
+        teaching_stats,
+        teaching_stats.c.course_id == Course.course_id
+    )
+
+    if course_ids is not None:
+        stmt = stmt.where(Course.course_id.in_(course_ids))
+
+    return stmt
+
+
+def _student_snapshot_select(student_ids, refreshed_at: datetime):
+
+    enrollment_stats = select(
+        Enrollment.student_user_id.label("student_user_id"),
+        func.count(Enrollment.course_id).label("total_enrollments"),
+        func.sum(
+            case((Enrollment.completion_status == "Completed", 1), else_=0)
+        ).label("completed_courses"),
+        func.avg(Enrollment.rating).label("average_rating")
+    ).group_by(
+        Enrollment.student_user_id
+    )
+
+    if student_ids is not None:
+        enrollment_stats = enrollment_stats.where(Enrollment.student_user_id.in_(student_ids))
+
+    enrollment_stats = enrollment_stats.subquery()
+
+    total = func.coalesce(enrollment_stats.c.total_enrollments, 0)
+    completed = func.coalesce(enrollment_stats.c.completed_courses, 0)
+
+    stmt = select(
+        User.user_id.label("student_user_id"),
+        total.label("total_enrollments"),
+        completed.label("completed_courses"),
+        (total - completed).label("active_courses"),
+        func.coalesce(func.round(enrollment_stats.c.average_rating, 2), 0).label("average_rating"),
+        literal(refreshed_at, TIMESTAMP).label("refreshed_at")
+    ).select_from(
+        User
+    ).outerjoin(
+        enrollment_stats,
+        enrollment_stats.c.student_user_id == User.user_id
+    ).where(
+        User.role == "Student"
+    )
+
+    if student_ids is not None:
+        stmt = stmt.where(User.user_id.in_(student_ids))
+
+    return stmt
+
+
+def _instructor_snapshot_select(instructor_ids, refreshed_at: datetime):
+
+    teaching = select(
+        Teaching.course_id,
+        Teaching.instructor_user_id
+    )
+    if instructor_ids is not None:
+        teaching = teaching.where(Teaching.instructor_user_id.in_(instructor_ids))
+    teaching = teaching.cte("teaching_scope")
+
+    # CTE: per-course enrollment totals and completion rate
+    # (rate is NULL for courses without enrollments so AVG skips them)
+    course_rates = select(
+        Enrollment.course_id.label("course_id"),
+        func.count(Enrollment.student_user_id).label("total_enrollments"),
+        (
+            func.sum(case((Enrollment.completion_status == "Completed", 1), else_=0)) * 100.0
+            / func.count(Enrollment.student_user_id)
+        ).label("completion_rate")
+    ).where(
+        Enrollment.course_id.in_(select(teaching.c.course_id))
+    ).group_by(
+        Enrollment.course_id
+    ).cte("course_rates")
+
+    # CTE: per-instructor teaching load, students reached and mean course completion
+    instructor_stats = select(
+        teaching.c.instructor_user_id.label("instructor_user_id"),
+        func.count(teaching.c.course_id).label("total_courses_taught"),
+        func.sum(func.coalesce(course_rates.c.total_enrollments, 0)).label("total_students"),
+        func.avg(course_rates.c.completion_rate).label("average_course_completion_rate")
+    ).select_from(
+        teaching
+    ).outerjoin(
+        course_rates,
+        course_rates.c.course_id == teaching.c.course_id
+    ).group_by(
+        teaching.c.instructor_user_id
+    ).cte("instructor_stats")
+
+    stmt = select(
+        User.user_id.label("instructor_user_id"),
+        func.coalesce(instructor_stats.c.total_courses_taught, 0).label("total_courses_taught"),
+        func.coalesce(instructor_stats.c.total_students, 0).label("total_students"),
+        func.coalesce(
+            func.round(instructor_stats.c.average_course_completion_rate, 2), 0
+        ).label("average_course_completion_rate"),
+        literal(refreshed_at, TIMESTAMP).label("refreshed_at")
+    ).select_from(
+        User
+    ).outerjoin(
+        instructor_stats,
+        instructor_stats.c.instructor_user_id == User.user_id
+    ).where(
+        User.role == "Instructor"
+    )
+
+    if instructor_ids is not None:
+        stmt = stmt.where(User.user_id.in_(instructor_ids))
+
+    return stmt
+
+
+def _rate(part, whole):
+    """SQL expression: part / whole as a percentage rounded to 2 places (0 when whole is 0)"""
+    return case(
+        (whole > 0, func.round(part * 100.0 / whole, 2)),
+        else_=0
+    )
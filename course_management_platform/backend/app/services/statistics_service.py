@@ -1,6 +1,15 @@
+import os
+import threading
+import time
+
 from sqlalchemy.orm import Session
+from sqlalchemy import select, or_, func
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
 
+from app.database import SessionLocal
+from app.utils.percentiles import grouped_percentiles
+
 from app.repositories import statistics_repo
 from app.models.statistics import Statistics
 from app.models.student_statistics import StudentStatistics
@@ -10,6 +19,51 @@ from app.models.instructor import Instructor
 from app.models.student import Student
 from app.models.course import Course
 from app.models.enrollment import Enrollment
+from app.core.cache import (
+    TTLCache,
+    on_write,
+    ENROLLMENT_WRITE,
+    COMPLETION_WRITE,
+    RATING_WRITE,
+    TEACHING_WRITE,
+    COURSE_WRITE
+)
+from app.core.after_commit import CoalescingWorker, on_commit
+from app.utils.db_utils import upsert_from_select
+
+
+# Seconds between reconciliation passes over the incremental counters; 0 disables
+RECONCILE_INTERVAL = int(os.getenv("STATS_RECONCILE_INTERVAL", 3600))
+
+# Corrected ids listed per table in a reconciliation result
+RECONCILE_SAMPLE_SIZE = 100
+
+
+def _invalidate_by(cache: TTLCache, position: int):
+    """Keyed hook dropping the id at `position` of an event's key tuple."""
+    def invalidate(key):
+        cache.invalidate(None if key is None else key[position])
+    return invalidate
+
+
+# Per-course results of get_course_statistics_service. Entries are dropped
+# on writes that change the course's enrollment counts, completions or
+# ratings in this process; the TTL bounds staleness from other processes.
+COURSE_STATS_CACHE = TTLCache(float(os.getenv("COURSE_STATS_CACHE_TTL", 30)))
+for _event in (ENROLLMENT_WRITE, COMPLETION_WRITE, RATING_WRITE):
+    on_write(_event, _invalidate_by(COURSE_STATS_CACHE, 1), keyed=True)
+on_write(COURSE_WRITE, COURSE_STATS_CACHE.invalidate, keyed=True)
+
+# Student / instructor statistics reads: bounded LRU, dropped per id by the
+# writes that change the cached row. New enrollments change the rows only
+# when the refresh worker recounts them, and it invalidates those ids itself.
+STATS_CACHE_SIZE = int(os.getenv("STATS_CACHE_SIZE", 2048))
+STUDENT_STATS_CACHE = TTLCache(float(os.getenv("STATS_CACHE_TTL", 30)), max_entries=STATS_CACHE_SIZE)
+INSTRUCTOR_STATS_CACHE = TTLCache(float(os.getenv("STATS_CACHE_TTL", 30)), max_entries=STATS_CACHE_SIZE)
+on_write(ENROLLMENT_WRITE, _invalidate_by(STUDENT_STATS_CACHE, 0), keyed=True)
+on_write(COMPLETION_WRITE, _invalidate_by(STUDENT_STATS_CACHE, 0), keyed=True)
+on_write(TEACHING_WRITE, _invalidate_by(INSTRUCTOR_STATS_CACHE, 0), keyed=True)
+
 
 # COURSE STATISTICS SERVICE
 
@@ -37,12 +91,19 @@ def update_course_statistics_service(db: Session, course_id: int):
         stats = Statistics(course_id=course_id)
         db.add(stats)
 
+    days_sum, timed = statistics_repo.get_course_completion_times(db, course_id)
+
     stats.total_enrollments = total
     stats.active_enrollments = active
     stats.completion_rate = round(completion_rate, 2)
-    stats.average_completion_time = 0  # placeholder
+    stats.completion_days_sum = days_sum
+    stats.completion_count = timed
+    stats.average_completion_time = round(days_sum / timed) if timed else None
+
+    statistics_repo.rebuild_completion_histogram(db, [course_id])
 
     db.commit()
+    COURSE_STATS_CACHE.invalidate(course_id)
     db.refresh(stats)
 
     return stats
@@ -86,6 +147,7 @@ def update_student_statistics_service(
 
     db.commit()
     db.refresh(stats)
+    STUDENT_STATS_CACHE.invalidate(student_user_id)
 
     return stats
 
@@ -128,6 +190,7 @@ def update_instructor_statistics_service(
 
     db.commit()
     db.refresh(stats)
+    INSTRUCTOR_STATS_CACHE.invalidate(instructor_user_id)
 
     return stats
 
@@ -135,32 +198,71 @@ def update_instructor_statistics_service(
 # FETCH ANALYTICS
 
 def get_course_statistics_service(db: Session, course_id: int):
+    """Stored course statistics merged with live enrollment figures.
+
+    Served per course from COURSE_STATS_CACHE, which drops a course's entry
+    whenever one of its enrollments changes.
+    """
+    return dict(COURSE_STATS_CACHE.get_or_compute(
+        course_id,
+        lambda: _compute_course_statistics(db, course_id)
+    ))
+
+
+def _compute_course_statistics(db: Session, course_id: int):
+
+    # Live counts, the precomputed stats row (may not exist) and the
+    # completion-time histogram in one query
+    completed_filter = Enrollment.completion_status == 'Completed'
+    live = select(
+        func.count().label("total"),
+        func.count().filter(completed_filter).label("completed"),
+        func.count().filter(Enrollment.completion_status != 'Completed').label("active"),
+        func.avg(Enrollment.rating).label("avg_rating")
+    ).where(
+        Enrollment.course_id == course_id
+    ).subquery()
+
+    row = db.execute(
+        select(
+            live,
+            Statistics.course_id.label("stats_course_id"),
+            Statistics.total_enrollments,
+            Statistics.active_enrollments,
+            Statistics.completion_rate,
+            Statistics.completion_days_sum,
+            Statistics.completion_count,
+            statistics_repo.completion_histogram_column(course_id).label("histogram")
+        ).select_from(live).outerjoin(
+            Statistics,
+            Statistics.course_id == course_id
+        )
+    ).one()
 
-    # Try to fetch precomputed stats row (may exist), but also compute a few live values
-    stats = db.query(Statistics).filter(
-        Statistics.course_id == course_id
-    ).first()
-
-    # Live calculations from enrollments
-    from sqlalchemy import func
-    total = db.query(func.count()).filter(Enrollment.course_id == course_id).scalar() or 0
-    completed = db.query(func.count()).filter(
-        Enrollment.course_id == course_id,
-        Enrollment.completion_status == 'Completed'
-    ).scalar() or 0
-    active = db.query(func.count()).filter(
-        Enrollment.course_id == course_id,
-        Enrollment.completion_status != 'Completed'
-    ).scalar() or 0
-
-    avg_rating = db.query(func.avg(Enrollment.rating)).filter(
-        Enrollment.course_id == course_id,
-        Enrollment.rating.isnot(None)
-    ).scalar()
+    stats = row if row.stats_course_id is not None else None
+    total = row.total or 0
+    completed = row.completed or 0
+    active = row.active or 0
+    avg_rating = row.avg_rating
     # avg_rating may be None if no ratings
     if avg_rating is not None:
         avg_rating = round(float(avg_rating), 2)
 
+    # Days from enrollment to completion: mean from the running totals,
+    # median/p90 from the per-course histogram (ignored when nothing completed)
+    histogram = statistics_repo.parse_completion_histogram(row.histogram) if completed else []
+    if stats and stats.completion_count:
+        average_completion_time = round(stats.completion_days_sum / stats.completion_count, 2)
+    else:
+        timed = sum(n for _, n in histogram)
+        average_completion_time = round(sum(d * n for d, n in histogram) / timed, 2) if timed else None
+    percentiles = _histogram_percentiles(histogram, (50, 90))
+    completion_time = {
+        'average_completion_time': average_completion_time,
+        'median_completion_time': percentiles[50],
+        'p90_completion_time': percentiles[90]
+    }
+
     # If no precomputed stats exist, compute basic completion rate
     if not stats:
         completion_rate = round((completed / total * 100), 2) if total > 0 else 0
@@ -168,7 +270,7 @@ def get_course_statistics_service(db: Session, course_id: int):
             'total_enrollments': total,
             'active_enrollments': active,
             'completion_rate': completion_rate,
-            'average_completion_time': None,
+            **completion_time,
             'completed_students': completed,
             'active_students': active,
             'pending_students': total - completed,
@@ -180,7 +282,7 @@ def get_course_statistics_service(db: Session, course_id: int):
         'total_enrollments': stats.total_enrollments or total,
         'active_enrollments': stats.active_enrollments or active,
         'completion_rate': float(stats.completion_rate) if stats.completion_rate is not None else (round((completed / total * 100), 2) if total > 0 else 0),
-        'average_completion_time': stats.average_completion_time,
+        **completion_time,
         'completed_students': completed,
         'active_students': active,
         'pending_students': total - completed,
@@ -190,96 +292,354 @@ def get_course_statistics_service(db: Session, course_id: int):
     return response
 
 
+def _histogram_percentiles(histogram, percentiles):
+    """{p: value} from a [(days, count)] histogram (None when empty)"""
+    values = [days for days, _ in histogram]
+    _, _, matrix = grouped_percentiles(
+        [0] * len(values), values, percentiles, [n for _, n in histogram]
+    )
+    if not len(matrix):
+        return dict.fromkeys(percentiles)
+    return {p: round(float(value), 2) for p, value in zip(percentiles, matrix[0])}
+
+
 def get_student_statistics_service(
     db: Session,
     student_user_id: int
 ):
-
-    stats = db.query(StudentStatistics).filter(
-        StudentStatistics.student_user_id ==
-        student_user_id
-    ).first()
-
-    if not stats:
-        raise HTTPException(
-            status_code=404,
-            detail="Student statistics not found"
+    """Student statistics row, computed and stored on first read."""
+    return dict(STUDENT_STATS_CACHE.get_or_compute(
+        student_user_id,
+        lambda: _read_through(
+            db,
+            StudentStatistics,
+            StudentStatistics.student_user_id,
+            student_user_id,
+            Student.user_id,
+            statistics_repo.seed_student_statistics,
+            "Student not found"
         )
-
-    return stats
+    ))
 
 
 def get_instructor_statistics_service(
     db: Session,
     instructor_user_id: int
 ):
+    """Instructor statistics row, computed and stored on first read."""
+    return dict(INSTRUCTOR_STATS_CACHE.get_or_compute(
+        instructor_user_id,
+        lambda: _read_through(
+            db,
+            InstructorStatistics,
+            InstructorStatistics.instructor_user_id,
+            instructor_user_id,
+            Instructor.user_id,
+            statistics_repo.seed_instructor_statistics,
+            "Instructor not found"
+        )
+    ))
 
-    stats = db.query(InstructorStatistics).filter(
-        InstructorStatistics.instructor_user_id ==
-        instructor_user_id
-    ).first()
+
+def _read_through(db: Session, model, key_column, entity_id: int, entity_column, seed, not_found: str):
+    stats = db.query(model).filter(key_column == entity_id).first()
 
     if not stats:
-        raise HTTPException(
-            status_code=404,
-            detail="Instructor statistics not found"
-        )
+        exists = db.query(entity_column).filter(entity_column == entity_id).first()
+        if not exists:
+            raise HTTPException(status_code=404, detail=not_found)
 
-    return stats
+        # Missing row: compute it from a full count and keep it. A concurrent
+        # reader may insert it first; its row is just as fresh.
+        try:
+            seed(db, [entity_id])
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+        stats = db.query(model).filter(key_column == entity_id).first()
+
+    return {
+        column.name: getattr(stats, column.key)
+        for column in model.__table__.columns
+    }
 
 
 # ---------------- Batch Recompute Helpers -----------------
-def recompute_all_students_service(db: Session):
-    """Recompute statistics for all students that have Student records."""
-    student_ids = [s.user_id for s in db.query(Student).all()]
-    updated = 0
-    errors = []
-    for sid in student_ids:
-        try:
-            update_student_statistics_service(db, sid)
-            updated += 1
-        except Exception as e:
-            # collect errors but continue
-            errors.append({"student_user_id": sid, "error": str(e)})
+# Every batch recompute takes `bulk`: False runs the per-entity update
+# functions one by one; True rewrites the whole table with a single
+# INSERT ... SELECT ... GROUP BY ... ON CONFLICT DO UPDATE.
+# An optional progress(processed, total) callback is called as entities
+# (or, in bulk mode, tables) finish, and in bulk mode also before each
+# statement; it may raise to stop the run.
+# With only_dirty=True only ids in the dirty set (statistics_repo.mark_dirty)
+# are recomputed. Either way, the dirty marks seen at the start are cleared
+# for every id that was recomputed successfully.
+
+# name -> (statistics model, full-count select builder, key column)
+_STATISTICS_TABLES = {
+    "students": (StudentStatistics, statistics_repo.student_counts_select, "student_user_id"),
+    "instructors": (InstructorStatistics, statistics_repo.instructor_counts_select, "instructor_user_id"),
+    "courses": (Statistics, statistics_repo.course_counts_select, "course_id")
+}
+
+# name -> (entity id column, dirty-set entity type, per-entity update)
+_RECOMPUTE_ENTITIES = {
+    "students": (Student.user_id, statistics_repo.DIRTY_STUDENT, lambda db, i: update_student_statistics_service(db, i)),
+    "instructors": (Instructor.user_id, statistics_repo.DIRTY_INSTRUCTOR, lambda db, i: update_instructor_statistics_service(db, i)),
+    "courses": (Course.course_id, statistics_repo.DIRTY_COURSE, lambda db, i: update_course_statistics_service(db, i))
+}
+
+
+def _recompute_table(db: Session, name: str, bulk: bool, progress, only_dirty: bool):
+    id_column, dirty_type, update_entity = _RECOMPUTE_ENTITIES[name]
+    key = _STATISTICS_TABLES[name][2]
+
+    claimed = statistics_repo.get_dirty(db, dirty_type)
+    ids = [entity_id for entity_id, _ in claimed] if only_dirty else None
+
+    if bulk:
+        result = _bulk_recompute(db, name, progress, ids)
+        if result["errors"]:
+            return result
+        failed = set()
+    else:
+        query = db.query(id_column)
+        if ids is not None:
+            query = query.filter(id_column.in_(ids))
+        entity_ids = [row[0] for row in query.order_by(id_column).all()]
+
+        updated = 0
+        errors = []
+        for done, entity_id in enumerate(entity_ids, start=1):
+            try:
+                update_entity(db, entity_id)
+                updated += 1
+            except Exception as e:
+                # collect errors but continue
+                db.rollback()
+                errors.append({key: entity_id, "error": str(e)})
+            if progress:
+                progress(done, len(entity_ids))
+
+        result = {"updated": updated, "errors": errors}
+        failed = {error[key] for error in errors}
+
+    statistics_repo.clear_dirty(
+        db,
+        dirty_type,
+        [(entity_id, version) for entity_id, version in claimed if entity_id not in failed]
+    )
+    db.commit()
 
-    return {"updated": updated, "errors": errors}
+    return result
 
 
-def recompute_all_instructors_service(db: Session):
-    """Recompute statistics for all instructors that have Instructor records."""
-    instructor_ids = [i.user_id for i in db.query(Instructor).all()]
-    updated = 0
-    errors = []
-    for iid in instructor_ids:
+def _bulk_recompute(db: Session, name: str, progress=None, ids=None):
+    model, counts_select, key = _STATISTICS_TABLES[name]
+
+    statements = []
+    if ids is None or ids:
+        statements.append(lambda: upsert_from_select(db, model, counts_select(ids), [key]))
+        if model is Statistics:
+            statements.append(lambda: statistics_repo.rebuild_completion_histogram(db, ids))
+    statements.append(db.commit)
+
+    result = {"updated": 0, "errors": []}
+    for statement in statements:
+        # Checked before each statement (and the commit) and outside the
+        # try, so a cancel raised here reaches the caller, which rolls back
+        # whatever this table wrote
+        if progress:
+            progress(0, 1)
         try:
-            update_instructor_statistics_service(db, iid)
-            updated += 1
+            result["updated"] = statement() or result["updated"]
         except Exception as e:
-            errors.append({"instructor_user_id": iid, "error": str(e)})
+            db.rollback()
+            result = {"updated": 0, "errors": [{"error": str(e)}]}
+            break
+    else:
+        _invalidate_statistics_cache(model)
 
-    return {"updated": updated, "errors": errors}
+    if progress:
+        progress(1, 1)
+    return result
 
 
-def recompute_all_courses_service(db: Session):
-    """Recompute statistics for all courses."""
-    course_ids = [c.course_id for c in db.query(Course).all()]
-    updated = 0
-    errors = []
-    for cid in course_ids:
-        try:
-            update_course_statistics_service(db, cid)
-            updated += 1
-        except Exception as e:
-            errors.append({"course_id": cid, "error": str(e)})
+def _invalidate_statistics_cache(model, key=None):
+    cache = {
+        Statistics: COURSE_STATS_CACHE,
+        StudentStatistics: STUDENT_STATS_CACHE,
+        InstructorStatistics: INSTRUCTOR_STATS_CACHE
+    }[model]
+    cache.invalidate(key)
+
+
+def _timed(recompute):
+    started = time.perf_counter()
+    result = recompute()
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
 
-    return {"updated": updated, "errors": errors}
+
+def recompute_all_students_service(db: Session, bulk: bool = False, progress=None, only_dirty: bool = False):
+    """Recompute statistics for all students that have Student records."""
+    return _timed(lambda: _recompute_table(db, "students", bulk, progress, only_dirty))
+
+
+def recompute_all_instructors_service(db: Session, bulk: bool = False, progress=None, only_dirty: bool = False):
+    """Recompute statistics for all instructors that have Instructor records."""
+    return _timed(lambda: _recompute_table(db, "instructors", bulk, progress, only_dirty))
 
 
-def recompute_platform_service(db: Session):
+def recompute_all_courses_service(db: Session, bulk: bool = False, progress=None, only_dirty: bool = False):
+    """Recompute statistics for all courses."""
+    return _timed(lambda: _recompute_table(db, "courses", bulk, progress, only_dirty))
+
+
+def recompute_platform_service(db: Session, bulk: bool = False, progress=None, only_dirty: bool = False):
     """Run all recompute tasks for platform (students, instructors, courses)."""
-    res = {
-        "students": recompute_all_students_service(db),
-        "instructors": recompute_all_instructors_service(db),
-        "courses": recompute_all_courses_service(db)
+    steps = (
+        ("students", recompute_all_students_service),
+        ("instructors", recompute_all_instructors_service),
+        ("courses", recompute_all_courses_service)
+    )
+
+    # Report progress over all three tables as one run
+    if bulk:
+        sizes = {name: 1 for name, _ in steps}
+    elif only_dirty:
+        dirty = statistics_repo.get_dirty_counts(db)
+        sizes = {name: dirty.get(_RECOMPUTE_ENTITIES[name][1], 0) for name, _ in steps}
+    else:
+        sizes = {name: db.query(_RECOMPUTE_ENTITIES[name][0]).count() for name, _ in steps}
+    total = sum(sizes.values())
+
+    res = {}
+    offset = 0
+    for name, recompute in steps:
+        step_progress = None
+        if progress:
+            step_progress = lambda done, _total, offset=offset: progress(offset + done, total)
+        res[name] = recompute(db, bulk, step_progress, only_dirty)
+        offset += sizes[name]
+    return res
+
+
+def get_dirty_counts_service(db: Session):
+    """Number of ids waiting for an only_dirty recompute, per table."""
+    counts = statistics_repo.get_dirty_counts(db)
+
+    return {
+        name: counts.get(dirty_type, 0)
+        for name, (_, dirty_type, _) in _RECOMPUTE_ENTITIES.items()
     }
-    return res
\ No newline at end of file
+
+
+# ---------------- Reconciliation -----------------
+# Write paths keep the statistics tables current with O(1) deltas
+# (statistics_repo.record_*). This pass re-derives every counter from the
+# enrollments and rewrites only the rows that drifted.
+
+def reconcile_statistics_service(db: Session, progress=None):
+    """Compare stored counters with a full count and correct any that differ
+    (including missing rows). Returns, per table, the number of corrected
+    rows and up to RECONCILE_SAMPLE_SIZE of their ids."""
+    result = {}
+
+    for done, (name, (model, counts_select, key)) in enumerate(_STATISTICS_TABLES.items(), start=1):
+        counts = counts_select().subquery()
+        stored = model.__table__
+
+        drifted = db.execute(
+            select(counts.c[key]).outerjoin(
+                stored,
+                stored.c[key] == counts.c[key]
+            ).where(or_(*[
+                stored.c[column.name].is_distinct_from(column)
+                for column in counts.columns
+                if column.name != key
+            ]))
+        ).scalars().all()
+
+        if drifted:
+            upsert_from_select(db, model, counts_select(drifted), [key])
+            if model is Statistics:
+                statistics_repo.rebuild_completion_histogram(db, drifted)
+
+        # The result ends up in background_job.result: a sample of the ids only
+        result[name] = {"corrected": len(drifted), "ids": drifted[:RECONCILE_SAMPLE_SIZE]}
+        if progress:
+            progress(done, len(_STATISTICS_TABLES))
+
+    db.commit()
+    for model, _, _ in _STATISTICS_TABLES.values():
+        _invalidate_statistics_cache(model)
+
+    return result
+
+
+_reconciler = None
+
+
+def start_statistics_reconciler():
+    """Run reconcile_statistics_service every RECONCILE_INTERVAL seconds in a
+    daemon thread. Safe to call more than once."""
+    global _reconciler
+
+    if RECONCILE_INTERVAL <= 0 or _reconciler is not None:
+        return _reconciler
+
+    def run():
+        while True:
+            time.sleep(RECONCILE_INTERVAL)
+            db = SessionLocal()
+            try:
+                reconcile_statistics_service(db)
+            except Exception:
+                # Leave the counters as they are; the next pass retries
+                db.rollback()
+            finally:
+                db.close()
+
+    _reconciler = threading.Thread(target=run, name="stats-reconciler", daemon=True)
+    _reconciler.start()
+
+    return _reconciler
+
+
+# ---------------- Deferred Refresh -----------------
+# New enrollments write nothing to the statistics tables; once the
+# enrollment commits, its (student_user_id, course_id) pair goes to a
+# background worker that applies the batch's deltas in one transaction.
+# Batches that fail are retried by the worker; anything it still drops is
+# repaired by the reconciler.
+
+STATS_REFRESH_DELAY = float(os.getenv("STATS_REFRESH_DELAY", 0.5))
+
+
+def refresh_statistics_service(db: Session, pairs):
+    """Apply the counter deltas of new (student_user_id, course_id)
+    enrollments and commit."""
+    touched = statistics_repo.apply_enrollments_added(db, pairs)
+    db.commit()
+
+    for model, entity_ids in touched.items():
+        for entity_id in entity_ids:
+            _invalidate_statistics_cache(model, entity_id)
+
+    return {model.__tablename__: len(entity_ids) for model, entity_ids in touched.items() if entity_ids}
+
+
+def _refresh_batch(keys):
+    db = SessionLocal()
+    try:
+        refresh_statistics_service(db, keys)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+statistics_refresher = CoalescingWorker("stats-refresh", _refresh_batch, STATS_REFRESH_DELAY)
+on_commit(statistics_repo.STATS_REFRESH, statistics_refresher.submit)
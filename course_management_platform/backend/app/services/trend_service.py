@@ -0,0 +1,273 @@
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, true
+from fastapi import HTTPException
+
+from app.models.enrollment import Enrollment
+from app.utils.db_utils import date_bucket
+from app.core.cache import on_write, COMPLETION_WRITE, RATING_WRITE, COURSE_WRITE, USER_WRITE
+
+
+TREND_BUCKETS = ("day", "week", "month")
+
+# A period is only cached once it ended more than this long ago, so rows
+# stamped in UTC (rated_at) or committed late still land in a live bucket
+CLOSE_GRACE = timedelta(days=1)
+
+# Seconds a cached set of closed periods is kept. The write hooks below only
+# see writes made by this process; the TTL bounds how stale closed periods
+# get when another worker process changes them.
+CLOSED_PERIODS_TTL = float(os.getenv("TREND_CLOSED_CACHE_TTL", 300))
+
+# (metric, bucket) -> {
+#     "through": first uncached period start,
+#     "periods": {start: values},
+#     "stale": closed period starts to re-query on the next read,
+#     "expires": time.monotonic() after which everything is re-queried
+# }
+_closed_periods = {}
+_closed_generation = [0]
+_closed_lock = threading.Lock()
+
+
+def _clear_closed_periods():
+    with _closed_lock:
+        _closed_periods.clear()
+        _closed_generation[0] += 1
+
+
+def _mark_stale(metric: str):
+    """Keyed hook: mark the closed periods holding the write's days stale."""
+    def invalidate(key):
+        with _closed_lock:
+            _closed_generation[0] += 1
+            for (cached_metric, bucket), cached in list(_closed_periods.items()):
+                if cached_metric != metric:
+                    continue
+                if key is None:
+                    del _closed_periods[(cached_metric, bucket)]
+                    continue
+                stale = {
+                    _period_start(day, bucket)
+                    for day in key[2]
+                    if day is not None and day < cached["through"]
+                }
+                if stale:
+                    # Replace rather than mutate: readers hold the old entry
+                    _closed_periods[(cached_metric, bucket)] = {
+                        **cached,
+                        "stale": cached["stale"] | stale
+                    }
+    return invalidate
+
+
+# Enrollments are stamped with the current date, so their closed periods
+# only change when a user or course is deleted and its enrollments cascade
+# away. Completion dates are client-supplied and can be cleared, and
+# re-rating or deleting a review moves a rating out of its old day, so
+# those writes mark the periods they touch for re-query.
+on_write(USER_WRITE, _clear_closed_periods)
+on_write(COURSE_WRITE, _clear_closed_periods)
+on_write(COMPLETION_WRITE, _mark_stale("completions"), keyed=True)
+on_write(RATING_WRITE, _mark_stale("ratings"), keyed=True)
+
+
+# ============================================================
+# TRENDS
+# ============================================================
+
+def get_trends_service(
+    db: Session,
+    bucket: str = "week",
+    start: date | None = None,
+    end: date | None = None
+):
+    """Enrollment, completion and rating counts per day, week or month.
+
+    Closed periods are cached for up to CLOSED_PERIODS_TTL seconds; each
+    call only re-queries the periods that are still open.
+    """
+    if bucket not in TREND_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid bucket '{bucket}'. Allowed: {', '.join(TREND_BUCKETS)}"
+        )
+
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+    open_start = _period_start(date.today() - CLOSE_GRACE, bucket)
+
+    periods = {}
+    for metric in TREND_METRICS:
+        for period, values in _metric_periods(db, metric, bucket, open_start).items():
+            periods.setdefault(period, {}).update(values)
+
+    if start:
+        start = _period_start(start, bucket)
+    if end:
+        end = _period_start(end, bucket)
+
+    # Emit every period in range, including empty ones, so charts have no gaps
+    series = []
+    period = start or (min(periods) if periods else None)
+    last = end or (max(periods) if periods else None)
+    if period and last:
+        while period <= last:
+            values = periods.get(period, {})
+            rating_count = values.get("ratings", 0)
+            series.append({
+                "period_start": period.isoformat(),
+                "enrollments": values.get("enrollments", 0),
+                "completions": values.get("completions", 0),
+                "ratings": rating_count,
+                "average_rating": round(values["rating_sum"] / rating_count, 2) if rating_count else None
+            })
+            period = _next_period(period, bucket)
+
+    return {
+        "bucket": bucket,
+        "open_period_start": open_start.isoformat(),
+        "series": series
+    }
+
+
+def _metric_periods(db: Session, metric: str, bucket: str, open_start: date):
+    """Per-period values for one metric: cached closed periods + live open ones."""
+    key = (metric, bucket)
+
+    with _closed_lock:
+        cached = _closed_periods.get(key)
+        generation = _closed_generation[0]
+
+    if cached is not None and cached["expires"] <= time.monotonic():
+        cached = None
+
+    if cached is None or cached["through"] < open_start or cached["stale"]:
+        # Compute only the periods that closed since the last call, plus
+        # any that writes marked stale
+        since = cached["through"] if cached else None
+        merged = dict(cached["periods"]) if cached else {}
+        for period in sorted(cached["stale"]) if cached else ():
+            merged.pop(period, None)
+            merged.update(_query_periods(db, metric, bucket, period, _next_period(period, bucket)))
+        if since is None or since < open_start:
+            merged.update(_query_periods(db, metric, bucket, since, open_start))
+        cached = {
+            "through": open_start,
+            "periods": merged,
+            "stale": frozenset(),
+            # A full re-query starts a new TTL; incremental updates keep the old one
+            "expires": cached["expires"] if cached else time.monotonic() + CLOSED_PERIODS_TTL
+        }
+
+        with _closed_lock:
+            # Don't store a result that a concurrent invalidation superseded
+            if _closed_generation[0] == generation:
+                _closed_periods[key] = cached
+
+    periods = {
+        period: values
+        for period, values in cached["periods"].items()
+        if period < open_start
+    }
+    periods.update(_query_periods(db, metric, bucket, open_start, None))
+
+    return periods
+
+
+def _query_periods(db: Session, metric: str, bucket: str, since: date | None, until: date | None):
+    """One GROUP BY over [since, until) for a metric."""
+    column, condition, aggregates = TREND_METRICS[metric]()
+
+    period = date_bucket(db, column, bucket).label("period")
+    query = db.query(period, *aggregates).filter(
+        column.isnot(None),
+        condition
+    )
+    if since is not None:
+        query = query.filter(column >= since)
+    if until is not None:
+        query = query.filter(column < until)
+
+    rows = query.group_by(period).all()
+
+    return {
+        _as_date(row.period): {
+            name: value or 0
+            for name, value in row._mapping.items()
+            if name != "period"
+        }
+        for row in rows
+    }
+
+
+# ============================================================
+# METRICS
+# ============================================================
+
+def _enrollment_metric():
+    return (
+        Enrollment.enrollment_date,
+        true(),
+        [func.count().label("enrollments")]
+    )
+
+
+def _completion_metric():
+    return (
+        Enrollment.completion_date,
+        Enrollment.completion_status == "Completed",
+        [func.count().label("completions")]
+    )
+
+
+def _rating_metric():
+    return (
+        Enrollment.rated_at,
+        Enrollment.rating.isnot(None),
+        [
+            func.count().label("ratings"),
+            func.sum(Enrollment.rating).label("rating_sum")
+        ]
+    )
+
+
+TREND_METRICS = {
+    "enrollments": _enrollment_metric,
+    "completions": _completion_metric,
+    "ratings": _rating_metric
+}
+
+
+# ============================================================
+# HELPERS
+# ============================================================
+
+def _period_start(day: date, bucket: str) -> date:
+    if bucket == "day":
+        return day
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def _next_period(day: date, bucket: str) -> date:
+    if bucket == "day":
+        return day + timedelta(days=1)
+    if bucket == "week":
+        return day + timedelta(days=7)
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _as_date(value) -> date:
+    # SQLite returns the bucket as an ISO string, PostgreSQL as a date
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
@@ -1,5 +1,7 @@
-from sqlalchemy import text
+from sqlalchemy import text, true, func, cast, literal_column, Date, TIMESTAMP, Integer, String
 from sqlalchemy.engine import Engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
 
 
 def sync_postgres_serial_sequences(engine: Engine) -> None:
@@ -41,3 +43,113 @@ def sync_postgres_serial_sequences(engine: Engine) -> None:
     except Exception:
         # Do not raise on startup; we prefer the app to continue running
         return
+
+
+def dialect_insert(db, table):
+    """Return an INSERT construct for `table` that supports ON CONFLICT
+    clauses on the session's dialect (PostgreSQL or SQLite)."""
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upserts are not supported on '{dialect}'")
+
+    return insert(table)
+
+
+def upsert_from_select(db, model, select_stmt, index_elements: list[str]):
+    """Run INSERT INTO model SELECT ... ON CONFLICT (index_elements) DO UPDATE
+    in one statement, overwriting every non-key column from the SELECT.
+
+    The SELECT's column labels must match the model's column names.
+    Returns the number of rows written.
+    """
+    columns = [c.name for c in select_stmt.selected_columns]
+
+    # SQLite needs a WHERE clause to disambiguate ON CONFLICT after a SELECT
+    stmt = dialect_insert(db, model.__table__).from_select(
+        columns,
+        select_stmt.where(true())
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={
+            name: stmt.excluded[name]
+            for name in columns
+            if name not in index_elements
+        }
+    )
+
+    return db.execute(stmt).rowcount
+
+
+def date_bucket(db, column, bucket: str):
+    """Truncate a date/timestamp column to the start of its day, ISO week
+    (Monday) or month, as a DATE, on PostgreSQL or SQLite."""
+    if bucket not in ("day", "week", "month"):
+        raise ValueError(f"Unsupported bucket '{bucket}'")
+
+    # Modifiers are inlined (not bound) so the expression renders identically
+    # in SELECT and GROUP BY
+    if db.get_bind().dialect.name == "sqlite":
+        if bucket == "day":
+            return func.date(column)
+        if bucket == "week":
+            return func.date(column, literal_column("'weekday 0'"), literal_column("'-6 days'"))
+        return func.date(column, literal_column("'start of month'"))
+
+    return cast(
+        func.date_trunc(literal_column(f"'{bucket}'"), cast(column, TIMESTAMP)),
+        Date
+    )
+
+
+class days_between(FunctionElement):
+    """Whole days from `start` to `end` (two DATE expressions), as an integer.
+
+    Unlike date_bucket this needs no session: it is compiled per dialect, so
+    it can be used in statements built before a bind is known.
+    """
+    type = Integer()
+    name = "days_between"
+    inherit_cache = True
+
+
+@compiles(days_between)
+def _days_between(element, compiler, **kw):
+    # PostgreSQL: date - date is an integer number of days
+    start, end = element.clauses
+    return f"({compiler.process(end, **kw)} - {compiler.process(start, **kw)})"
+
+
+@compiles(days_between, "sqlite")
+def _days_between_sqlite(element, compiler, **kw):
+    start, end = element.clauses
+    return (
+        f"CAST(julianday({compiler.process(end, **kw)}) "
+        f"- julianday({compiler.process(start, **kw)}) AS INTEGER)"
+    )
+
+
+class string_agg(FunctionElement):
+    """Aggregate `expr` (a text expression) into one string joined by
+    `separator` (a literal), in no particular order. string_agg on
+    PostgreSQL, group_concat on SQLite."""
+    type = String()
+    name = "string_agg"
+    inherit_cache = True
+
+
+@compiles(string_agg)
+def _string_agg(element, compiler, **kw):
+    expr, separator = element.clauses
+    return f"string_agg({compiler.process(expr, **kw)}, {compiler.process(separator, **kw)})"
+
+
+@compiles(string_agg, "sqlite")
+def _string_agg_sqlite(element, compiler, **kw):
+    expr, separator = element.clauses
+    return f"group_concat({compiler.process(expr, **kw)}, {compiler.process(separator, **kw)})"
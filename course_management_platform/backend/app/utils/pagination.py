@@ -0,0 +1,123 @@
+import base64
+import json
+from decimal import Decimal
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(payload: dict) -> str:
+    """Encode a keyset position as an opaque, URL-safe cursor string."""
+    raw = json.dumps(payload, separators=(",", ":"), default=_json_default)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode a cursor produced by encode_cursor (400 on garbage input)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+    if not isinstance(payload, dict) or "v" not in payload or "id" not in payload:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+    return payload
+
+
+def resolve_sort(sort: str, order: str | None, sort_keys: dict):
+    """Validate a sort key / order pair against {key: default_descending}.
+
+    Returns (sort, descending).
+    """
+    if sort not in sort_keys:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid sort key '{sort}'. Allowed: {', '.join(sort_keys)}"
+        )
+
+    if order is None:
+        return sort, sort_keys[sort]
+
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+
+    return sort, order == "desc"
+
+
+def paginate_keyset(
+    query,
+    sort_column,
+    id_column,
+    sort: str,
+    descending: bool,
+    limit: int | None,
+    after: str | None,
+    scope: dict | None = None
+):
+    """Apply keyset (seek) pagination to a query.
+
+    Rows are ordered by (sort_column, id_column) and, when `after` is given,
+    only rows strictly past the cursor position are returned. The sort value
+    is exposed on each row as `sort_value` so the next cursor can be built
+    without re-deriving it in Python. `scope` (e.g. the parent id and active
+    filters) is bound into the cursor; a cursor from another scope is
+    rejected like one from another sort.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    query = query.add_columns(sort_column.label("sort_value"))
+
+    if after:
+        cursor = decode_cursor(after)
+        if cursor.get("s") != sort or cursor.get("d") != descending:
+            raise HTTPException(
+                status_code=400,
+                detail="Cursor does not match the requested sort order"
+            )
+        if cursor.get("f") != scope:
+            raise HTTPException(
+                status_code=400,
+                detail="Cursor does not match the requested filters"
+            )
+
+        value, last_id = cursor["v"], cursor["id"]
+        past_value = sort_column < value if descending else sort_column > value
+        query = query.filter(
+            or_(
+                past_value,
+                and_(sort_column == value, id_column > last_id)
+            )
+        )
+
+    query = query.order_by(
+        sort_column.desc() if descending else sort_column.asc(),
+        id_column.asc()
+    )
+
+    if limit is None:
+        return query.all(), None
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    next_cursor = encode_cursor({
+        "s": sort,
+        "d": descending,
+        "f": scope,
+        "v": last.sort_value,
+        "id": getattr(last, id_column.key)
+    })
+
+    return rows, next_cursor
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in cursor")
@@ -0,0 +1,39 @@
+import numpy as np
+
+
+def grouped_percentiles(groups, values, percentiles, weights=None):
+    """Linear-interpolated percentiles (as percentile_cont) for every group
+    at once: sort by (group, value), then find each group's ranks by their
+    position in the cumulative weights.
+
+    `weights` gives the number of occurrences of each value (default 1), so
+    a histogram of (value, count) rows needs no expanding. Returns
+    (group_ids, counts, matrix) with one matrix row per group id, in order.
+    """
+    groups = np.asarray(groups)
+    values = np.asarray(values, dtype=np.float64)
+    weights = np.ones(len(values), dtype=np.int64) if weights is None else np.asarray(weights, dtype=np.int64)
+
+    keep = weights > 0
+    groups, values, weights = groups[keep], values[keep], weights[keep]
+
+    if len(values) == 0:
+        return groups[:0], np.zeros(0, dtype=np.int64), np.zeros((0, len(percentiles)))
+
+    order = np.lexsort((values, groups))
+    groups, values, weights = groups[order], values[order], weights[order]
+
+    group_ids, starts = np.unique(groups, return_index=True)
+    cumulative = np.cumsum(weights)
+    counts = np.add.reduceat(weights, starts)
+    before = cumulative[starts] - weights[starts]
+
+    fractions = np.array(percentiles, dtype=np.float64) / 100
+    positions = fractions[None, :] * (counts[:, None] - 1)
+    lower_rank = np.floor(positions)
+
+    # Row holding the value at each (group-relative) rank
+    lower = values[np.searchsorted(cumulative, before[:, None] + lower_rank, side="right")]
+    upper = values[np.searchsorted(cumulative, before[:, None] + np.ceil(positions), side="right")]
+
+    return group_ids, counts, lower + (upper - lower) * (positions - lower_rank)
@@ -0,0 +1,29 @@
+-- ============================================================
+-- ANALYTICS INDEXES
+-- ============================================================
+-- Back the grouped aggregates and keyset pagination used by the
+-- /analyst/*/analytics endpoints.
+
+-- Per-course enrollment aggregates (GROUP BY course_id with
+-- conditional completion counts)
+CREATE INDEX IF NOT EXISTS idx_enrollment_course_completion
+    ON enrollment(course_id, completion_status);
+
+-- Per-student enrollment aggregates
+CREATE INDEX IF NOT EXISTS idx_enrollment_student
+    ON enrollment(student_user_id);
+
+-- Per-instructor teaching load
+CREATE INDEX IF NOT EXISTS idx_teaching_instructor
+    ON teaching(instructor_user_id, course_id);
+
+-- Role-filtered user listings, paged by id or name
+CREATE INDEX IF NOT EXISTS idx_users_role_id
+    ON users(role, user_id);
+
+CREATE INDEX IF NOT EXISTS idx_users_role_name
+    ON users(role, name, user_id);
+
+-- Course listings paged by title
+CREATE INDEX IF NOT EXISTS idx_course_title
+    ON course(title, course_id);
@@ -0,0 +1,57 @@
+-- ============================================================
+-- ANALYTICS SNAPSHOT TABLES
+-- ============================================================
+-- Precomputed per-course / per-student / per-instructor aggregates
+-- served by the /analyst/*/analytics endpoints. Plain tables (not
+-- materialized views) so rows can be refreshed incrementally and the
+-- same DDL works on SQLite.
+
+-- Change tracking on enrollment drives incremental refreshes
+ALTER TABLE enrollment ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+UPDATE enrollment SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_enrollment_updated_at ON enrollment(updated_at);
+
+CREATE TABLE IF NOT EXISTS course_analytics_snapshot (
+    course_id INTEGER PRIMARY KEY REFERENCES course(course_id) ON DELETE CASCADE,
+    total_enrollments INTEGER NOT NULL DEFAULT 0,
+    completed_enrollments INTEGER NOT NULL DEFAULT 0,
+    completion_rate NUMERIC(5, 2) NOT NULL DEFAULT 0,
+    average_rating NUMERIC(4, 2) NOT NULL DEFAULT 0,
+    total_instructors INTEGER NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS student_analytics_snapshot (
+    student_user_id INTEGER PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+    total_enrollments INTEGER NOT NULL DEFAULT 0,
+    completed_courses INTEGER NOT NULL DEFAULT 0,
+    active_courses INTEGER NOT NULL DEFAULT 0,
+    average_rating NUMERIC(4, 2) NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS instructor_analytics_snapshot (
+    instructor_user_id INTEGER PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+    total_courses_taught INTEGER NOT NULL DEFAULT 0,
+    total_students INTEGER NOT NULL DEFAULT 0,
+    average_course_completion_rate NUMERIC(5, 2) NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS analytics_refresh_state (
+    name VARCHAR(50) PRIMARY KEY,
+    watermark TIMESTAMP,
+    last_refreshed_at TIMESTAMP,
+    last_full_refresh_at TIMESTAMP,
+    last_duration_ms INTEGER,
+    last_rows_refreshed INTEGER,
+    status VARCHAR(20) DEFAULT 'Never'
+);
+
+-- Keyset pagination over the default sort keys
+CREATE INDEX IF NOT EXISTS idx_course_snapshot_enrollments
+    ON course_analytics_snapshot(total_enrollments DESC, course_id);
+CREATE INDEX IF NOT EXISTS idx_student_snapshot_enrollments
+    ON student_analytics_snapshot(total_enrollments DESC, student_user_id);
+CREATE INDEX IF NOT EXISTS idx_instructor_snapshot_courses
+    ON instructor_analytics_snapshot(total_courses_taught DESC, instructor_user_id);
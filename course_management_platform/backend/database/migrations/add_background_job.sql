@@ -0,0 +1,32 @@
+-- ============================================================
+-- BACKGROUND JOBS
+-- ============================================================
+-- Persistent state for long-running recomputes started through
+-- /analytics/recompute/* and tracked through /analytics/jobs.
+
+CREATE TABLE IF NOT EXISTS background_job (
+    job_id SERIAL PRIMARY KEY,
+    kind VARCHAR(50) NOT NULL,
+    params JSON,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    processed INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    owner VARCHAR(100),
+    heartbeat_at TIMESTAMP,
+    result JSON,
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Owning process and heartbeat, for tables created before they existed
+ALTER TABLE background_job ADD COLUMN IF NOT EXISTS owner VARCHAR(100);
+ALTER TABLE background_job ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP;
+
+-- At most one queued or running job of each kind
+CREATE UNIQUE INDEX IF NOT EXISTS uq_background_job_active_kind
+    ON background_job(kind)
+    WHERE status IN ('queued', 'running');
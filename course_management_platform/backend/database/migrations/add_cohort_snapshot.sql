@@ -0,0 +1,17 @@
+-- ============================================================
+-- COHORT RETENTION SNAPSHOTS
+-- ============================================================
+-- Persisted retention curves for closed (enrollment week, category)
+-- cohorts served by /analyst/cohorts. Open cohorts are recomputed on
+-- every request and never stored.
+
+CREATE TABLE IF NOT EXISTS cohort_snapshot (
+    cohort_week DATE NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    horizon_weeks INTEGER NOT NULL,
+    cohort_size INTEGER NOT NULL,
+    completion_curve JSON NOT NULL,
+    progress_curve JSON NOT NULL,
+    computed_at TIMESTAMP,
+    PRIMARY KEY (cohort_week, category)
+);
@@ -0,0 +1,42 @@
+-- ============================================================
+-- COMPLETION TIME STATISTICS
+-- ============================================================
+-- Running sum/count of days from enrollment to completion per course
+-- (statistics.average_completion_time = sum / count) and a per-course
+-- histogram of those days for median/p90. Both are maintained on each
+-- completion change; the UPDATE/INSERT below backfill existing data.
+
+ALTER TABLE statistics ADD COLUMN IF NOT EXISTS completion_days_sum BIGINT DEFAULT 0;
+ALTER TABLE statistics ADD COLUMN IF NOT EXISTS completion_count INTEGER DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS completion_time_histogram (
+    course_id INTEGER NOT NULL REFERENCES course(course_id) ON DELETE CASCADE,
+    days INTEGER NOT NULL,
+    enrollments INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (course_id, days)
+);
+
+UPDATE statistics s SET
+    completion_days_sum = COALESCE(t.days_sum, 0),
+    completion_count = COALESCE(t.completed, 0),
+    average_completion_time = ROUND(t.days_sum::NUMERIC / NULLIF(t.completed, 0))
+FROM (
+    SELECT course_id,
+           SUM(completion_date - enrollment_date) AS days_sum,
+           COUNT(*) AS completed
+    FROM enrollment
+    WHERE completion_status = 'Completed'
+      AND completion_date IS NOT NULL
+      AND enrollment_date IS NOT NULL
+    GROUP BY course_id
+) t
+WHERE t.course_id = s.course_id;
+
+INSERT INTO completion_time_histogram (course_id, days, enrollments)
+SELECT course_id, completion_date - enrollment_date, COUNT(*)
+FROM enrollment
+WHERE completion_status = 'Completed'
+  AND completion_date IS NOT NULL
+  AND enrollment_date IS NOT NULL
+GROUP BY course_id, completion_date - enrollment_date
+ON CONFLICT (course_id, days) DO UPDATE SET enrollments = EXCLUDED.enrollments;
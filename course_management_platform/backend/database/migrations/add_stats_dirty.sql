@@ -0,0 +1,14 @@
+-- ============================================================
+-- STATISTICS DIRTY SET
+-- ============================================================
+-- Course, student and instructor ids whose enrollments or teaching
+-- assignments changed since their statistics were last recomputed.
+-- Filled by the write paths; drained by ?only_dirty=true recomputes.
+
+CREATE TABLE IF NOT EXISTS stats_dirty (
+    entity_type VARCHAR(20) NOT NULL,
+    entity_id INTEGER NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    marked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (entity_type, entity_id)
+);
@@ -0,0 +1,16 @@
+-- ============================================================
+-- TREND INDEXES
+-- ============================================================
+-- /analyst/trends only re-aggregates the open period on each call;
+-- these let that be a short range scan instead of a full table scan.
+
+CREATE INDEX IF NOT EXISTS idx_enrollment_enrollment_date
+    ON enrollment(enrollment_date);
+
+CREATE INDEX IF NOT EXISTS idx_enrollment_completion_date
+    ON enrollment(completion_date)
+    WHERE completion_status = 'Completed';
+
+CREATE INDEX IF NOT EXISTS idx_enrollment_rated_at
+    ON enrollment(rated_at)
+    WHERE rating IS NOT NULL;
@@ -0,0 +1,107 @@
+"""
+Script to measure what run_concurrently saves over running queries one after another.
+
+Usage:
+  python backend/scripts/benchmark_query_executor.py [--queries N] [--sleep SECONDS] [--repeat N]
+
+This script reads DATABASE_URL from the environment (same as the app) and
+ANALYTICS_QUERY_WORKERS like the app does. It times:
+
+  * --queries independent SELECT pg_sleep(--sleep) queries (PostgreSQL only),
+    run sequentially on one session and through run_concurrently;
+  * the platform overview aggregates, with the query executor enabled and
+    disabled.
+
+Each measurement is the median of --repeat runs.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+from sqlalchemy import text
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+load_dotenv()
+DATABASE_URL = os.getenv('DATABASE_URL')
+
+if not DATABASE_URL:
+    print('DATABASE_URL not set in environment (.env). Aborting.')
+    sys.exit(1)
+
+from app.database import SessionLocal, engine
+from app.services import query_executor
+from app.services.analyst_service import _compute_platform_overview
+
+
+def median_seconds(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def benchmark_sleep_queries(db, count, seconds, repeat):
+    queries = {
+        f'q{i}': (lambda s: s.execute(text('SELECT pg_sleep(:t)'), {'t': seconds}).scalar())
+        for i in range(count)
+    }
+
+    sequential = median_seconds(lambda: [query(db) for query in queries.values()], repeat)
+    concurrent = median_seconds(lambda: query_executor.run_concurrently(db, queries), repeat)
+
+    print(f'{count} x pg_sleep({seconds}): sequential {sequential:.3f}s, concurrent {concurrent:.3f}s')
+
+
+def benchmark_overview(db, repeat):
+    # Warm the pool so connection setup isn't counted against either mode
+    _compute_platform_overview(db)
+    concurrent = median_seconds(lambda: _compute_platform_overview(db), repeat)
+
+    executor, query_executor._executor = query_executor._executor, None
+    try:
+        sequential = median_seconds(lambda: _compute_platform_overview(db), repeat)
+    finally:
+        query_executor._executor = executor
+
+    print(f'platform overview: sequential {sequential:.3f}s, concurrent {concurrent:.3f}s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark concurrent analytics queries.')
+    parser.add_argument('--queries', type=int, default=4,
+                        help='number of independent sleep queries (default: 4)')
+    parser.add_argument('--sleep', type=float, default=0.3,
+                        help='seconds each sleep query takes (default: 0.3)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='runs per measurement; the median is reported (default: 5)')
+    args = parser.parse_args()
+
+    if args.queries < 1 or args.repeat < 1 or args.sleep < 0:
+        parser.error('--queries and --repeat must be at least 1, --sleep non-negative')
+
+    print(f'ANALYTICS_QUERY_WORKERS={query_executor.QUERY_WORKERS}')
+    if query_executor._executor is None:
+        print('Query executor disabled (ANALYTICS_QUERY_WORKERS <= 1); both modes run sequentially')
+
+    # SQL echo would dominate the timings
+    engine.echo = False
+
+    db = SessionLocal()
+    try:
+        if db.get_bind().dialect.name == 'postgresql':
+            benchmark_sleep_queries(db, args.queries, args.sleep, args.repeat)
+        else:
+            print('Skipping pg_sleep benchmark: needs PostgreSQL')
+        benchmark_overview(db, args.repeat)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
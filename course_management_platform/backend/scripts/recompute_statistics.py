@@ -0,0 +1,131 @@
+"""
+Script to rebuild the statistics tables in parallel, e.g. for nightly full rebuilds.
+
+Usage:
+  python backend/scripts/recompute_statistics.py [--workers N] [--batch-size N]
+                                                 [--tables students,instructors,courses]
+
+This script reads DATABASE_URL from the environment (same as the app),
+splits the student, instructor and course ids into shards of --batch-size
+ids and rebuilds each shard with one INSERT ... SELECT ... ON CONFLICT DO
+UPDATE. Shards run in a process pool (default: one worker per core), each
+worker with its own engine and connection.
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+load_dotenv()
+DATABASE_URL = os.getenv('DATABASE_URL')
+
+if not DATABASE_URL:
+    print('DATABASE_URL not set in environment (.env). Aborting.')
+    sys.exit(1)
+
+from app.repositories import statistics_repo
+from app.models.student import Student
+from app.models.instructor import Instructor
+from app.models.course import Course
+from app.models.statistics import Statistics
+from app.models.student_statistics import StudentStatistics
+from app.models.instructor_statistics import InstructorStatistics
+from app.utils.db_utils import upsert_from_select
+
+# table -> (id column to shard on, statistics model, full-count select builder, key column)
+TABLES = {
+    'students': (Student.user_id, StudentStatistics, statistics_repo.student_counts_select, 'student_user_id'),
+    'instructors': (Instructor.user_id, InstructorStatistics, statistics_repo.instructor_counts_select, 'instructor_user_id'),
+    'courses': (Course.course_id, Statistics, statistics_repo.course_counts_select, 'course_id')
+}
+
+# Per-process engine, created once in each worker
+_engine = None
+
+
+def _init_worker(database_url):
+    global _engine
+    _engine = create_engine(database_url, pool_size=1, max_overflow=0)
+
+
+def rebuild_shard(table, ids):
+    """Recompute one shard in its own transaction. Returns (table, rows written)."""
+    _, model, counts_select, key = TABLES[table]
+
+    with Session(bind=_engine) as db:
+        written = upsert_from_select(db, model, counts_select(ids), [key])
+        if model is Statistics:
+            statistics_repo.rebuild_completion_histogram(db, ids)
+        db.commit()
+
+    return table, written
+
+
+def shard_ids(engine, table, batch_size):
+    id_column = TABLES[table][0]
+    with engine.connect() as conn:
+        ids = conn.execute(select(id_column).order_by(id_column)).scalars().all()
+
+    return [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild statistics tables in parallel shards.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (default: number of cores)')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help='ids per shard (default: 1000)')
+    parser.add_argument('--tables', default=','.join(TABLES),
+                        help='comma-separated subset of: ' + ', '.join(TABLES))
+    args = parser.parse_args()
+
+    tables = [t.strip() for t in args.tables.split(',') if t.strip()]
+    unknown = [t for t in tables if t not in TABLES]
+    if unknown:
+        parser.error('unknown table(s): ' + ', '.join(unknown))
+    if args.workers < 1 or args.batch_size < 1:
+        parser.error('--workers and --batch-size must be at least 1')
+
+    engine = create_engine(DATABASE_URL)
+    shards = [(table, ids) for table in tables for ids in shard_ids(engine, table, args.batch_size)]
+    engine.dispose()
+
+    print(f'Rebuilding {", ".join(tables)}: {len(shards)} shard(s) on {args.workers} worker(s)')
+
+    started = time.perf_counter()
+    written = {table: 0 for table in tables}
+    failures = 0
+
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(DATABASE_URL,)
+    ) as pool:
+        futures = {pool.submit(rebuild_shard, table, ids): (table, ids) for table, ids in shards}
+
+        for future in as_completed(futures):
+            table, ids = futures[future]
+            try:
+                _, rows = future.result()
+                written[table] += rows
+            except Exception as e:
+                failures += 1
+                print(f'Failed {table} shard {ids[0]}..{ids[-1]}: {e}')
+
+    for table in tables:
+        print(f'{table}: {written[table]} row(s) written')
+    print(f'Done in {time.perf_counter() - started:.2f}s, {failures} failed shard(s)')
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -155,12 +155,7 @@ def dashboard():
     # Fetch current user info
     user_success, user_data = DashboardService.get_current_user(token)
     
-    # IMPORTANT: Only recompute student statistics for Student role
-    # This avoids attempting to create StudentStatistics for non-student users
-    if session.get('role', '').lower() == 'student':
-        DashboardService.recompute_student_stats(user_id, token)
-    
-    # Fetch student analytics (now updated)
+    # Fetch student analytics (the backend computes the row on first read)
     analytics_success, analytics = DashboardService.get_student_analytics(user_id, token)
     
     # Fetch student enrollments (detailed course info)
@@ -582,10 +577,7 @@ def instructor_dashboard():
         flash('Failed to fetch user data. Please login again.', 'danger')
         return redirect(url_for('login'))
     
-    # Recompute instructor statistics
-    InstructorService.recompute_instructor_stats(user_id, token)
-    
-    # Fetch instructor analytics
+    # Fetch instructor analytics (the backend computes the row on first read)
     analytics_success, analytics = InstructorService.get_instructor_analytics(user_id, token)
     
     # Fetch courses taught by instructor
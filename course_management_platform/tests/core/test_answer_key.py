@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+# Ensure backend package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "backend"))
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.quiz_service import AnswerKey
+
+
+def test_counts_matching_answers_case_insensitively():
+    key = AnswerKey(["A", "b", "C", "D"])
+
+    assert len(key) == 4
+    assert key.grade(["a", "B", "c", "D"]) == 4
+    assert key.grade(["A", "A", "A", "A"]) == 1
+    assert key.grade(["D", "C", "B", "A"]) == 0
+
+
+def test_questions_without_a_correct_answer_always_count_as_wrong():
+    key = AnswerKey(["A", None, "", "BC", "D"])
+
+    assert key.gradable.tolist() == [True, False, False, False, True]
+    # Matching the masked values themselves earns nothing
+    assert key.grade(["A", None, "", "BC", "D"]) == 2
+    assert key.grade(["A", "X", "Y", "B", "D"]) == 2
+
+
+def test_unanswerable_submissions_are_wrong():
+    key = AnswerKey(["A", "B"])
+
+    assert key.grade([None, "BB"]) == 0
+    assert key.grade([1, "B"]) == 1
+
+
+@pytest.mark.parametrize("answers", [[], ["A"], ["A", "B", "C"]])
+def test_length_mismatch_is_a_bad_request(answers):
+    key = AnswerKey(["A", "B"])
+
+    with pytest.raises(HTTPException) as error:
+        key.grade(answers)
+
+    assert error.value.status_code == 400
+    assert error.value.detail == f"Answers length {len(answers)} does not match expected 2"
+
+
+def test_empty_key_grades_empty_submission():
+    assert AnswerKey([]).grade([]) == 0
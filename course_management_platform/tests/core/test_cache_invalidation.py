@@ -0,0 +1,192 @@
+import sys
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+# Ensure backend package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "backend"))
+
+import pytest
+
+from app.core.cache import (
+    TTLCache,
+    notify_write,
+    ENROLLMENT_WRITE,
+    COMPLETION_WRITE,
+    RATING_WRITE,
+    PROGRESS_WRITE,
+    TEACHING_WRITE,
+    COURSE_WRITE,
+    USER_WRITE,
+    TOPIC_WRITE,
+    QUIZ_WRITE
+)
+from app.services import analyst_service, statistics_service, course_service, quiz_service, trend_service, snapshot_service
+
+
+CACHES = [
+    analyst_service.OVERVIEW_CACHE,
+    statistics_service.COURSE_STATS_CACHE,
+    statistics_service.STUDENT_STATS_CACHE,
+    statistics_service.INSTRUCTOR_STATS_CACHE,
+    course_service.TOPIC_INDEX_CACHE,
+    quiz_service.ANSWER_KEY_CACHE
+]
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    for cache in CACHES:
+        cache.invalidate()
+    yield
+    for cache in CACHES:
+        cache.invalidate()
+    # Writes fired here also queue snapshot refresh work
+    snapshot_service._take_pending()
+
+
+def prime(cache, *keys):
+    for key in keys:
+        cache.get_or_compute(key, lambda: "cached")
+
+
+def cached_keys(cache, *keys):
+    """The keys still served from cache (a miss computes and is re-cached)."""
+    hits = [key for key in keys if cache.get_or_compute(key, lambda: "fresh") == "cached"]
+    cache.invalidate()
+    return hits
+
+
+# --------------------------------------------------
+# TTLCache
+# --------------------------------------------------
+
+def test_keyed_invalidate_drops_only_that_key():
+    cache = TTLCache(60)
+    prime(cache, 1, 2)
+
+    cache.invalidate(1)
+
+    assert cached_keys(cache, 1, 2) == [2]
+
+
+@pytest.mark.parametrize("invalidated, stored", [(2, True), (1, False), (None, False)])
+def test_result_computed_across_an_invalidation_is_only_kept_if_its_key_was_not_hit(invalidated, stored):
+    cache = TTLCache(60)
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "cached"
+
+    worker = threading.Thread(target=cache.get_or_compute, args=(1, slow))
+    worker.start()
+    started.wait(5)
+    cache.invalidate(invalidated)
+    release.set()
+    worker.join(5)
+
+    assert cached_keys(cache, 1) == ([1] if stored else [])
+
+
+# --------------------------------------------------
+# Write hooks
+# --------------------------------------------------
+
+@pytest.mark.parametrize("event, key, dropped", [
+    (ENROLLMENT_WRITE, (1, 10), True),
+    (COMPLETION_WRITE, (1, 10, (None, date(2026, 1, 1))), True),
+    (COURSE_WRITE, 10, True),
+    (USER_WRITE, None, True),
+    (PROGRESS_WRITE, (1, 10), False),
+    (RATING_WRITE, (1, 10, (None, date(2026, 1, 1))), False)
+])
+def test_overview_is_dropped_only_by_count_changing_writes(event, key, dropped):
+    prime(analyst_service.OVERVIEW_CACHE, "platform_overview")
+
+    notify_write(event, key)
+
+    assert cached_keys(analyst_service.OVERVIEW_CACHE, "platform_overview") == ([] if dropped else ["platform_overview"])
+
+
+@pytest.mark.parametrize("event, key, students, instructors, courses", [
+    (ENROLLMENT_WRITE, (1, 10), [2], [7, 8], [11]),
+    (COMPLETION_WRITE, (1, 10, (None, date(2026, 1, 1))), [2], [7, 8], [11]),
+    (RATING_WRITE, (1, 10, (None, date(2026, 1, 1))), [1, 2], [7, 8], [11]),
+    (PROGRESS_WRITE, (1, 10), [1, 2], [7, 8], [10, 11]),
+    (TEACHING_WRITE, (7, 10), [1, 2], [8], [10, 11]),
+    (ENROLLMENT_WRITE, None, [], [7, 8], [])
+])
+def test_statistics_caches_drop_only_the_affected_ids(event, key, students, instructors, courses):
+    prime(statistics_service.STUDENT_STATS_CACHE, 1, 2)
+    prime(statistics_service.INSTRUCTOR_STATS_CACHE, 7, 8)
+    prime(statistics_service.COURSE_STATS_CACHE, 10, 11)
+
+    notify_write(event, key)
+
+    assert cached_keys(statistics_service.STUDENT_STATS_CACHE, 1, 2) == students
+    assert cached_keys(statistics_service.INSTRUCTOR_STATS_CACHE, 7, 8) == instructors
+    assert cached_keys(statistics_service.COURSE_STATS_CACHE, 10, 11) == courses
+
+
+def test_topic_writes_drop_only_that_course_topic_index():
+    prime(course_service.TOPIC_INDEX_CACHE, 10, 11)
+
+    notify_write(TOPIC_WRITE, 10)
+
+    assert cached_keys(course_service.TOPIC_INDEX_CACHE, 10, 11) == [11]
+
+
+@pytest.mark.parametrize("event", [QUIZ_WRITE, COURSE_WRITE])
+def test_quiz_and_course_writes_drop_only_that_course_answer_key(event):
+    prime(quiz_service.ANSWER_KEY_CACHE, 10, 11)
+
+    notify_write(event, 10)
+
+    assert cached_keys(quiz_service.ANSWER_KEY_CACHE, 10, 11) == [11]
+
+
+def test_completion_and_rating_writes_mark_closed_trend_periods_stale():
+    trend_service._clear_closed_periods()
+    for metric in ("completions", "ratings", "enrollments"):
+        trend_service._closed_periods[(metric, "month")] = {
+            "through": date(2026, 6, 1),
+            "periods": {},
+            "stale": frozenset(),
+            "expires": time.monotonic() + 60
+        }
+
+    # Days in open periods (on or after "through") need no re-query
+    notify_write(COMPLETION_WRITE, (1, 10, (date(2026, 2, 14), date(2026, 6, 3))))
+    notify_write(RATING_WRITE, (1, 10, (date(2026, 3, 1), None)))
+
+    stale = {key[0]: entry["stale"] for key, entry in trend_service._closed_periods.items()}
+    trend_service._clear_closed_periods()
+
+    assert stale == {
+        "completions": {date(2026, 2, 1)},
+        "ratings": {date(2026, 3, 1)},
+        "enrollments": set()
+    }
+
+
+@pytest.mark.parametrize("expires_in, since", [(60, date(2026, 6, 1)), (-1, None)])
+def test_closed_trend_periods_are_requeried_after_their_ttl(monkeypatch, expires_in, since):
+    # Writes from other processes never reach the hooks; only the TTL bounds them
+    queried = []
+    monkeypatch.setattr(trend_service, "_query_periods", lambda db, metric, bucket, start, end: queried.append((start, end)) or {})
+    trend_service._clear_closed_periods()
+    trend_service._closed_periods[("enrollments", "month")] = {
+        "through": date(2026, 6, 1),
+        "periods": {},
+        "stale": frozenset(),
+        "expires": time.monotonic() + expires_in
+    }
+
+    trend_service._metric_periods(None, "enrollments", "month", date(2026, 7, 1))
+    trend_service._clear_closed_periods()
+
+    # Closed periods from `since` (None: all of them), then the open ones
+    assert queried == [(since, date(2026, 7, 1)), (date(2026, 7, 1), None)]
@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+
+# Ensure backend package is importable
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "backend"))
+
+import pytest
+
+from app.services.course_service import TopicIndex, FINAL_ASSESSMENT
+
+
+def test_regular_topics_keep_sequence_order_without_the_final_assessment():
+    index = TopicIndex([(12, "Intro"), (11, "Loops"), (30, FINAL_ASSESSMENT), (13, "Functions")])
+
+    assert index.topic_ids == (12, 11, 13)
+    assert index.first_topic_id == 12
+    assert index.final_assessment_id == 30
+
+
+def test_previous_walks_back_one_regular_topic():
+    index = TopicIndex([(12, "Intro"), (30, FINAL_ASSESSMENT), (11, "Loops"), (13, "Functions")])
+
+    assert index.previous(12) is None
+    assert index.previous(11) == 12
+    assert index.previous(13) == 11
+
+
+def test_previous_rejects_topics_outside_the_regular_sequence():
+    index = TopicIndex([(12, "Intro"), (30, FINAL_ASSESSMENT)])
+
+    with pytest.raises(KeyError):
+        index.previous(30)
+    with pytest.raises(KeyError):
+        index.previous(99)
+
+
+def test_course_without_topics():
+    index = TopicIndex([])
+
+    assert index.topic_ids == ()
+    assert index.first_topic_id is None
+    assert index.final_assessment_id is None
+
+
+def test_course_with_only_the_final_assessment():
+    index = TopicIndex([(30, FINAL_ASSESSMENT)])
+
+    assert index.first_topic_id is None
+    assert index.final_assessment_id == 30
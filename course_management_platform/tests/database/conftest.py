@@ -1,11 +1,16 @@
 """
-Minimal pytest configuration: ensure `backend` is on path and env loaded.
+Minimal pytest configuration: ensure `backend` is on path and env loaded,
+plus a scratch database for behaviour tests.
 """
 import sys
 import os
+from datetime import date
 
 from pathlib import Path
 from dotenv import load_dotenv
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
 
 # Ensure backend package is importable
 backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
@@ -13,3 +18,91 @@ sys.path.insert(0, backend_path)
 
 # Load environment variables from project .env if present
 load_dotenv(Path(__file__).parent.parent.parent / '.env')
+
+
+# --------------------------------------------------
+# Scratch database for behaviour tests that write
+# --------------------------------------------------
+
+@pytest.fixture
+def scratch_db(tmp_path):
+    """Session on a fresh SQLite file with every table created."""
+    from app.database import Base
+    import app.models  # noqa: F401  (registers the tables)
+    import app.models.quiz  # noqa: F401
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'scratch.db'}")
+
+    @event.listens_for(engine, "connect")
+    def _enable_foreign_keys(connection, _):
+        connection.execute("PRAGMA foreign_keys=ON")
+
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def queued_refresh():
+    """Statistics refresh keys queued by committed enrollments. They are
+    collected here instead of going to the background worker, which uses
+    the app's engine rather than the scratch database."""
+    from app.core.after_commit import on_commit
+    from app.repositories.statistics_repo import STATS_REFRESH
+    from app.services.statistics_service import statistics_refresher
+
+    keys = set()
+    on_commit(STATS_REFRESH, keys.update)
+    try:
+        yield keys
+    finally:
+        on_commit(STATS_REFRESH, statistics_refresher.submit)
+
+
+@pytest.fixture
+def platform(scratch_db):
+    """Students 1-6, instructors 7-8, an analyst 9 and courses 1-3 (course 3
+    untaught), with a few enrollments in various states."""
+    from app.models import User, Student, Instructor, Course, Enrollment, Teaching
+
+    db = scratch_db
+    for user_id in range(1, 10):
+        role = "Student" if user_id <= 6 else "Instructor" if user_id <= 8 else "Data Analyst"
+        db.add(User(user_id=user_id, name=f"User {user_id}", email=f"u{user_id}@example.com", password="x", role=role))
+    db.flush()
+    db.add_all([Student(user_id=user_id) for user_id in range(1, 7)])
+    db.add_all([Instructor(user_id=user_id) for user_id in (7, 8)])
+
+    for course_id in (1, 2, 3):
+        db.add(Course(course_id=course_id, title=f"Course {course_id}", approval_status="Approved"))
+    db.flush()
+
+    db.add_all([
+        Teaching(instructor_user_id=7, course_id=1, assigned_date=date(2026, 1, 1)),
+        Teaching(instructor_user_id=7, course_id=2, assigned_date=date(2026, 1, 1)),
+        Teaching(instructor_user_id=8, course_id=2, assigned_date=date(2026, 1, 1))
+    ])
+
+    enrollments = [
+        (1, 1, "Completed", date(2026, 1, 5), date(2026, 2, 4)),
+        (2, 1, "In Progress", date(2026, 1, 6), None),
+        (3, 1, "Completed", date(2026, 1, 7), date(2026, 1, 17)),
+        (1, 2, "In Progress", date(2026, 2, 1), None),
+        (4, 2, "Completed", date(2026, 2, 2), date(2026, 3, 4))
+    ]
+    for student_user_id, course_id, status, enrolled, completed in enrollments:
+        db.add(Enrollment(
+            student_user_id=student_user_id,
+            course_id=course_id,
+            enrollment_date=enrolled,
+            status="Active",
+            completion_status=status,
+            completion_date=completed
+        ))
+    db.commit()
+
+    return db
@@ -0,0 +1,65 @@
+"""Bulk roster import: per-row statuses and input parsing."""
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import Enrollment
+from app.services.participation_service import bulk_enroll_service, parse_bulk_enrollments
+
+
+def test_each_row_gets_its_own_status(platform, queued_refresh):
+    rows = [
+        {"student_user_id": 5, "course_id": 1},     # enrolled
+        {"student_user_id": "x", "course_id": 1},   # not an integer
+        {"student_user_id": 99, "course_id": 1},    # unknown user
+        {"student_user_id": 7, "course_id": 1},     # instructor
+        {"student_user_id": 5, "course_id": 99},    # unknown course
+        {"student_user_id": "5", "course_id": "1"}, # duplicate of row 1
+        {"student_user_id": 1, "course_id": 1},     # already enrolled
+        {"course_id": 2}                            # missing student
+    ]
+
+    result = bulk_enroll_service(platform, rows)
+
+    assert [(r["row"], r["status"], r["detail"]) for r in result["results"]] == [
+        (1, "enrolled", None),
+        (2, "error", "student_user_id and course_id must be integers"),
+        (3, "error", "User not found"),
+        (4, "error", "User is not a student"),
+        (5, "error", "Course not found"),
+        (6, "skipped", "Duplicate row"),
+        (7, "skipped", "Student already enrolled"),
+        (8, "error", "student_user_id and course_id must be integers")
+    ]
+    assert (result["total"], result["enrolled"], result["skipped"], result["error"]) == (8, 1, 2, 5)
+    assert platform.query(Enrollment).filter_by(student_user_id=5, course_id=1).count() == 1
+
+
+def test_too_many_rows_are_rejected(platform, monkeypatch):
+    monkeypatch.setattr("app.services.participation_service.MAX_BULK_ENROLLMENTS", 2)
+
+    with pytest.raises(HTTPException) as error:
+        bulk_enroll_service(platform, [{"student_user_id": 5, "course_id": 1}] * 3)
+
+    assert error.value.status_code == 413
+
+
+def test_csv_and_json_bodies_parse_to_the_same_rows():
+    csv_rows = parse_bulk_enrollments(b"\xef\xbb\xbfstudent_user_id,course_id\n5,1\n6,2\n", "text/csv; charset=utf-8")
+    json_rows = parse_bulk_enrollments(json.dumps([{"student_user_id": "5", "course_id": "1"}, {"student_user_id": "6", "course_id": "2"}]).encode(), "application/json")
+
+    assert csv_rows == json_rows
+
+
+@pytest.mark.parametrize("body, content_type", [
+    (b"student_user_id\n5\n", "text/csv"),
+    (b"{not json", "application/json"),
+    (b'{"student_user_id": 5}', "application/json"),
+    (b"[1, 2]", "application/json")
+])
+def test_malformed_bodies_are_rejected(body, content_type):
+    with pytest.raises(HTTPException) as error:
+        parse_bulk_enrollments(body, content_type)
+
+    assert error.value.status_code == 400
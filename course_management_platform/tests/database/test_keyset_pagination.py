@@ -0,0 +1,83 @@
+"""Keyset pagination: page boundaries, tie-breaking and cursor validation."""
+import pytest
+from fastapi import HTTPException
+
+from app.models import User
+from app.utils.pagination import paginate_keyset, encode_cursor
+from app.services import analyst_service
+
+
+@pytest.fixture
+def named_users(scratch_db):
+    # Names repeat so most pages end inside a run of equal sort values
+    names = ["Ada", "Bob", "Bob", "Bob", "Cy", "Cy", "Dee"]
+    for user_id, name in enumerate(names, start=1):
+        scratch_db.add(User(user_id=user_id, name=name, email=f"u{user_id}@example.com", password="x", role="Student"))
+    scratch_db.commit()
+    return scratch_db
+
+
+def all_pages(db, limit, descending=False):
+    pages, after = [], None
+    while True:
+        rows, after = paginate_keyset(
+            db.query(User.user_id), User.name, User.user_id, "name", descending, limit, after
+        )
+        pages.append([row.user_id for row in rows])
+        if after is None:
+            return pages
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 6, 7, 8])
+def test_pages_cover_every_row_once_with_ties_broken_by_id(named_users, limit):
+    pages = all_pages(named_users, limit)
+
+    assert [user_id for page in pages for user_id in page] == [1, 2, 3, 4, 5, 6, 7]
+    assert all(len(page) == limit for page in pages[:-1])
+    # An exact multiple of the limit ends without an empty trailing page
+    assert pages[-1]
+
+
+def test_descending_order_keeps_ids_ascending_within_ties(named_users):
+    pages = all_pages(named_users, 2, descending=True)
+
+    assert [user_id for page in pages for user_id in page] == [7, 5, 6, 2, 3, 4, 1]
+
+
+def test_unlimited_page_has_no_cursor(named_users):
+    rows, after = paginate_keyset(
+        named_users.query(User.user_id), User.name, User.user_id, "name", False, None, None
+    )
+
+    assert len(rows) == 7
+    assert after is None
+
+
+@pytest.mark.parametrize("cursor, detail", [
+    ("not a cursor!", "Invalid pagination cursor"),
+    (encode_cursor({"s": "name", "d": False}), "Invalid pagination cursor"),
+    (encode_cursor({"s": "email", "d": False, "v": "a", "id": 1}), "Cursor does not match the requested sort order"),
+    (encode_cursor({"s": "name", "d": True, "v": "a", "id": 1}), "Cursor does not match the requested sort order"),
+    (encode_cursor({"s": "name", "d": False, "f": {"course_id": 2}, "v": "a", "id": 1}), "Cursor does not match the requested filters")
+])
+def test_foreign_cursors_are_rejected(named_users, cursor, detail):
+    with pytest.raises(HTTPException) as error:
+        paginate_keyset(
+            named_users.query(User.user_id), User.name, User.user_id, "name", False, 2, cursor,
+            scope={"course_id": 1}
+        )
+
+    assert error.value.status_code == 400
+    assert error.value.detail == detail
+
+
+def test_roster_cursor_is_bound_to_course_and_filters(platform):
+    first = analyst_service.get_course_roster_service(platform, 1, limit=1)
+
+    rest = analyst_service.get_course_roster_service(platform, 1, limit=10, after=first["next_cursor"])
+    assert [s["student_user_id"] for s in first["students"] + rest["students"]] == [1, 2, 3]
+
+    for other in ({"course_id": 2}, {"course_id": 1, "completion_status": "Completed"}, {"course_id": 1, "grade": "A"}):
+        with pytest.raises(HTTPException) as error:
+            analyst_service.get_course_roster_service(platform, limit=1, after=first["next_cursor"], **other)
+        assert error.value.status_code == 400
@@ -0,0 +1,43 @@
+"""Progress/assessment write validation: which error wins when several apply."""
+import pytest
+from fastapi import HTTPException
+
+from app.models import Topic
+from app.services.participation_service import _get_participation
+
+
+@pytest.fixture
+def with_topic(platform):
+    platform.add(Topic(topic_id=1, name="Basics"))
+    platform.commit()
+    return platform
+
+
+@pytest.mark.parametrize("student_user_id, course_id, topic_id, status, detail", [
+    # Each case also fails every later check
+    (99, 99, 99, 404, "Student not found"),
+    (7, 99, 99, 400, "User is not a student"),
+    (5, 99, 99, 404, "Course not found"),
+    (5, 1, 99, 404, "Topic not found"),
+    (5, 1, 1, 404, "Enrollment not found"),
+    (5, 1, None, 404, "Enrollment not found")
+])
+def test_first_failing_check_wins(with_topic, student_user_id, course_id, topic_id, status, detail):
+    with pytest.raises(HTTPException) as error:
+        _get_participation(with_topic, student_user_id, course_id, topic_id)
+
+    assert (error.value.status_code, error.value.detail) == (status, detail)
+
+
+def test_valid_write_returns_the_joined_row(with_topic):
+    row = _get_participation(with_topic, 2, 1, 1)
+
+    assert (row.role, row.course_id, row.topic_id) == ("Student", 1, 1)
+    assert (row.Enrollment.student_user_id, row.Enrollment.course_id) == (2, 1)
+
+
+def test_topic_is_not_looked_up_without_a_topic_id(with_topic):
+    row = _get_participation(with_topic, 2, 1)
+
+    assert row.topic_id is None
+    assert row.Enrollment is not None
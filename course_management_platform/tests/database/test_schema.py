@@ -23,7 +23,15 @@ from app.models import (
     CourseContent,
     Statistics,
     StudentStatistics,
-    InstructorStatistics
+    InstructorStatistics,
+    CompletionTimeHistogram,
+    StatsDirty,
+    CourseAnalyticsSnapshot,
+    StudentAnalyticsSnapshot,
+    InstructorAnalyticsSnapshot,
+    AnalyticsRefreshState,
+    CohortSnapshot,
+    BackgroundJob
 )
 
 
@@ -104,3 +112,25 @@ def test_statistics_tables_accessible(db):
     db.query(Statistics).limit(1).all()
     db.query(StudentStatistics).limit(1).all()
     db.query(InstructorStatistics).limit(1).all()
+    db.query(CompletionTimeHistogram).limit(1).all()
+    db.query(StatsDirty).limit(1).all()
+
+
+# --------------------------------------------------
+# 8️⃣ Analytics Snapshots
+# --------------------------------------------------
+
+def test_analytics_snapshot_tables_accessible(db):
+    db.query(CourseAnalyticsSnapshot).limit(1).all()
+    db.query(StudentAnalyticsSnapshot).limit(1).all()
+    db.query(InstructorAnalyticsSnapshot).limit(1).all()
+    db.query(AnalyticsRefreshState).limit(1).all()
+    db.query(CohortSnapshot).limit(1).all()
+
+
+# --------------------------------------------------
+# 9️⃣ Background Jobs
+# --------------------------------------------------
+
+def test_background_job_table_accessible(db):
+    db.query(BackgroundJob).limit(1).all()
@@ -0,0 +1,91 @@
+"""Incremental statistics counters (deltas and dirty marks) against a full recount."""
+from datetime import date
+
+import pytest
+
+from app.models import Enrollment, StatsDirty, StudentStatistics
+from app.repositories import participation_repo, statistics_repo
+from app.services import statistics_service, moderation_service
+
+
+@pytest.fixture
+def counted(platform, queued_refresh):
+    db = platform
+    for recompute in (
+        statistics_service.recompute_all_courses_service,
+        statistics_service.recompute_all_students_service,
+        statistics_service.recompute_all_instructors_service
+    ):
+        recompute(db, bulk=True)
+    return db
+
+
+def assert_matches_full_recount(db):
+    # reconcile rewrites (and reports) every row that differs from a full count
+    result = statistics_service.reconcile_statistics_service(db)
+    assert {name: table["corrected"] for name, table in result.items()} == {
+        "students": 0, "instructors": 0, "courses": 0
+    }
+
+
+def enrollment(db, student_user_id, course_id):
+    return db.query(Enrollment).filter_by(student_user_id=student_user_id, course_id=course_id).one()
+
+
+def test_bulk_recompute_matches_full_recount(counted):
+    assert_matches_full_recount(counted)
+
+
+def test_completion_deltas_match_full_recount(counted):
+    db = counted
+
+    participation_repo.update_completion(db, enrollment(db, 2, 1), "Completed", date(2026, 1, 20))
+    participation_repo.update_completion(db, enrollment(db, 1, 1), "In Progress", None)
+    participation_repo.update_completion(db, enrollment(db, 4, 2), "Completed", date(2026, 2, 10))
+    moderation_service.force_completion_service(db, 1, 2)
+
+    assert_matches_full_recount(db)
+
+
+def test_new_enrollment_deltas_are_applied_after_commit(counted, queued_refresh):
+    db = counted
+
+    participation_repo.create_enrollment(db, 5, 3)
+    participation_repo.create_enrollments(db, [(5, 1), (5, 2), (6, 2), (2, 2), (1, 1)])
+
+    # Nothing is written inside the enrollment transactions; the pairs are queued
+    assert db.query(StatsDirty).count() == 0
+    assert queued_refresh == {(5, 3), (5, 1), (5, 2), (6, 2), (2, 2)}
+
+    result = statistics_service.refresh_statistics_service(db, queued_refresh)
+
+    # Student 5 is new to instructor 7 through two courses of one batch, and
+    # student 2 already took one of 7's courses: each counts once at most
+    assert result == {"statistics": 3, "student_statistics": 3, "instructor_statistics": 2}
+    assert db.query(StatsDirty).count() == 0
+    assert_matches_full_recount(db)
+
+
+def test_teaching_change_is_recounted_from_dirty_marks(counted):
+    db = counted
+
+    participation_repo.assign_instructor(db, 8, 1)
+    assert statistics_repo.get_dirty_counts(db) == {statistics_repo.DIRTY_INSTRUCTOR: 1}
+
+    statistics_service.recompute_all_instructors_service(db, bulk=True, only_dirty=True)
+
+    assert statistics_repo.get_dirty_counts(db) == {}
+    assert_matches_full_recount(db)
+
+
+def test_reconcile_reports_a_sample_of_the_corrected_ids(counted, monkeypatch):
+    db = counted
+    monkeypatch.setattr(statistics_service, "RECONCILE_SAMPLE_SIZE", 2)
+    db.query(StudentStatistics).delete()
+    db.commit()
+
+    result = statistics_service.reconcile_statistics_service(db)
+
+    assert result["students"]["corrected"] == 6
+    assert len(result["students"]["ids"]) == 2
+    assert_matches_full_recount(db)